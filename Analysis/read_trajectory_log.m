@@ -0,0 +1,19 @@
+%% read_trajectory_log.m
+% Memory-maps a binary trajectory log written by utilities/trajectory_io.py
+% usage: data = read_trajectory_log('run.trj'); plot(data.time, data.px);
+function data = read_trajectory_log(filename)
+    header_size = 64;
+    fields = {'time', 'px', 'py', 'phi', 'vx', 'vy', 'w', 'vl', 'vr'};
+
+    info = dir(filename);
+    count = floor((info.bytes - header_size) / (8 * numel(fields)));
+
+    log = memmapfile(filename, 'Offset', header_size, 'Repeat', count, ...
+                     'Format', {'double', [numel(fields) 1], 'record'});
+    records = [log.Data.record];
+
+    data = struct();
+    for idx = 1:numel(fields)
+        data.(fields{idx}) = records(idx, :)';
+    end
+end
@@ -0,0 +1,452 @@
+"""
+benchmark.py
+
+File times the simulation's hot paths and writes the results as JSON so runs can
+be compared between versions
+
+usage:
+------
+    python benchmark.py                              # print results
+    python benchmark.py -o results.json              # save results
+    python benchmark.py --compare baseline.json      # flag regressions against a saved run
+    python benchmark.py --quick --only kinematics    # smaller sizes, one group
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # rendering is timed without a window
+
+import argparse
+import datetime
+import gc
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+
+from model.robot_kinematics import RobotKinematics
+from model.batch_kinematics import BatchRobotKinematics
+from model.simulate import RobotSimulate
+from model.scenario import loadScenario, compileScenario
+from model.states import RobotState
+from model.trajectory import TrajectoryBuffer, trajectory_dtype
+from model.world import World, loadWorld
+from model.sensors import Lidar
+from model.planner import Planner, gridFromWorld
+from inputs.control_inputs import WheelLinearInputs
+from utilities.constants import *
+from utilities.constants import line_color
+
+results_version = 1 # bumped when the results layout changes
+
+def timeCall(func, number: int, repeat: int=5) -> float:
+    """
+    times a function, keeping the best of several repeats to filter out noise
+
+    inputs:
+    -------
+        func: function taking no arguments
+        number (int): calls per repeat
+        repeat (int): number of repeats
+
+    return:
+    -------
+        seconds (float): best time per call [s]
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+def result(name: str, value: float, unit: str, higher_is_better: bool=False, **params) -> dict:
+    """
+    formats one measurement
+
+    inputs:
+    -------
+        name (str): benchmark name
+        value (float): measured value
+        unit (str): value's unit
+        higher_is_better (bool): True for rates, False for costs
+        params: benchmark parameters (sizes, modes)
+
+    return:
+    -------
+        result (dict): measurement
+    """
+    return {"name": name, "params": params, "value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+### ----- benchmarks ----- ###
+def benchmarkKinematics(quick: bool) -> list[dict]:
+    """
+    steps per second of RobotKinematics.update and BatchRobotKinematics.update
+    """
+    results = []
+    steps = 20000 if quick else 200000
+    controls = WheelLinearInputs(vl=0.4, vr=0.6)
+
+    for integrator in ("midpoint", "exact", "rk4", "rk45"):
+        robot = RobotKinematics(dt=dt, integrator=integrator)
+        seconds = timeCall(lambda: robot.update(controls), steps, repeat=3)
+        results.append(result("kinematics.update", 1 / seconds, "steps/s", True, integrator=integrator))
+
+    # a closed square played segment by segment: rk45 takes sub-steps longer than dt on the edges
+    segments = [tuple(segment) for segment in compileScenario(loadScenario("square"), dt, L).tolist()
+                if segment[0] != math.inf]
+    for integrator in ("exact", "rk45"):
+        seconds = timeCall(lambda: RobotSimulate(integrator=integrator).playSegments(segments), 20 if quick else 100, repeat=3)
+        results.append(result("kinematics.playSegments", seconds * 1e3, "ms/run", integrator=integrator,
+                              segments=len(segments)))
+
+    for n in ((1000,) if quick else (1000, 10000)):
+        batch = BatchRobotKinematics(n, dt=dt)
+        batch_controls = WheelLinearInputs(vl=np.full(n, 0.4), vr=np.full(n, 0.6))
+        seconds = timeCall(lambda: batch.update(batch_controls), 200 if quick else 1000, repeat=3)
+        results.append(result("batch_kinematics.update", n / seconds, "robot-steps/s", True, robots=n))
+
+    return results
+
+def countAllocations(func, number: int) -> tuple[float, float]:
+    """
+    measures the memory a function allocates. Results are kept alive while counting,
+    so every object a call creates and returns is seen
+
+    inputs:
+    -------
+        func: function taking no arguments
+        number (int): calls to average over
+
+    return:
+    -------
+        blocks (float): memory blocks still allocated after each call
+        peak_bytes (float): peak traced memory of a single call [bytes]
+    """
+    kept = [None] * number
+    func() # warm up caches
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for idx in range(number):
+            kept[idx] = func()
+        blocks = (sys.getallocatedblocks() - before) / number
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        kept[0] = func()
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+
+    return blocks, float(peak_bytes)
+
+def benchmarkAllocations(quick: bool) -> list[dict]:
+    """
+    memory allocated by computeDerivative, integrateState and update per call
+    """
+    results = []
+    number = 10000 if quick else 100000
+    robot = RobotKinematics(dt=dt)
+    state = RobotState(px=1., py=2., phi=0.3)
+    dot = robot.computeDerivative(state=state, vl=0.4, vr=0.6)
+    new_state = RobotState()
+    controls = WheelLinearInputs(vl=0.4, vr=0.6)
+
+    calls = {"computeDerivative": lambda: robot.computeDerivative(state=state, vl=0.4, vr=0.6),
+             "computeDerivative_out": lambda: robot.computeDerivative(state=state, vl=0.4, vr=0.6, out=dot),
+             "integrateState": lambda: robot.integrateState(state=state, dot=dot),
+             "integrateState_out": lambda: robot.integrateState(state=state, dot=dot, out=new_state),
+             "update": lambda: robot.update(controls)}
+
+    for method, func in calls.items():
+        blocks, peak_bytes = countAllocations(func, number)
+        results.append(result(f"kinematics.{method}.blocks", blocks, "blocks/call"))
+        results.append(result(f"kinematics.{method}.peak_memory", peak_bytes, "bytes/call"))
+        results.append(result(f"kinematics.{method}.time", timeCall(func, number) * 1e6, "us/call"))
+
+    return results
+
+def benchmarkCanvas(quick: bool) -> list[dict]:
+    """
+    per-frame cost of RobotDisplay.updatePosition, Path.updatePath and drawing the
+    canvas as the trail grows
+    """
+    from PyQt5.QtWidgets import QApplication, QGraphicsScene
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtCore import QRectF
+    from display.robot_display import RobotDisplay
+    from display.path import Path
+
+    app = QApplication.instance() or QApplication([])
+
+    results = []
+    frames = 100 if quick else 300
+    lengths = (1000, 10000) if quick else (1000, 10000, 100000)
+
+    scene = QGraphicsScene(0, 0, 800, 600)
+    robot = RobotDisplay()
+    path = Path(line_color, 1.5)
+    scene.addItem(path)
+    scene.addItem(robot)
+    image = QImage(800, 600, QImage.Format_ARGB32_Premultiplied)
+    view = QRectF(-400, -300, 800, 600) # centered on the origin
+
+    # zig-zag circle: every point is kept by the path's thinning
+    def point(idx: int) -> tuple[float, float, float]:
+        angle = idx * 0.005
+        radius = 2.5 + 0.02 * (idx % 2)
+        return radius * math.cos(angle), radius * math.sin(angle), angle + math.pi / 2
+
+    drawn = 0
+    for length in lengths:
+        idx = np.arange(drawn, length)
+        radius = 2.5 + 0.02 * (idx % 2)
+        path.extendPath(radius * np.cos(idx * 0.005), radius * np.sin(idx * 0.005))
+        drawn = length
+
+        robot_seconds = path_seconds = render_seconds = 0.
+        for _ in range(frames):
+            x, y, phi = point(drawn)
+            drawn += 1
+
+            start = time.perf_counter()
+            robot.updatePosition(x, y, phi)
+            robot_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            path.updatePath(x, y)
+            path_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            painter = QPainter(image)
+            scene.render(painter, QRectF(image.rect()), view)
+            painter.end()
+            render_seconds += time.perf_counter() - start
+
+        results.append(result("robot_display.updatePosition", robot_seconds / frames * 1e6, "us/frame", trail_points=length))
+        results.append(result("path.updatePath", path_seconds / frames * 1e6, "us/frame", trail_points=length))
+        results.append(result("canvas.render", render_seconds / frames * 1e3, "ms/frame", trail_points=length))
+
+    return results
+
+def benchmarkPlotter(quick: bool) -> list[dict]:
+    """
+    cost of Plotter.update_plot as the recorded series grows
+    """
+    from PyQt5.QtWidgets import QApplication
+    from display.plotter import Plotter
+
+    app = QApplication.instance() or QApplication([])
+
+    results = []
+    lengths = (1000, 100000) if quick else (1000, 10000, 100000, 1000000)
+
+    for length in lengths:
+        records = np.zeros(length, dtype=trajectory_dtype)
+        records["time"] = np.arange(length) * dt
+        records["px"] = np.sin(records["time"])
+        records["py"] = np.cos(records["time"])
+        buffer = TrajectoryBuffer.fromRecords(records)
+
+        for window in (None, plot_window):
+            plot = Plotter("bench", "time [s]", "position [m]", buffer=buffer, fields=["px", "py"], window=window)
+            seconds = timeCall(plot.update_plot, 10 if quick else 20, repeat=3)
+            results.append(result("plotter.update_plot", seconds * 1e3, "ms/update",
+                                  series_length=length, window=window))
+
+    return results
+
+def benchmarkWorld(quick: bool) -> list[dict]:
+    """
+    time of one step of a fleet's world queries: index update, robot-robot and robot-map
+    collisions. Robots start on a jittered 1 m lattice between a grid of box obstacles
+    and drive straight, so a few change cell on every step
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    boxes = [[[x, y], [x + 1, y], [x + 1, y + 1], [x, y + 1]] for x in range(-50, 50, 5) for y in range(-50, 50, 5)]
+    world = World(boxes, bounds=(-60, -60, 60, 60))
+
+    for n in ((1000,) if quick else (1000, 10000)):
+        side = int(math.ceil(math.sqrt(n)))
+        lattice = np.arange(side) - side / 2 + 0.5
+        px = np.repeat(lattice, side)[:n] + rng.uniform(-0.1, 0.1, n)
+        py = np.tile(lattice, side)[:n] + rng.uniform(-0.1, 0.1, n)
+        phi = rng.uniform(-np.pi, np.pi, n)
+        world.updateRobots(px, py, phi)
+
+        def step():
+            px[:] += 0.01 * np.cos(phi)
+            py[:] += 0.01 * np.sin(phi)
+            world.updateRobots(px, py, phi)
+            world.robotCollisions()
+            world.obstacleCollisions()
+
+        seconds = timeCall(step, 20 if quick else 50, repeat=3)
+        results.append(result("world.step", seconds * 1e3, "ms/step", robots=n))
+
+    return results
+
+def benchmarkSensors(quick: bool) -> list[dict]:
+    """
+    time of one lidar scan of a whole fleet spread over the warehouse world
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    world = loadWorld("warehouse")
+
+    for n in ((100,) if quick else (100, 1000)):
+        fleet = BatchRobotKinematics(n)
+        fleet.setStates(rng.uniform(-9, 9, n), rng.uniform(-9, 9, n), rng.uniform(-np.pi, np.pi, n))
+        for beams in (16, 64):
+            lidar = Lidar(beams=beams, max_range=5.)
+            seconds = timeCall(lambda: lidar.scan(world, fleet), 20 if quick else 50, repeat=3)
+            results.append(result("lidar.scan", seconds * 1e3, "ms/scan", robots=n, beams=beams))
+
+    return results
+
+def benchmarkPlanner(quick: bool) -> list[dict]:
+    """
+    time of computing a cost-to-go field on the warehouse world and of re-planning a
+    fleet from the cached field
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    grid = gridFromWorld(loadWorld("warehouse"), resolution=0.1)
+
+    # two free goals taking turns in a one-field cache, so every call computes a field
+    goals = [np.ravel(grid.cellOf(0., -5.5)), np.ravel(grid.cellOf(-8., 8.))]
+    planner = Planner(grid, cache_size=1)
+    seconds = timeCall(lambda: planner.field(*goals[planner.misses % 2]), 5 if quick else 20, repeat=3)
+    results.append(result("planner.field", seconds * 1e3, "ms/field", cells=grid.rows * grid.columns))
+
+    planner = Planner(grid)
+    for n in ((50,) if quick else (50, 500)):
+        px, py = rng.uniform(-9, 9, n), rng.uniform(-9, 9, n)
+        planner.plan(px, py, 0., -5.5) # fills the cache
+        seconds = timeCall(lambda: planner.plan(px, py, 0., -5.5), 20 if quick else 50, repeat=3)
+        results.append(result("planner.plan", seconds * 1e3, "ms/plan", robots=n))
+
+    return results
+
+def benchmarkStartup(quick: bool) -> list[dict]:
+    """
+    time of a fresh interpreter importing the headless modules, numpy alone for reference
+    """
+    results = []
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+    for module in ("numpy", "model.simulate", "model.sweep", "inputs.controls"):
+        times = []
+        for _ in range(3 if quick else 7):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", f"import {module}"], cwd=root, check=True)
+            times.append(time.perf_counter() - start)
+        results.append(result("startup", min(times) * 1e3, "ms", module=module))
+
+    return results
+
+benchmarks = {"kinematics": benchmarkKinematics,
+              "allocations": benchmarkAllocations,
+              "canvas": benchmarkCanvas,
+              "plotter": benchmarkPlotter,
+              "world": benchmarkWorld,
+              "sensors": benchmarkSensors,
+              "planner": benchmarkPlanner,
+              "startup": benchmarkStartup}
+
+### ----- results ----- ###
+def gitCommit() -> str:
+    """
+    returns the commit being benchmarked, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """
+    finds the measurements that got worse than a baseline run by more than a tolerance
+
+    inputs:
+    -------
+        results (list[dict]): current measurements
+        baseline (list[dict]): measurements of the baseline run
+        tolerance (float): allowed relative slowdown, e.g. 0.2 for 20%
+
+    return:
+    -------
+        regressions (list[str]): one line per regression
+    """
+    key = lambda entry: (entry["name"], json.dumps(entry["params"], sort_keys=True))
+    previous = {key(entry): entry for entry in baseline}
+
+    regressions = []
+    for entry in results:
+        old = previous.get(key(entry))
+        if old is None or old["value"] == 0 or entry["value"] == 0:
+            continue
+
+        # > 1 means worse, whichever way the unit goes
+        ratio = old["value"] / entry["value"] if entry["higher_is_better"] else entry["value"] / old["value"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{entry['name']} {entry['params']}: {old['value']:.4g} -> "
+                               f"{entry['value']:.4g} {entry['unit']} ({(ratio - 1) * 100:.0f}% worse)")
+
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="times the simulation's hot paths")
+    parser.add_argument("-o", "--output", help="JSON file the results are written to")
+    parser.add_argument("--only", default=",".join(benchmarks), help="comma-separated benchmark groups to run")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast check")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown when comparing")
+    args = parser.parse_args()
+
+    results = []
+    for group in args.only.split(","):
+        if group not in benchmarks:
+            parser.error(f"unknown benchmark group: {group}")
+        for entry in benchmarks[group](args.quick):
+            print(f"{entry['name']:40} {entry['value']:>14.4g} {entry['unit']:14} {entry['params']}")
+            results.append(entry)
+
+    report = {"version": results_version,
+              "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+              "commit": gitCommit(),
+              "python": platform.python_version(),
+              "numpy": np.__version__,
+              "platform": platform.platform(),
+              "quick": args.quick,
+              "results": results}
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
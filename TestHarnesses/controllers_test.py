@@ -0,0 +1,110 @@
+"""
+controllers_test.py
+
+File checks that the heading and pose controllers converge, for a single robot and for a
+fleet, and that the fleet's commands match the single robot's
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.robot_kinematics import RobotKinematics
+from model.batch_kinematics import BatchRobotKinematics
+from model.states import RobotState
+from inputs.control_inputs import WheelLinearInputs
+from inputs.controls import *
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def testWrapAngle():
+    angles = np.linspace(-20., 20., 1001)
+    wrapped = wrapAngle(angles)
+    assert np.all(wrapped >= -np.pi) and np.all(wrapped < np.pi)
+    assert np.allclose(np.sin(wrapped), np.sin(angles)) and np.allclose(np.cos(wrapped), np.cos(angles))
+    assert wrapAngle(np.pi) == -np.pi and wrapAngle(0.5) == 0.5
+
+def testIntegralAndDerivative():
+    pi = PI(kp=1., ki=2., dt=0.1, limit=1.)
+    outputs = [pi.updateError(1.) for _ in range(10)]
+    # the integral term stops growing at the limit
+    assert np.allclose(outputs[:5], 1. + 2. * 0.1 * np.arange(1, 6)) and np.allclose(outputs[5:], 2.)
+    pi.reset()
+    assert pi.updateError(np.array([1., -1.])).tolist() == [1.2, -1.2]
+
+    pid = PID(kd=0.5, dt=0.1)
+    assert pid.update(1., 0.) == 0. and np.isclose(pid.update(3., 0.), 10.)
+    pid.reset()
+    assert pid.update(3., 0.) == 0.
+
+def testWheelLimits():
+    # scaled together, both wheels keep their ratio and so the turning radius
+    inputs = wheelInputs(np.array([2., 0.5, -3.]), np.array([4., 1., 0.]), 0.2, 1., WheelLinearInputs(vl=0., vr=0.))
+    assert np.all(np.maximum(np.abs(inputs.vl), np.abs(inputs.vr)) <= 1. + 1e-12)
+    assert np.allclose(inputs.vl / inputs.vr, [1.6 / 2.4, 0.4 / 0.6, 1.])
+    assert np.allclose((inputs.vl[1], inputs.vr[1]), (0.4, 0.6))
+
+    inputs = wheelInputs(5., 0., 0.2, None, WheelLinearInputs(vl=0., vr=0.))
+    assert (inputs.vl, inputs.vr) == (5., 5.)
+
+def testHeadingControllerConverges():
+    # goals on both sides, including across +/- pi where the short way wraps around
+    for start, goal in ((0., 2.5), (0., -2.5), (3., -3.), (-3., 3.), (1., 1.)):
+        robot = RobotKinematics(dt=0.01)
+        robot.setState(RobotState(phi=start))
+        controller = HeadingController()
+        turned = 0.
+        for _ in range(300):
+            phi = robot.getState().phi
+            robot.update(controller.update(goal, robot.getState()))
+            turned += abs(robot.getState().phi - phi)
+        assert abs(wrapAngle(goal - robot.getState().phi)) < 1e-6, (start, goal)
+        assert turned < abs(wrapAngle(goal - start)) + 1e-6, "turned the long way"
+
+def testBatchHeadingMatchesScalar():
+    n = 30
+    start, goal = rng.uniform(-np.pi, np.pi, n), rng.uniform(-np.pi, np.pi, n)
+    fleet = BatchRobotKinematics(n)
+    fleet.setStates(np.zeros(n), np.zeros(n), start)
+    fleet.run(3., ControllerSchedule(HeadingController(PID(kp=5., kd=0.05)), goal))
+    assert np.all(np.abs(wrapAngle(goal - fleet.phi)) < 1e-3)
+
+    for robot in range(0, n, 7):
+        single = RobotKinematics(dt=fleet.dt)
+        single.setState(RobotState(phi=start[robot]))
+        schedule = ControllerSchedule(HeadingController(PID(kp=5., kd=0.05)), goal[robot])
+        for step in range(300):
+            single.update(schedule(step * fleet.dt, single.getState()))
+        state = single.getState()
+        assert np.allclose((state.px, state.py, state.phi), fleet.state[:, robot], rtol=0., atol=1e-9), robot
+
+def testPoseControllerConverges():
+    # random start and goal poses, goals behind the robot included
+    n = 200
+    fleet = BatchRobotKinematics(n)
+    fleet.setStates(rng.uniform(-3., 3., n), rng.uniform(-3., 3., n), rng.uniform(-np.pi, np.pi, n))
+    goal = RobotState(px=rng.uniform(-3., 3., n), py=rng.uniform(-3., 3., n), phi=rng.uniform(-np.pi, np.pi, n))
+    fleet.run(30., ControllerSchedule(PoseController(tolerance=1e-5), goal))
+
+    assert np.all(np.hypot(goal.px - fleet.px, goal.py - fleet.py) <= 1e-5)
+    assert np.all(np.abs(wrapAngle(goal.phi - fleet.phi)) < 0.01)
+
+    # robots within tolerance stop
+    inputs = PoseController(tolerance=1e-5).update(goal, fleet)
+    assert not np.any(inputs.vl) and not np.any(inputs.vr)
+
+def testPoseControllerSingleRobot():
+    goal = RobotState(px=1., py=-2., phi=np.pi / 2)
+    controller = PoseController(tolerance=1e-4)
+    robot = RobotKinematics(dt=0.01)
+    robot.setState(RobotState(px=0., py=0., phi=0.))
+    for _ in range(3000):
+        inputs = controller.update(goal, robot.getState())
+        assert isinstance(inputs.vl, float) and max(abs(inputs.vl), abs(inputs.vr)) <= vmax + 1e-12
+        robot.update(inputs)
+    state = robot.getState()
+    assert np.hypot(goal.px - state.px, goal.py - state.py) <= 1e-4 and abs(wrapAngle(goal.phi - state.phi)) < 0.01
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,34 @@
+"""
+harness.py
+
+File runs the checks of a test harness. A check is a function whose name starts with
+"test" and that asserts; the same functions are collected by pytest
+"""
+import sys
+
+def runChecks(namespace: dict) -> None:
+    """
+    runs every check of a harness script in order, prints whether it passed and exits
+    with a non-zero status when any failed
+
+    inputs:
+    -------
+        namespace (dict): globals() of the harness script
+    """
+    failures = 0
+    for name, check in list(namespace.items()):
+        if not (name.startswith("test") and callable(check)):
+            continue
+
+        try:
+            check()
+            print(f"ok: {name}")
+        except AssertionError as error:
+            failures += 1
+            print(f"FAILED: {name}" + (f": {error}" if str(error) else ""))
+        except Exception as error:
+            failures += 1
+            print(f"FAILED: {name}: {type(error).__name__}: {error}")
+
+    print(f"\n{failures} check(s) failed" if failures else "\nall checks passed")
+    sys.exit(1 if failures else 0)
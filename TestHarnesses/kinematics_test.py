@@ -0,0 +1,207 @@
+"""
+kinematics_test.py
+
+File checks the fleet kinematics against the single robot kinematics, and the exact arc
+integration against the closed-form arc
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.robot_kinematics import RobotKinematics
+from model.batch_kinematics import BatchRobotKinematics
+from model.states import RobotState
+from inputs.control_inputs import WheelLinearInputs
+from utilities.constants import L
+from model.integrators import integrators, makeIntegrator
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def scalarRun(px: float, py: float, phi: float, vl: np.ndarray, vr: np.ndarray, dt: float) -> tuple:
+    """
+    steps one RobotKinematics through a sequence of wheel inputs
+    """
+    model = RobotKinematics(dt=dt)
+    model.setState(RobotState(px=px, py=py, phi=phi))
+    for left, right in zip(vl.tolist(), vr.tolist()):
+        model.update(WheelLinearInputs(vl=left, vr=right))
+    state, dot = model.getState(), model.getDotState()
+
+    return state.px, state.py, state.phi, dot.vx, dot.vy, dot.w
+
+def closedFormArc(px, py, phi, vl, vr, duration, wheel_base=L) -> tuple:
+    """
+    pose reached after holding constant wheel inputs: a circle of radius v / w, or a line
+    """
+    v, w = (vr + vl) / 2., (vr - vl) / wheel_base
+    if w == 0.:
+        return px + v * duration * np.cos(phi), py + v * duration * np.sin(phi), phi
+
+    return (px + v / w * (np.sin(phi + w * duration) - np.sin(phi)),
+            py - v / w * (np.cos(phi + w * duration) - np.cos(phi)),
+            phi + w * duration)
+
+def testBatchMatchesScalar():
+    n, steps, dt = 50, 200, 0.01
+    px, py, phi = rng.uniform(-5, 5, n), rng.uniform(-5, 5, n), rng.uniform(-np.pi, np.pi, n)
+    vl, vr = rng.uniform(-1, 1, (steps, n)), rng.uniform(-1, 1, (steps, n))
+
+    fleet = BatchRobotKinematics(n, dt=dt)
+    fleet.setStates(px, py, phi)
+    for step in range(steps):
+        fleet.update(WheelLinearInputs(vl=vl[step], vr=vr[step]))
+
+    for robot in range(n):
+        expected = scalarRun(px[robot], py[robot], phi[robot], vl[:, robot], vr[:, robot], dt)
+        found = (fleet.px[robot], fleet.py[robot], fleet.phi[robot], fleet.vx[robot], fleet.vy[robot], fleet.w[robot])
+        assert np.allclose(found, expected, rtol=0., atol=1e-12), f"robot {robot}"
+        assert (fleet.vl[robot], fleet.vr[robot]) == (vl[-1, robot], vr[-1, robot])
+
+def testSharedInputs():
+    # scalar inputs drive every robot the same way
+    fleet = BatchRobotKinematics(4, dt=0.02)
+    fleet.setStates(np.zeros(4), np.zeros(4), np.zeros(4))
+    for _ in range(100):
+        fleet.update(WheelLinearInputs(vl=0.3, vr=0.5))
+
+    expected = scalarRun(0., 0., 0., np.full(100, 0.3), np.full(100, 0.5), 0.02)
+    assert np.allclose(fleet.state, np.array(expected[:3])[:, None], rtol=0., atol=1e-12)
+
+def testSingleRobotAccess():
+    fleet = BatchRobotKinematics(3)
+    fleet.setState(1, RobotState(px=1., py=2., phi=3.))
+    fleet.update(WheelLinearInputs(vl=np.array([0., 0.2, 0.]), vr=np.array([0., 0.4, 0.])))
+
+    expected = scalarRun(1., 2., 3., np.array([0.2]), np.array([0.4]), fleet.dt)
+    state, dot, wheels = fleet.getState(1), fleet.getDotState(1), fleet.getWheelVelocities(1)
+    assert np.allclose((state.px, state.py, state.phi, dot.vx, dot.vy, dot.w), expected, rtol=0., atol=1e-12)
+    assert (wheels.vx, wheels.vy) == (0.2, 0.4)
+    assert fleet.getState(0).px == 0. and fleet.getState(2).phi == 0.
+
+    fleet.reset()
+    assert not fleet.state.any() and not fleet.dot.any() and not fleet.wheels.any()
+
+def testExactArcMatchesClosedForm():
+    # turns, straight lines, spins in place and reversing, stepped and in one call
+    for vl, vr in ((0.3, 0.5), (0.5, 0.5), (-0.4, 0.4), (-0.2, -0.7), (0., 31.41592653)):
+        expected = closedFormArc(0.5, -1., 0.7, vl, vr, 2.)
+
+        stepped = RobotKinematics(dt=0.01, integrator="exact")
+        stepped.setState(RobotState(px=0.5, py=-1., phi=0.7))
+        for _ in range(200):
+            stepped.update(WheelLinearInputs(vl=vl, vr=vr))
+        state = stepped.getState()
+        assert np.allclose((state.px, state.py, state.phi), expected, rtol=0., atol=1e-10), (vl, vr)
+
+        advanced = RobotKinematics(dt=0.01)
+        advanced.setState(RobotState(px=0.5, py=-1., phi=0.7))
+        advanced.advance(WheelLinearInputs(vl=vl, vr=vr), 2.)
+        state = advanced.getState()
+        assert np.allclose((state.px, state.py, state.phi), expected, rtol=0., atol=1e-12), (vl, vr)
+
+def testBatchAdvanceMatchesClosedForm():
+    n = 40
+    px, py, phi = rng.uniform(-5, 5, n), rng.uniform(-5, 5, n), rng.uniform(-np.pi, np.pi, n)
+    vl, vr = rng.uniform(-1, 1, n), rng.uniform(-1, 1, n)
+    vr[:5] = vl[:5] # straight lines
+
+    fleet = BatchRobotKinematics(n)
+    fleet.setStates(px, py, phi)
+    fleet.advance(WheelLinearInputs(vl=vl, vr=vr), 3.7)
+    expected = np.array([closedFormArc(*pose, 3.7) for pose in zip(px, py, phi, vl, vr)]).T
+    assert np.allclose(fleet.state, expected, rtol=0., atol=1e-12)
+
+    stepped = BatchRobotKinematics(n, dt=0.01, integrator="exact")
+    stepped.setStates(px, py, phi)
+    for _ in range(370):
+        stepped.update(WheelLinearInputs(vl=vl, vr=vr))
+    assert np.allclose(stepped.state, expected, rtol=0., atol=1e-10)
+
+def testMidpointConvergesToArc():
+    # the fixed-step update cuts turns short by about (w * dt)^2 / 24, so halving dt quarters the error
+    errors = []
+    for dt in (0.02, 0.01, 0.005):
+        model = RobotKinematics(dt=dt)
+        for _ in range(int(round(2. / dt))):
+            model.update(WheelLinearInputs(vl=0.1, vr=0.5))
+        state = model.getState()
+        errors.append(np.hypot(*np.subtract((state.px, state.py), closedFormArc(0., 0., 0., 0.1, 0.5, 2.)[:2])))
+    assert errors[0] > errors[1] > errors[2] and np.isclose(errors[0] / errors[1], 4., rtol=0.05)
+
+def testIntegratorsMatchClosedForm():
+    # gentle and tight turns, straight lines and spins in place, with a coarse step
+    for vl, vr in ((0.3, 0.5), (0.5, 0.5), (-0.4, 0.4), (-0.2, -0.7)):
+        expected = closedFormArc(0.5, -1., 0.7, vl, vr, 2.)
+        for integrator, tolerance in (("rk4", 1e-6), ("rk45", 1e-8)):
+            model = RobotKinematics(dt=0.1, integrator=integrator)
+            model.setState(RobotState(px=0.5, py=-1., phi=0.7))
+            for _ in range(20):
+                model.update(WheelLinearInputs(vl=vl, vr=vr))
+            state = model.getState()
+            assert np.allclose((state.px, state.py, state.phi), expected, rtol=0., atol=tolerance), (integrator, vl, vr)
+
+def testRK45Substeps():
+    # a straight line is crossed in one sub-step per update, a tight turn is split
+    straight = RobotKinematics(dt=0.1, integrator="rk45")
+    for _ in range(10):
+        straight.update(WheelLinearInputs(vl=0.5, vr=0.5))
+    assert straight.integrator.substeps == 10 and straight.integrator.rejected == 0
+
+    turn = RobotKinematics(dt=0.1, integrator="rk45")
+    for _ in range(10):
+        turn.update(WheelLinearInputs(vl=0.1, vr=0.9))
+    assert turn.integrator.substeps > 10
+
+def testRK4Order():
+    # a fourth order scheme: halving dt divides the error by 16
+    errors = []
+    for dt in (0.1, 0.05):
+        model = RobotKinematics(dt=dt, integrator="rk4")
+        for _ in range(int(round(2. / dt))):
+            model.update(WheelLinearInputs(vl=-0.2, vr=-0.7))
+        state = model.getState()
+        errors.append(np.hypot(*np.subtract((state.px, state.py), closedFormArc(0., 0., 0., -0.2, -0.7, 2.)[:2])))
+    assert np.isclose(errors[0] / errors[1], 16., rtol=0.05)
+
+def testMakeIntegrator():
+    for name, scheme in integrators.items():
+        integrator = makeIntegrator(name)
+        assert isinstance(integrator, scheme) and integrator.name == name
+        assert makeIntegrator(integrator) is integrator
+        assert isinstance(RobotKinematics(integrator=name).integrator, scheme)
+
+    try:
+        makeIntegrator("euler")
+        assert False, "an unknown integrator was made"
+    except ValueError:
+        pass
+
+def testRK45AdvanceTakesLongSubsteps():
+    # advance() hands RK45 the whole interval, so its sub-steps are longer than dt
+    for vl, vr in ((0.3, 0.5), (0.5, 0.5), (-0.4, 0.4)):
+        model = RobotKinematics(dt=0.01, integrator="rk45")
+        model.setState(RobotState(px=0.5, py=-1., phi=0.7))
+        model.advance(WheelLinearInputs(vl=vl, vr=vr), 3.)
+        state = model.getState()
+        assert np.allclose((state.px, state.py, state.phi), closedFormArc(0.5, -1., 0.7, vl, vr, 3.),
+                           rtol=0., atol=1e-8), (vl, vr)
+        assert model.integrator.substeps < 300, model.integrator.substeps
+
+def testZeroLengthStep():
+    # a zero-length interval leaves the state alone and reports the rates at its start
+    for name in integrators:
+        integrator = makeIntegrator(name)
+        dot = integrator.derivative(RobotState(px=1., py=2., phi=0.7), 0.3, 0.5, 0., L)
+        assert np.allclose((dot.vx, dot.vy, dot.w), (0.4 * np.cos(0.7), 0.4 * np.sin(0.7), 0.2 / L)), name
+
+        model = RobotKinematics(dt=0., integrator=name)
+        model.setState(RobotState(px=1., py=2., phi=0.7))
+        model.update(WheelLinearInputs(vl=0.3, vr=0.5))
+        model.advance(WheelLinearInputs(vl=0.3, vr=0.5), 0.)
+        state = model.getState()
+        assert (state.px, state.py, state.phi) == (1., 2., 0.7), name
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,173 @@
+"""
+occupancy_test.py
+
+File checks the tiled grids and the coverage and occupancy maps against cell-by-cell references
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.world import loadWorld, robot_footprint, transformFootprint
+from model.sensors import Lidar
+from model.occupancy import (TiledGrid, CoverageMap, OccupancyMap, packCells, unpackCells, uniqueCells,
+                             traceCells)
+from model.batch_kinematics import BatchRobotKinematics
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def referenceTrace(cx0: int, cy0: int, cx1: int, cy1: int) -> list:
+    """
+    cells of one segment, one per step along its longer axis, end cell left out
+    """
+    steps = max(abs(cx1 - cx0), abs(cy1 - cy0))
+
+    return [(cx0 + int(np.rint(k / steps * (cx1 - cx0))), cy0 + int(np.rint(k / steps * (cy1 - cy0))))
+            for k in range(steps)]
+
+def insideFootprint(x: np.ndarray, y: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    points on the inner side of every edge of a convex polygon, either winding
+    """
+    cross = [(x1 - x0) * (y - y0) - (y1 - y0) * (x - x0)
+             for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0))]
+
+    return np.all(np.array(cross) >= 0., axis=0) | np.all(np.array(cross) <= 0., axis=0)
+
+def testPackedCells():
+    ix, iy = rng.integers(-2**31, 2**31, 10000), rng.integers(-2**31, 2**31, 10000)
+    back_x, back_y = unpackCells(packCells(ix, iy))
+    assert np.array_equal(back_x, ix) and np.array_equal(back_y, iy)
+    keys = packCells(rng.integers(-50, 50, 10000), rng.integers(-50, 50, 10000))
+    assert np.array_equal(uniqueCells(keys), np.unique(keys))
+
+def testTiledGrid():
+    grid = TiledGrid(resolution=0.1, tile_size=16, dtype=np.float32, fill=0.)
+    reference = {}
+    for step in range(20):
+        ix, iy = rng.integers(-100, 100, 500), rng.integers(-100, 100, 500)
+        if step % 2:
+            grid.mark(ix, iy, step / 10)
+            reference.update({(x, y): step / 10 for x, y in zip(ix.tolist(), iy.tolist())})
+        else:
+            values = rng.uniform(-1, 1, 500)
+            grid.add(ix, iy, values, -3., 3.)
+            for x, y, value in zip(ix.tolist(), iy.tolist(), values.tolist()):
+                reference[(x, y)] = reference.get((x, y), 0.) + value
+            # clipped once all the additions of the call are in
+            for cell in set(zip(ix.tolist(), iy.tolist())):
+                reference[cell] = min(max(reference[cell], -3.), 3.)
+
+    qx, qy = rng.integers(-120, 120, 20000), rng.integers(-120, 120, 20000)
+    expected = np.array([reference.get(cell, 0.) for cell in zip(qx.tolist(), qy.tolist())])
+    assert np.allclose(grid.values(qx, qy), expected, atol=1e-5), f"values of {len(reference)} written cells"
+    assert grid.count() == sum(value != np.float32(0.) for value in np.float32(list(reference.values())))
+
+    cells, ix_min, iy_min = grid.dense()
+    rows, columns = np.nonzero(cells != 0.)
+    dense = {(int(column + ix_min), int(row + iy_min)): float(cells[row, column]) for row, column in zip(rows, columns)}
+    written = {cell: value for cell, value in reference.items() if np.float32(value) != 0.}
+    assert dense.keys() == written.keys(), "dense round trip"
+    assert np.allclose([dense[cell] for cell in written], list(written.values()), atol=1e-5)
+
+    # bounds hold every written cell, in whole tiles
+    ix_min, iy_min, ix_max, iy_max = grid.bounds()
+    cx, cy = np.array(list(reference)).T
+    assert cx.min() >= ix_min and cy.min() >= iy_min and cx.max() < ix_max and cy.max() < iy_max
+    assert (ix_max - ix_min) % grid.tile_size == 0
+
+def testTraceCells():
+    resolution = 0.05
+    x0, y0 = rng.uniform(-3, 3, 2000), rng.uniform(-3, 3, 2000)
+    x1, y1 = x0 + rng.normal(0., 1., 2000), y0 + rng.normal(0., 1., 2000)
+    x1[:100], y1[:100] = x0[:100], y0[:100] # zero-length segments
+    tx, ty, segment = traceCells(x0, y0, x1, y1, resolution)
+    traced = [[] for _ in range(len(x0))]
+    for x, y, s in zip(tx.tolist(), ty.tolist(), segment.tolist()):
+        traced[s].append((x, y))
+
+    start_x, start_y = np.floor(x0 / resolution).astype(int), np.floor(y0 / resolution).astype(int)
+    end_x, end_y = np.floor(x1 / resolution).astype(int), np.floor(y1 / resolution).astype(int)
+    walks = [referenceTrace(*cells) for cells in zip(start_x.tolist(), start_y.tolist(), end_x.tolist(), end_y.tolist())]
+    assert traced == walks
+
+    # 8-connected up to the end cell
+    assert all(max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+               for walk, end in zip(walks, zip(end_x.tolist(), end_y.tolist())) for a, b in zip(walk, walk[1:] + [end]))
+
+def testCoverageStamps():
+    for resolution in (0.02, 0.07):
+        coverage = CoverageMap(resolution=resolution, tile_size=32)
+        px, py, phi = rng.uniform(-2, 2, 60), rng.uniform(-2, 2, 60), rng.uniform(-np.pi, np.pi, 60)
+        coverage.stamp(px, py, phi, chunk=25)
+
+        # every cell whose center is inside a footprint
+        expected = set()
+        for polygon in transformFootprint(robot_footprint, px, py, phi):
+            low = np.floor(polygon.min(axis=0) / resolution).astype(int) - 1
+            high = np.floor(polygon.max(axis=0) / resolution).astype(int) + 2
+            cx, cy = np.meshgrid(np.arange(low[0], high[0]), np.arange(low[1], high[1]))
+            inside = insideFootprint((cx.ravel() + 0.5) * resolution, (cy.ravel() + 0.5) * resolution, polygon)
+            expected.update(zip(cx.ravel()[inside].tolist(), cy.ravel()[inside].tolist()))
+
+        cells, ix_min, iy_min = coverage.grid.dense()
+        rows, columns = np.nonzero(cells)
+        assert set(zip((columns + ix_min).tolist(), (rows + iy_min).tolist())) == expected, f"resolution {resolution}"
+
+def testCoverageInPieces():
+    # a trajectory added in pieces stamps the same poses as added at once
+    t = np.linspace(0., 10., 3001)
+    px, py, phi = np.cos(t) * (1 + 0.1 * t), np.sin(t), t
+    whole = CoverageMap(resolution=0.03)
+    stamps = whole.addPoses(px, py, phi)
+    pieces = CoverageMap(resolution=0.03)
+    split = np.sort(rng.choice(np.arange(1, len(t)), 20, replace=False))
+    pieces_stamps = sum(pieces.addPoses(x, y, p) for x, y, p in zip(np.split(px, split), np.split(py, split), np.split(phi, split)))
+    assert stamps == pieces_stamps and np.array_equal(whole.grid.dense()[0], pieces.grid.dense()[0])
+
+def testOccupancyScans():
+    world = loadWorld("warehouse")
+    lidar = Lidar(beams=90, max_range=4.)
+    occupancy = OccupancyMap(resolution=0.1, tile_size=16)
+    fleet = BatchRobotKinematics(5)
+    reference = {}
+    for scan in range(12):
+        fleet.px[:] = rng.uniform(-9, 9, 5)
+        fleet.py[:] = rng.uniform(-9, 9, 5)
+        fleet.phi[:] = rng.uniform(-np.pi, np.pi, 5)
+        distance = lidar.scan(world, fleet)
+        occupancy.addScan(lidar, distance, fleet)
+
+        # beam by beam: crossed cells are free, the hit cell just past the end is occupied
+        end_x, end_y = lidar.points(distance, fleet)
+        nudged_x, nudged_y = lidar.points(distance + occupancy.resolution * 1e-3, fleet)
+        crossed, hits = set(), set()
+        for robot in range(5):
+            start = (int(np.floor(fleet.px[robot] / 0.1)), int(np.floor(fleet.py[robot] / 0.1)))
+            for beam in range(lidar.beams):
+                end = (int(np.floor(end_x[robot, beam] / 0.1)), int(np.floor(end_y[robot, beam] / 0.1)))
+                crossed.update(referenceTrace(*start, *end))
+                if distance[robot, beam] < lidar.max_range:
+                    hits.add((int(np.floor(nudged_x[robot, beam] / 0.1)), int(np.floor(nudged_y[robot, beam] / 0.1))))
+
+        for cell in crossed - hits:
+            reference[cell] = max(reference.get(cell, 0.) + occupancy.free, -occupancy.limit)
+        for cell in hits:
+            reference[cell] = min(reference.get(cell, 0.) + occupancy.occupied, occupancy.limit)
+
+    cx, cy = np.array(list(reference)).T
+    assert np.allclose(occupancy.grid.values(cx, cy), list(reference.values()), atol=1e-4), f"{len(reference)} cells"
+    assert occupancy.grid.count() == np.count_nonzero(np.float32(list(reference.values())))
+    probability = occupancy.probability((cx + 0.5) * 0.1, (cy + 0.5) * 0.1)
+    assert np.allclose(probability, 1. / (1. + np.exp(-np.array(list(reference.values())))), atol=1e-4)
+
+def testAddLeavesOtherCellsAlone():
+    # cells set by mark() outside the bounds keep their values when add() clips its tile
+    grid = TiledGrid(resolution=0.1, tile_size=16, dtype=np.float32, fill=0.)
+    grid.mark(np.array([0, 5]), np.array([0, 5]), 10.)
+    grid.add(np.array([1, 2, 2]), np.array([1, 2, 2]), np.array([5., 2., 2.]), -3., 3.)
+    assert grid.values(np.array([0, 5, 1, 2]), np.array([0, 5, 1, 2])).tolist() == [10., 10., 3., 3.]
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,166 @@
+"""
+planner_test.py
+
+File checks the cost-to-go fields and planned paths against a cell-by-cell Dijkstra search and A*
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.world import loadWorld
+from model.planner import PlanningGrid, Planner, gridFromWorld, aStar, moves, move_costs
+
+import heapq
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def legalMove(grid: PlanningGrid, a: tuple, b: tuple) -> bool:
+    """
+    one 8-connected move between free cells that does not cut a blocked corner
+    """
+    def free(ix, iy):
+        return 0 <= ix < grid.columns and 0 <= iy < grid.rows and not grid.blocked[iy, ix]
+
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if max(abs(dx), abs(dy)) != 1 or not free(*a) or not free(*b):
+        return False
+
+    return not (dx and dy) or (free(a[0] + dx, a[1]) and free(a[0], a[1] + dy))
+
+def dijkstra(grid: PlanningGrid, goal_ix: int, goal_iy: int) -> np.ndarray:
+    """
+    cost to go of every cell, one cell popped at a time
+    """
+    cost = np.full((grid.rows, grid.columns), np.inf)
+    cost[goal_iy, goal_ix] = 0.
+    queue = [(0., (goal_ix, goal_iy))]
+    while queue:
+        g, cell = heapq.heappop(queue)
+        if g > cost[cell[1], cell[0]]:
+            continue
+        for (dx, dy), step in zip(moves.tolist(), move_costs.tolist()):
+            neighbor = (cell[0] + dx, cell[1] + dy)
+            if legalMove(grid, cell, neighbor) and g + step < cost[neighbor[1], neighbor[0]] - 1e-12:
+                cost[neighbor[1], neighbor[0]] = g + step
+                heapq.heappush(queue, (g + step, neighbor))
+
+    return cost
+
+def cellPath(grid: PlanningGrid, path: np.ndarray) -> list:
+    """
+    cells holding the waypoints of an unsimplified path
+    """
+    ix, iy = grid.cellOf(path[:, 0], path[:, 1])
+
+    return list(zip(ix.tolist(), iy.tolist()))
+
+def pathLength(grid: PlanningGrid, cells: list) -> float:
+    """
+    length of a path through the cells' centers [m]
+    """
+    x, y = grid.cellCenter(*np.array(cells, dtype=float).reshape(-1, 2).T)
+
+    return float(np.sum(np.hypot(np.diff(x), np.diff(y))))
+
+def randomGrid(rows: int, columns: int, density: float) -> PlanningGrid:
+    """
+    grid with random blocks and walls, away from the origin
+    """
+    blocked = rng.random((rows, columns)) < density
+    blocked[rows // 3, :columns - 3] = True
+    blocked[2 * rows // 3, 3:] = True
+
+    return PlanningGrid(blocked, resolution=0.25, origin=(-3.1, 1.7))
+
+def checkGrid(grid: PlanningGrid, goals: int, starts: int) -> None:
+    """
+    compares the planner's fields and paths on a grid with Dijkstra and A*
+    """
+    planner = Planner(grid)
+    free_y, free_x = np.nonzero(~grid.blocked)
+    for _ in range(goals):
+        goal = rng.integers(len(free_x))
+        goal_x, goal_y = grid.cellCenter(free_x[goal], free_y[goal])
+        expected = dijkstra(grid, free_x[goal], free_y[goal])
+        field = planner.field(free_x[goal], free_y[goal])
+        ix, iy = np.meshgrid(np.arange(grid.columns), np.arange(grid.rows))
+        assert np.allclose(field.costToGo(ix, iy), expected, rtol=0., atol=1e-9), \
+            f"field to ({free_x[goal]}, {free_y[goal]})"
+
+        # random start positions, blocked and outside ones included
+        xmin, ymin = grid.origin_x, grid.origin_y
+        px = rng.uniform(xmin - 0.5, xmin + grid.columns * grid.resolution + 0.5, starts)
+        py = rng.uniform(ymin - 0.5, ymin + grid.rows * grid.resolution + 0.5, starts)
+        costs = planner.costToGo(px, py, goal_x, goal_y)
+        plans = planner.plan(px, py, goal_x, goal_y, simplify=False)
+        for k in range(starts):
+            path = aStar(grid, px[k], py[k], goal_x, goal_y, simplify=False)
+            if not np.isfinite(costs[k]):
+                assert len(path) == 0 and len(plans.path(k)) == 0, f"start {k} is unreachable"
+                continue
+
+            # costToGo, plan and aStar agree, and planned paths only take legal moves
+            a_cells, cells = cellPath(grid, path), cellPath(grid, plans.path(k))
+            assert np.isclose(pathLength(grid, a_cells), costs[k]) and np.isclose(pathLength(grid, cells), costs[k])
+            assert cells[0] == tuple(v[0] for v in grid.cellOf(px[k], py[k]))
+            assert all(legalMove(grid, a, b) for a, b in zip(cells, cells[1:])), f"start {k}"
+
+def testRandomGrids():
+    checkGrid(randomGrid(30, 45, 0.1), goals=3, starts=40)
+    checkGrid(randomGrid(40, 25, 0.25), goals=3, starts=40)
+
+def testWarehouse():
+    world = loadWorld("warehouse")
+    grid = gridFromWorld(world, resolution=0.25)
+    checkGrid(grid, goals=2, starts=30)
+
+    # simplified paths sampled densely stay clear of the obstacles by the robot's radius
+    planner = Planner(grid)
+    free_y, free_x = np.nonzero(~grid.blocked)
+    picked = rng.integers(len(free_x), size=40)
+    px, py = grid.cellCenter(free_x[picked], free_y[picked])
+    px, py = px + rng.uniform(-0.1, 0.1, 40), py + rng.uniform(-0.1, 0.1, 40)
+    plans = planner.plan(px, py, 0.3, -8.6)
+    planned = 0
+    for k in range(len(plans)):
+        path = plans.path(k)
+        if len(path) < 2:
+            continue
+        planned += 1
+        fraction = np.linspace(0., 1., 50)[:, None]
+        x = (path[:-1, 0] + fraction * np.diff(path[:, 0])).ravel()
+        y = (path[:-1, 1] + fraction * np.diff(path[:, 1])).ravel()
+        assert not world.occupied(x, y).any(), f"path {k}"
+    assert planned > 0
+
+def testInvalidation():
+    grid = PlanningGrid(np.zeros((30, 30), dtype=bool), resolution=0.25, origin=(-3.1, 1.7))
+    planner = Planner(grid, cache_size=2)
+    start_x, start_y = grid.cellCenter(0, 15)
+    goal_x, goal_y = grid.cellCenter(29, 15)
+    first = planner.plan(start_x, start_y, goal_x, goal_y, simplify=False).path(0)
+    planner.plan(start_x, start_y, goal_x, goal_y)
+    assert planner.hits == 1 and planner.misses == 1, "a second plan to the same goal is a cache hit"
+
+    # block the middle of the path: the next plan recomputes the field and goes around
+    middle = first[len(first) // 2]
+    changed = grid.block(np.full(3, middle[0]), middle[1] + np.array([-0.25, 0., 0.25]))
+    second = planner.plan(start_x, start_y, goal_x, goal_y, simplify=False).path(0)
+    cells = cellPath(grid, second)
+    assert changed > 0 and planner.misses == 2
+    assert len(second) > 0 and all(legalMove(grid, a, b) for a, b in zip(cells, cells[1:]))
+    expected = dijkstra(grid, 29, 15)
+    assert np.isclose(planner.costToGo(start_x, start_y, goal_x, goal_y)[0], expected[15, 0] * grid.resolution)
+
+    # blocking cells that are already blocked changes nothing
+    version = grid.version
+    assert grid.block(middle[0:1], middle[1:2]) == 0 and grid.version == version
+
+    # least-recently-used goals are dropped from the cache
+    for gx in range(3):
+        planner.field(gx, 0)
+    assert len(planner.fields) == 2 and (29, 15) not in planner.fields
+
+if __name__ == "__main__":
+    runChecks(globals())
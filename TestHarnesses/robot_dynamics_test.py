@@ -8,7 +8,7 @@ import sys
 sys.path.append("..")
 
 from model.robot_kinematics   import RobotKinematics
-from inputs.control_inputs  import ControlInputs
+from inputs.control_inputs  import WheelLinearInputs
 from model.states           import RobotState, RobotDerivativeState
 
 import matplotlib.pyplot as plt
@@ -18,11 +18,11 @@ dynamics = RobotKinematics()
 expected = RobotKinematics()
 
 ### Testing derivative states ###
-inputs = ControlInputs(10, 10)
+inputs = WheelLinearInputs(10, 10)
 expected.setDotState(RobotDerivativeState(vx=10.0, vy=0.0, r_rate=0.0))
 print('Initial derivative state: ', dynamics.getDotState())
 print('~~~ Inserting inputs ~~~')
-dynamics.setDotState(dynamics.computeDerivative(dynamics.getState().phi, inputs.vl, inputs.vr))
+dynamics.setDotState(dynamics.computeDerivative(dynamics.getState(), inputs.vl, inputs.vr))
 print('Expected derivative state: ', expected.getDotState())
 print('Actual derivative state: ', dynamics.getDotState())
 
@@ -38,7 +38,7 @@ x = np.zeros(shape=np.shape(time))
 y = np.zeros(shape=np.shape(time))
 vy = np.zeros(shape=np.shape(time))
 phi = np.zeros(shape=np.shape(time))
-inputs = ControlInputs(vl=1, vr=0)
+inputs = WheelLinearInputs(vl=1, vr=0)
 
 for i in range(1, len(time)):
     dynamics.update(inputs) # update the states
@@ -0,0 +1,125 @@
+"""
+scenario_test.py
+
+File checks the compiled scenario files against hand-written segments, and the timeline
+playback against the segments' durations
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.scenario import evaluate, loadScenario, scenarioNames, compileScenario, Timeline
+
+import math
+import numpy as np
+
+dt, L = 0.01, 0.2
+
+def raises(call, *args, **kwargs) -> bool:
+    """
+    True when the call raises ValueError
+    """
+    try:
+        call(*args, **kwargs)
+    except ValueError:
+        return True
+
+    return False
+
+def testSquareSegments():
+    segments = compileScenario(loadScenario("square"), dt, L)
+    turn = (dt, 0., 2 * math.pi / 4 * L / dt)
+    expected = 4 * [(3., 0.5, 0.5), turn] + [(math.inf, 0., 0.)]
+    assert segments.shape == (9, 3)
+    assert np.allclose(segments, expected, rtol=1e-15, atol=0.)
+
+    # one step of the turn rotates by a quarter turn
+    assert np.isclose(segments[1, 2] / L * dt, math.pi / 2)
+
+def testOverrides():
+    segments = compileScenario(loadScenario("square"), 0.02, 0.5, edges=6, edge_time="edges / 6", edge_speed=0.25)
+    assert len(segments) == 13
+    assert np.allclose(segments[0:12:2], (1., 0.25, 0.25))
+    assert np.allclose(segments[1:12:2], (0.02, 0., 2 * math.pi / 6 * 0.5 / 0.02))
+
+    assert raises(compileScenario, loadScenario("square"), dt, L, sides=6)
+
+def testNGonSegments():
+    segments = compileScenario(loadScenario("n-gon"), dt, L, n=5)
+    turn = 2 * math.pi / 5 * L / dt
+    assert len(segments) == 2 * 5 + 1
+    assert np.allclose(segments[1:8:2], (dt, 0., turn)) and np.allclose(segments[9], (dt, 0., turn / 2))
+    assert np.allclose(segments[0:10:2], (0.25, 5., 5.))
+
+    # booleans are 0 or 1 in expressions
+    assert np.allclose(segments[-1], (math.inf, 6., 6.5945))
+    assert np.array_equal(compileScenario(loadScenario("n-gon"), dt, L, circumcircle=False)[-1], (math.inf, 0., 0.))
+
+def testEveryScenarioCompiles():
+    names = scenarioNames()
+    assert {"square", "hexagon", "straight", "n-gon"} <= set(names)
+    for name in names:
+        segments = compileScenario(loadScenario(name), dt, L)
+        assert segments.ndim == 2 and segments.shape[1] == 3 and np.all(segments[:, 0] > 0.), name
+
+    assert raises(loadScenario, "no such scenario")
+
+def testExpressions():
+    names = {"a": 2., "b": 3.}
+    assert evaluate("a * b + 1", names) == 7. and evaluate("-a ** b", names) == -8.
+    assert evaluate("sqrt(max(a, b) * 3)", names) == 3. and evaluate(4, names) == 4.
+    assert evaluate(True, names) == 1. and evaluate(None, names) == math.inf
+
+    for expression in ("c + 1", "__import__('os')", "a if b else 1", "[a]", "a.real", "abs(a, key=b)", "'a'"):
+        assert raises(evaluate, expression, names), expression
+
+def testTimelineItems():
+    scenario = {"parameters": {"k": 2},
+                "timeline": [{"duration": 0, "vl": 9, "vr": 9},
+                             {"repeat": "k", "timeline": [{"duration": "k / 10", "vl": 1, "vr": "k"},
+                                                          {"repeat": 0, "timeline": [{"duration": 1, "vl": 9, "vr": 9}]}]},
+                             {"duration": None, "vl": -1, "vr": 1}]}
+    segments = compileScenario(scenario, dt, L)
+    assert np.array_equal(segments, [(0.2, 1., 2.), (0.2, 1., 2.), (math.inf, -1., 1.)])
+
+    assert compileScenario({"timeline": []}).shape == (0, 3)
+
+def testTimelinePlayback():
+    segments = np.array([(0.05, 1., 2.), (0.001, 3., 4.), (0.02, 5., 6.)])
+    timeline = Timeline(segments, dt)
+    assert len(timeline) == 3 and timeline.steps == [5, 1, 2]
+
+    # each segment lasts its duration in steps, at least one, then the wheels stop
+    inputs = []
+    for _ in range(8):
+        assert not timeline.finished
+        step = timeline.next()
+        inputs.append((step.vl, step.vr))
+    assert inputs == 5 * [(1., 2.)] + [(3., 4.)] + 2 * [(5., 6.)] and timeline.finished
+    step = timeline.next()
+    assert (step.vl, step.vr) == (0., 0.) and timeline.finished
+
+    timeline.reset()
+    assert not timeline.finished and timeline.next().vl == 1.
+
+def testForeverSegment():
+    timeline = Timeline(compileScenario(loadScenario("straight"), dt, L), dt)
+    assert timeline.steps == [-1]
+    for _ in range(1000):
+        step = timeline.next()
+        assert (step.vl, step.vr) == (0.5, 0.5) and not timeline.finished
+
+def testClosedShapesStop():
+    # once the shape is closed the robot stays at the closing pose
+    for name in ("square", "hexagon"):
+        segments = compileScenario(loadScenario(name), dt, L)
+        assert np.array_equal(segments[-1], (math.inf, 0., 0.)), name
+        timeline = Timeline(segments, dt)
+        for _ in range(int(segments[:-1, 0].sum() / dt + 0.5)):
+            timeline.next()
+        for _ in range(100):
+            step = timeline.next()
+            assert (step.vl, step.vr) == (0., 0.), name
+
+if __name__ == "__main__":
+    runChecks(globals())
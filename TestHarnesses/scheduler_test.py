@@ -0,0 +1,120 @@
+"""
+scheduler_test.py
+
+File checks the fixed-rate scheduler against a fake clock that is moved by hand
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.scheduler import FixedRateScheduler
+
+import numpy as np
+
+dt = 1. / 64. # exact in binary, so due() never rounds a step away
+
+class FakeClock:
+    """
+    clock that only moves when told to
+    """
+    def __init__(self, now: float=100.) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+def testNothingDueWhileStopped():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, clock=clock)
+    clock.advance(1.)
+    assert scheduler.due() == 0 and scheduler.lag() == 0.
+
+def testStepsFollowWallTime():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, max_steps=10, clock=clock)
+    scheduler.start()
+    assert scheduler.due() == 0
+
+    # ticks at a different rate than the physics: steps handed out always add up to wall time
+    ticks = np.random.default_rng(0).uniform(0., 5 * dt, 500)
+    total = 0
+    for tick in ticks:
+        clock.advance(tick)
+        steps = scheduler.due()
+        assert 0 <= steps <= 10
+        total += steps
+        assert total == int((clock.now - 100.) / dt), "no step is lost or gained"
+        assert 0. <= scheduler.lag() < dt
+    assert scheduler.summary()["overruns"] == 0 and scheduler.steps == total
+
+def testLateTickCatchesUp():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, max_steps=10, clock=clock)
+    scheduler.start()
+    clock.advance(dt)
+    assert scheduler.due() == 1
+
+    # a tick that comes 7 steps late runs all of them at once
+    clock.advance(7 * dt)
+    assert scheduler.due() == 7 and scheduler.due() == 0
+    clock.advance(0.5 * dt)
+    assert scheduler.due() == 0 and np.isclose(scheduler.lag(), 0.5 * dt)
+    clock.advance(0.5 * dt)
+    assert scheduler.due() == 1
+
+def testOverrunSkipsTheExcess():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, max_steps=10, clock=clock)
+    scheduler.start()
+    clock.advance(25 * dt)
+    assert scheduler.due() == 10
+
+    # the 15 excess steps are never owed again
+    summary = scheduler.summary()
+    assert summary["overruns"] == 1 and summary["skipped"] == 15 and summary["max_backlog"] == 25
+    assert summary["skipped_time"] == 15 * dt
+    assert scheduler.due() == 0 and scheduler.lag() == 0.
+    clock.advance(3 * dt)
+    assert scheduler.due() == 3 and scheduler.summary()["overruns"] == 1
+
+def testPauseIsNotCaughtUp():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, clock=clock)
+    scheduler.start()
+    clock.advance(4 * dt)
+    assert scheduler.due() == 4
+
+    scheduler.stop()
+    clock.advance(100.)
+    assert scheduler.due() == 0 and scheduler.steps == 4
+
+    scheduler.start()
+    assert scheduler.due() == 0
+    clock.advance(2 * dt)
+    assert scheduler.due() == 2 and scheduler.summary()["skipped"] == 0
+
+def testReset():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(dt, max_steps=5, clock=clock)
+    scheduler.start()
+    clock.advance(12 * dt)
+    scheduler.due()
+    scheduler.reset()
+    assert scheduler.summary() == {"steps": 0, "overruns": 0, "skipped": 0, "skipped_time": 0., "max_backlog": 0}
+
+    # a running scheduler starts over from now
+    assert scheduler.due() == 0
+    clock.advance(3 * dt)
+    assert scheduler.due() == 3
+
+    # a stopped one stays stopped
+    scheduler.stop()
+    scheduler.reset()
+    clock.advance(3 * dt)
+    assert scheduler.due() == 0
+
+if __name__ == "__main__":
+    runChecks(globals())
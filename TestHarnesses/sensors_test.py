@@ -0,0 +1,81 @@
+"""
+sensors_test.py
+
+File checks the range sensors' bucketed ray casting against brute force over every obstacle edge
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.world import World, loadWorld
+from model.sensors import RangeSensor, Lidar
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def bruteCast(sensor: RangeSensor, world: World, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    intersects every beam with every edge: p + t * d = a + u * e with
+    t = ((a - p) x e) / (d x e) and u = ((a - p) x d) / (d x e)
+    """
+    ox, oy, dx, dy = sensor.rays(px, py, phi)
+    x0, y0, x1, y1 = (column[None, :] for column in world.edges.T)
+    ex, ey = x1 - x0, y1 - y0
+    ax, ay = x0 - ox[:, None], y0 - oy[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = dx[:, None] * ey - dy[:, None] * ex
+        t = (ax * ey - ay * ex) / denominator
+        u = (ax * dy[:, None] - ay * dx[:, None]) / denominator
+    hit = (t >= 0.) & (t < sensor.max_range) & (u >= -1e-9) & (u <= 1. + 1e-9)
+
+    return np.where(hit, t, sensor.max_range).min(axis=1, initial=sensor.max_range)
+
+def castMatches(sensor: RangeSensor, world: World, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> bool:
+    """
+    True when a cast matches brute force
+    """
+    distance = sensor.cast(world, px, py, phi)
+    expected = bruteCast(sensor, world, px, py, phi)
+
+    return distance.shape == expected.shape and np.allclose(distance, expected, rtol=0., atol=1e-9)
+
+def randomPoses(m: int) -> tuple:
+    """
+    robot poses spread over the warehouse
+    """
+    return rng.uniform(-9.7, 9.7, m), rng.uniform(-9.7, 9.7, m), rng.uniform(-np.pi, np.pi, m)
+
+def testWarehouse():
+    warehouse = loadWorld("warehouse")
+    for m in (1, 17, 200):
+        px, py, phi = randomPoses(m)
+        for beams in (1, 7, 64, 360):
+            assert castMatches(Lidar(beams=beams, max_range=5.), warehouse, px, py, phi), f"{m} robots, {beams} beams"
+            assert castMatches(Lidar(beams=beams, fov=np.radians(120.), max_range=3.), warehouse, px, py, phi), \
+                f"{m} robots, {beams} beams, 120 deg"
+
+def testAxisAlignedHeadings():
+    # beams running parallel to the walls
+    px, py, _ = randomPoses(40)
+    phi = rng.choice([0., np.pi / 2, np.pi, -np.pi / 2], 40)
+    assert castMatches(Lidar(beams=36, max_range=8.), loadWorld("warehouse"), px, py, phi)
+
+def testFineGridLongRange():
+    # finer grid and longer range than a cell
+    assert castMatches(Lidar(beams=90, max_range=12.), loadWorld("warehouse", cell_size=0.37), *randomPoses(50))
+
+def testCustomWorld():
+    obstacles = [[[0, 0], [4, 0], [4, 4], [2, 1], [0, 4]], [[1, -1], [3, -1], [3, 2], [1, 2]],
+                 [[-3, -3], [-2, -3.5], [-1.5, -2], [-2.5, -1]]]
+    custom = World(obstacles, bounds=(-4, -4, 5, 5), cell_size=0.5)
+    sonars = RangeSensor(rng.uniform(-np.pi, np.pi, 12), max_range=2.5)
+    px, py, phi = rng.uniform(-4, 5, 300), rng.uniform(-4, 5, 300), rng.uniform(-np.pi, np.pi, 300)
+    assert castMatches(sonars, custom, px, py, phi), "12 random sonars"
+    assert castMatches(Lidar(beams=100, max_range=6.), custom, px, py, phi), "lidar"
+
+    # the sensor rebuilds its edge buckets when handed another world
+    assert castMatches(sonars, loadWorld("warehouse"), *randomPoses(50)), "same sensor back on the warehouse"
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,64 @@
+"""
+sweep_test.py
+
+File checks how headless runs take their parameters, and that a sweep returns the same
+results as running each parameter set on its own
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.sweep import default_parameters, parameterGrid, scenarioSegments, runScenario, sweep
+
+import math
+import numpy as np
+
+def raises(call, *args, **kwargs) -> bool:
+    """
+    True when the call raises ValueError
+    """
+    try:
+        call(*args, **kwargs)
+    except ValueError:
+        return True
+
+    return False
+
+def testDeclaredParameters():
+    segments, closed_time = scenarioSegments({**default_parameters, "shape": "n-gon", "n": 5, "edge_time": 0.5})
+    assert len(segments) == 2 * 5 + 1 and np.allclose(segments[0:10:2, 0], 0.5)
+    assert math.isclose(closed_time, 5 * 0.5 + 5 * default_parameters["dt"])
+
+    metrics = runScenario({"shape": "n-gon", "n": 5, "edge_time": 0.5})
+    assert metrics["steps"] == round(closed_time / default_parameters["dt"])
+
+def testUndeclaredParameters():
+    # a parameter the scenario does not declare, or a typo, is an error rather than ignored
+    assert raises(runScenario, {"shape": "square", "n": 5})
+    assert raises(runScenario, {"shape": "straight", "edge_time": 1.})
+    assert raises(runScenario, {"shape": "square", "edge_tme": 1.})
+
+    # None leaves a parameter unset, whatever the scenario
+    assert runScenario({"shape": "square", "n": None, "circumcircle": None})["steps"] > 0
+
+def testDurations():
+    # a closed square ends where it started, an open-ended drive uses the scenario's duration
+    square = runScenario({"shape": "square", "integrator": "exact"})
+    assert square["steps"] == 4 * 301 and square["closure_error"] < 1e-9
+    # the center of a robot turning on one wheel moves by half that wheel's travel: pi * L over the four turns
+    assert math.isclose(square["path_length"], 4 * 3. * 0.5 + math.pi * default_parameters["L"])
+
+    straight = runScenario({"shape": "straight"})
+    assert straight["steps"] == 1000 and math.isclose(straight["final_px"], 10. * 0.5)
+    assert runScenario({"shape": "straight", "duration": 2.})["steps"] == 200
+
+def testSweepMatchesRuns():
+    parameter_sets = parameterGrid(shape=["square", "hexagon"], L=[0.2, 0.3], integrator=["midpoint", "rk4"])
+    assert len(parameter_sets) == 8 and parameter_sets[1] == {"shape": "square", "L": 0.2, "integrator": "rk4"}
+
+    results = sweep(parameter_sets, workers=2)
+    for parameters, result in zip(parameter_sets, results):
+        assert result == {**parameters, **runScenario(parameters)}, parameters
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,146 @@
+"""
+trajectory_io_test.py
+
+File checks that trajectories written to binary logs and text files read back unchanged
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.trajectory import TrajectoryBuffer, trajectory_dtype
+from model.states import RobotState, RobotDerivativeState
+from utilities.trajectory_io import *
+
+import os
+import tempfile
+import numpy as np
+
+rng = np.random.default_rng(0)
+folder = tempfile.mkdtemp()
+
+def randomTrajectory(n: int) -> TrajectoryBuffer:
+    """
+    trajectory of random samples with increasing times
+    """
+    records = np.zeros(n, dtype=trajectory_dtype)
+    for field in trajectory_dtype.names:
+        records[field] = rng.normal(size=n)
+    records["time"] = np.arange(n) * 0.01
+
+    trajectory = TrajectoryBuffer(n)
+    trajectory.extend(records)
+
+    return trajectory
+
+def testLogRoundTrip():
+    trajectory = randomTrajectory(5000)
+    filename = os.path.join(folder, "run.trj")
+    saveLog(trajectory, filename)
+
+    records = readLog(filename)
+    assert isinstance(records, np.memmap), "records are memory-mapped"
+    assert np.array_equal(records, trajectory.records)
+    assert os.path.getsize(filename) == log_header_dtype.itemsize + 5000 * log_record_dtype.itemsize
+
+    loaded = loadLog(filename)
+    assert len(loaded) == 5000
+    assert np.array_equal(loaded.records, trajectory.records)
+    assert all(np.array_equal(loaded[field], trajectory[field]) for field in trajectory_dtype.names)
+    del records, loaded
+
+def testStreamedLog():
+    trajectory = randomTrajectory(300)
+    filename = os.path.join(folder, "streamed.trj")
+    with TrajectoryLogWriter(filename) as writer:
+        writer.write(trajectory.records[:100])
+        for record in trajectory.records[100:]:
+            writer.append(record["time"], RobotState(px=record["px"], py=record["py"], phi=record["phi"]),
+                          RobotDerivativeState(vx=record["vx"], vy=record["vy"], r_rate=record["w"]),
+                          RobotDerivativeState(vx=record["vl"], vy=record["vr"]))
+    assert np.array_equal(readLog(filename), trajectory.records)
+
+    header = np.fromfile(filename, dtype=log_header_dtype, count=1)
+    assert header["magic"][0] == log_magic and header["record_count"][0] == 300
+
+def testUnclosedLog():
+    # a writer that was never closed leaves a zero count, the length comes from the file size
+    trajectory = randomTrajectory(50)
+    filename = os.path.join(folder, "unclosed.trj")
+    writer = TrajectoryLogWriter(filename)
+    writer.write(trajectory.records)
+    writer.file.flush()
+    assert np.array_equal(readLog(filename), trajectory.records)
+    writer.close()
+
+def testEmptyAndForeignLogs():
+    filename = os.path.join(folder, "empty.trj")
+    saveLog(TrajectoryBuffer(), filename)
+    assert len(readLog(filename)) == 0 and len(loadLog(filename)) == 0
+
+    filename = os.path.join(folder, "foreign.trj")
+    with open(filename, "wb") as file:
+        file.write(b"not a trajectory log at all" * 4)
+    try:
+        readLog(filename)
+        assert False, "foreign file was read"
+    except ValueError:
+        pass
+
+def testTextConversion():
+    trajectory = randomTrajectory(200)
+    log_filename, text_filename = os.path.join(folder, "text.trj"), os.path.join(folder, "text.txt")
+    saveLog(trajectory, log_filename)
+    logToText(log_filename, text_filename)
+
+    # %.17g text keeps every bit of the written columns
+    loaded = loadText(text_filename, text_layouts["data"])
+    assert all(np.array_equal(loaded[field], trajectory[field]) for field in text_layouts["data"])
+
+def testCompressedLog():
+    trajectory = randomTrajectory(1000)
+    filename = os.path.join(folder, "compressed.trj.gz")
+    with TrajectoryLogWriter(filename, compress=True) as writer:
+        writer.write(trajectory.records[:400])
+        writer.write(trajectory.records[400:])
+    assert os.path.getsize(filename) < log_header_dtype.itemsize + 1000 * log_record_dtype.itemsize
+    assert np.array_equal(readLog(filename), trajectory.records)
+    assert np.array_equal(loadLog(filename).records, trajectory.records)
+
+def testTextLayouts():
+    trajectory = randomTrajectory(120)
+    for name, fields in text_layouts.items():
+        filename = os.path.join(folder, f"{name}.txt")
+        saveText(trajectory, filename, fields)
+
+        # the layout comes from the column count and time is rebuilt from the step time
+        loaded = loadText(filename, dt=0.05)
+        assert all(np.array_equal(loaded[field], trajectory[field]) for field in fields), name
+        assert np.allclose(loaded["time"], np.arange(120) * 0.05, rtol=0., atol=1e-12), name
+        assert not any(loaded[field].any() for field in trajectory_dtype.names if field not in fields + ("time",))
+
+    # a time column is kept as it is
+    filename = os.path.join(folder, "timed.txt")
+    saveText(trajectory, filename, ("time", "px", "py"))
+    loaded = loadText(filename, ("time", "px", "py"))
+    assert np.array_equal(loaded["time"], trajectory["time"]) and np.array_equal(loaded["py"], trajectory["py"])
+
+    for fields in (None, text_layouts["data"]):
+        try:
+            loadText(filename, fields)
+            assert False, f"3 columns were read as {fields}"
+        except ValueError:
+            pass
+
+def testTextToLog():
+    trajectory = randomTrajectory(80)
+    text_filename, log_filename = os.path.join(folder, "position.txt"), os.path.join(folder, "position.trj")
+    saveText(trajectory, text_filename, text_layouts["position"])
+    textToLog(text_filename, log_filename, dt=0.02)
+
+    records = readLog(log_filename)
+    assert np.array_equal(records["px"], trajectory["px"]) and np.array_equal(records["py"], trajectory["py"])
+    assert np.allclose(records["time"], np.arange(80) * 0.02, rtol=0., atol=1e-12)
+    del records
+
+if __name__ == "__main__":
+    runChecks(globals())
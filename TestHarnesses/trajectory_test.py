@@ -0,0 +1,104 @@
+"""
+trajectory_test.py
+
+File checks the trajectory ring buffer against a plain list of samples, and the min/max
+decimation of the graphs against a bin-by-bin reference
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.trajectory import TrajectoryRingBuffer, trajectory_dtype
+from model.states import RobotState, RobotDerivativeState
+from utilities.decimation import decimateMinMax
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def randomRecords(n: int, start: float=0.) -> np.ndarray:
+    """
+    samples with increasing times and random values
+    """
+    records = np.zeros(n, dtype=trajectory_dtype)
+    for field in trajectory_dtype.names:
+        records[field] = rng.normal(size=n)
+    records["time"] = start + np.arange(n) * 0.01
+
+    return records
+
+def testRingBufferWraparound():
+    capacity = 37
+    ring = TrajectoryRingBuffer(capacity)
+    samples = randomRecords(200)
+    for count, sample in enumerate(samples, start=1):
+        ring.append(sample["time"], RobotState(px=sample["px"], py=sample["py"], phi=sample["phi"]),
+                    RobotDerivativeState(vx=sample["vx"], vy=sample["vy"], r_rate=sample["w"]),
+                    RobotDerivativeState(vx=sample["vl"], vy=sample["vr"]))
+
+        # the last capacity samples, oldest first
+        expected = samples[max(count - capacity, 0):count]
+        assert len(ring) == len(expected)
+        assert np.array_equal(ring.records, expected), f"after {count} appends"
+        assert np.array_equal(ring["time"], expected["time"])
+
+    state = ring.getState(0)
+    assert (state.px, state.py, state.phi) == tuple(samples[-capacity][["px", "py", "phi"]].tolist())
+    state = ring.getState(-1)
+    assert (state.px, state.py, state.phi) == tuple(samples[-1][["px", "py", "phi"]].tolist())
+
+def testRingBufferExtend():
+    capacity = 50
+    ring = TrajectoryRingBuffer(capacity)
+    stored = np.zeros(0, dtype=trajectory_dtype)
+    for size in (0, 7, 30, 13, 1, 49, 50, 51, 180, 3):
+        records = randomRecords(size, start=len(stored) * 0.01)
+        ring.extend(records)
+        stored = np.concatenate((stored, records))
+        assert np.array_equal(ring.records, stored[-capacity:]), f"after extending by {size}"
+        assert np.array_equal(ring["vr"], stored["vr"][-capacity:])
+
+    ring.clear()
+    assert len(ring) == 0 and len(ring.records) == 0 and len(ring["px"]) == 0
+    ring.extend(stored[:5])
+    assert np.array_equal(ring.records, stored[:5])
+
+def testColumnsAreViews():
+    ring = TrajectoryRingBuffer(10)
+    ring.extend(randomRecords(25))
+    column = ring["py"]
+    assert np.shares_memory(column, ring._records)
+    column[0] = 123.
+    assert ring.records["py"][0] == 123.
+
+def testDecimationKeepsExtrema():
+    for n, max_points in ((10000, 400), (10001, 400), (997, 64), (5000, 3), (300, 1000)):
+        x = np.arange(n) * 0.01
+        y = np.cumsum(rng.normal(size=n))
+        y[rng.integers(n, size=3)] += [50., -50., 80.] # spikes
+        dx, dy = decimateMinMax(x, y, max_points)
+
+        if n <= max_points:
+            assert dx is x and dy is y
+            continue
+
+        assert np.all(np.diff(dx) > 0.), "points stay in time order"
+        assert dy.max() == y.max() and dy.min() == y.min(), "global extrema are kept"
+        assert len(dx) <= max_points + n // (max_points // 2)
+        assert set(zip(dx.tolist(), dy.tolist())) <= set(zip(x.tolist(), y.tolist())), "only original points"
+
+        # every bin's own minimum and maximum are kept
+        per_bin = -(-n // (max_points // 2))
+        kept = set(dx.tolist())
+        for start in range(0, n - per_bin + 1, per_bin):
+            window = y[start:start + per_bin]
+            assert x[start + window.argmin()] in kept and x[start + window.argmax()] in kept
+        assert set(x[n - n % per_bin:].tolist()) <= kept, "samples of the last partial bin are kept"
+
+def testDecimationOfShortSeries():
+    x, y = np.arange(5.), np.array([1., 5., 2., 4., 3.])
+    dx, dy = decimateMinMax(x, y, 1)
+    assert dx is x and dy is y
+
+if __name__ == "__main__":
+    runChecks(globals())
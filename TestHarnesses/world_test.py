@@ -0,0 +1,106 @@
+"""
+world_test.py
+
+File checks the world's spatial index and obstacle queries against brute force
+"""
+import sys
+sys.path.append("..")
+
+from harness import runChecks
+from model.world import World, SpatialHash, loadWorld, transformFootprint, convexOverlap
+
+import numpy as np
+
+rng = np.random.default_rng(0)
+
+def brutePairs(x: np.ndarray, y: np.ndarray, radius: float) -> set:
+    """
+    every pair (i, j), i < j, of points closer than radius, in O(n^2)
+    """
+    distance = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    i, j = np.nonzero(np.triu(distance <= radius, k=1))
+
+    return set(zip(i.tolist(), j.tolist()))
+
+def pointInPolygon(x: np.ndarray, y: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    even-odd rule: a point is inside when a ray towards +x crosses the outline an odd number of times
+    """
+    inside = np.zeros(len(x), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        straddles = (y0 > y) != (y1 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= straddles & (x < crossing)
+
+    return inside
+
+def testSpatialHash():
+    n = 2000
+    x, y = rng.uniform(-20, 20, n), rng.uniform(-20, 20, n)
+    index = SpatialHash(cell_size=1.)
+    index.update(x, y)
+
+    for step in range(3):
+        for radius in (0.3, 1., 2.5):
+            i, j, distance = index.pairs(radius)
+            found = set(zip(i.tolist(), j.tolist()))
+            assert found == brutePairs(x, y, radius) and len(found) == len(i), f"pairs, step {step}, radius {radius}"
+            assert np.allclose(distance, np.hypot(x[i] - x[j], y[i] - y[j]))
+
+        qx, qy = rng.uniform(-22, 22, 300), rng.uniform(-22, 22, 300)
+        queries, points, distance = index.query(qx, qy, 1.5)
+        expected = np.hypot(qx[:, None] - x[None, :], qy[:, None] - y[None, :]) <= 1.5
+        found = np.zeros_like(expected)
+        found[queries, points] = True
+        assert np.array_equal(found, expected) and len(queries) == np.count_nonzero(expected), f"query, step {step}"
+        assert np.allclose(distance, np.hypot(qx[queries] - x[points], qy[queries] - y[points]))
+
+        # move some points a little and some far, so the incremental update re-sorts
+        x = x + rng.normal(0., 0.05, n)
+        y = y + rng.normal(0., 0.05, n)
+        jump = rng.random(n) < 0.05
+        x[jump], y[jump] = rng.uniform(-20, 20, np.count_nonzero(jump)), rng.uniform(-20, 20, np.count_nonzero(jump))
+        index.update(x, y)
+
+def testOccupied():
+    for cell_size in (1., 0.37):
+        world = loadWorld("warehouse", cell_size=cell_size)
+        px, py = rng.uniform(-11, 11, 50000), rng.uniform(-11, 11, 50000)
+        expected = np.zeros(len(px), dtype=bool)
+        for obstacle in world.obstacles:
+            expected |= pointInPolygon(px, py, obstacle)
+        assert np.array_equal(world.occupied(px, py), expected), f"cell size {cell_size}"
+
+def testConcaveObstacle():
+    # points outside of the grid's bounds too
+    obstacle = [[0, 0], [4, 0], [4, 4], [2, 1], [0, 4]]
+    world = World([obstacle], bounds=(-1, -2, 5, 5), cell_size=0.5)
+    px, py = rng.uniform(-3, 7, 20000), rng.uniform(-4, 7, 20000)
+    assert np.array_equal(world.occupied(px, py), pointInPolygon(px, py, np.array(obstacle, dtype=float)))
+
+def testRobotCollisions():
+    n = 500
+    world = loadWorld("warehouse")
+    px, py, phi = rng.uniform(-8, 8, n), rng.uniform(-8, 8, n), rng.uniform(-np.pi, np.pi, n)
+    world.updateRobots(px, py, phi)
+    i, j = world.robotCollisions()
+
+    # every pair through the separating-axis test
+    a, b = np.triu_indices(n, k=1)
+    polygons = transformFootprint(world.footprint, px, py, phi)
+    expected = convexOverlap(polygons[a], polygons[b])
+    assert set(zip(i.tolist(), j.tolist())) == set(zip(a[expected].tolist(), b[expected].tolist()))
+
+def testOverlappingObstacles():
+    # a point inside two obstacles stays occupied, the even-odd rule applies per obstacle
+    obstacles = [[[0, 0], [4, 0], [4, 4], [2, 1], [0, 4]], [[1, -1], [3, -1], [3, 2], [1, 2]]]
+    world = World(obstacles, bounds=(-1, -2, 5, 5), cell_size=0.5)
+    px, py = rng.uniform(-3, 7, 20000), rng.uniform(-4, 7, 20000)
+    expected = pointInPolygon(px, py, np.array(obstacles[0], dtype=float)) | \
+        pointInPolygon(px, py, np.array(obstacles[1], dtype=float))
+    assert np.array_equal(world.occupied(px, py), expected)
+    assert world.occupied(np.array([2.]), np.array([0.5]))[0], "point inside both obstacles"
+
+if __name__ == "__main__":
+    runChecks(globals())
@@ -0,0 +1,209 @@
+"""
+Author: Miguel Tamayo
+
+fleet_display.py
+Contains class for PyQt5 GraphicsItem in charge of drawing a fleet of robots
+"""
+
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QPainter, QColor, QPen, QBrush
+
+import numpy as np
+import pyqtgraph as pg
+
+from utilities.constants import *
+from utilities.constants import robot_color
+
+class FleetDisplay(QGraphicsItem):
+    """
+    Class representing PyQt5 QGraphics item that draws N robots from arrays of poses.
+    Every robot shares one cached polygon; all robots of a color are drawn with a single
+    path built with NumPy. Robots outside the exposed area are culled and, once a robot
+    is smaller than lod_size pixels on screen, robots are drawn as points
+
+    inputs:
+    -------
+        n (int): number of robots in the fleet
+        colors (np.ndarray): palette index of each robot, all robots use the first color by default
+        palette (list): QColor of each palette index
+        trail_length (int): number of past positions drawn behind each robot, 0 disables trails
+        lod_size (float): on-screen robot size under which robots are drawn as points [px]
+
+    return:
+    -------
+        display (FleetDisplay): PyQt5 QGraphicsItem object
+    """
+    def __init__(self,
+                 n: int,
+                 colors: np.ndarray=None,
+                 palette: list=None,
+                 trail_length: int=fleet_trail_length,
+                 lod_size: float=fleet_lod_size,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption) # needed for option.exposedRect
+
+        self.n = n
+        self.colors = np.zeros(n, dtype=np.intp) if colors is None else np.asarray(colors, dtype=np.intp)
+        self.palette = [QColor(robot_color)] if palette is None else palette
+        self.brushes = [QBrush(color) for color in self.palette]
+        self.pens = [QPen(color, 0) for color in self.palette] # cosmetic pens for trails and points
+        self.lod_size = lod_size
+
+        # shared robot polygon in pixel frame, closed (same shape as RobotDisplay)
+        vertices = np.array(robot_vertices + robot_vertices[:1])
+        self.template_x = vertices[:, 0]
+        self.template_y = -vertices[:, 1]
+        self.radius = np.hypot(self.template_x, self.template_y).max() # bounding circle of a robot
+
+        # robots' poses in pixel frame
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.angle = np.zeros(n)
+
+        # ring of past positions, one row per update
+        self.trail_length = trail_length
+        self.trail_x = np.zeros((trail_length, n))
+        self.trail_y = np.zeros((trail_length, n))
+        self.trail_head = 0
+        self.trail_size = 0
+
+        self.bounding_rect = QRectF()
+
+    def boundingRect(self) -> QRectF:
+        """
+        returns the rectangle that bounds every robot and trail
+
+        return:
+        -------
+            bounding_rect (QRectF): fleet's bounding rect
+        """
+        return self.bounding_rect
+
+    def updateFleet(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> None:
+        """
+        updates every robot's coordinates on the screen
+
+        inputs:
+        -------
+            px (np.ndarray): cartesian x positions [m]
+            py (np.ndarray): cartesian y positions [m]
+            phi (np.ndarray): headings [rad]
+        """
+        # cartesian to pixel: y-axis and rotation direction are flipped
+        np.multiply(px, m2x, out=self.x)
+        np.multiply(py, -m2x, out=self.y)
+        np.negative(phi, out=self.angle)
+
+        if self.trail_length > 0:
+            self.trail_x[self.trail_head] = self.x
+            self.trail_y[self.trail_head] = self.y
+            self.trail_head = (self.trail_head + 1) % self.trail_length
+            self.trail_size = min(self.trail_size + 1, self.trail_length)
+
+            xs = self.trail_x[:self.trail_size]
+            ys = self.trail_y[:self.trail_size]
+        else:
+            xs = self.x
+            ys = self.y
+
+        bounding_rect = QRectF()
+        if self.n > 0:
+            left, top = xs.min() - self.radius, ys.min() - self.radius
+            right, bottom = xs.max() + self.radius, ys.max() + self.radius
+            bounding_rect = QRectF(left, top, right - left, bottom - top)
+
+        if bounding_rect != self.bounding_rect:
+            self.prepareGeometryChange()
+            self.bounding_rect = bounding_rect
+        self.update()
+
+        return None
+
+    def clearTrails(self) -> None:
+        """
+        Removes every robot's trail
+        """
+        self.trail_head = 0
+        self.trail_size = 0
+        self.update()
+
+        return None
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget) -> None:
+        """
+        draws the robots that are inside the exposed area
+
+        inputs:
+        -------
+            painter (QPainter): painter object in charge of the fleet
+            option (QStyleOptionGraphicsItem): holds the exposed area
+        """
+        exposed = option.exposedRect.adjusted(-self.radius, -self.radius, self.radius, self.radius)
+        visible = ((self.x >= exposed.left()) & (self.x <= exposed.right()) &
+                   (self.y >= exposed.top()) & (self.y <= exposed.bottom()))
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        detailed = robot_size * lod >= self.lod_size
+
+        for color in np.unique(self.colors[visible]):
+            idx = np.flatnonzero(visible & (self.colors == color))
+
+            if self.trail_size > 1:
+                self.paintTrails(painter, idx, self.pens[color])
+
+            if detailed:
+                painter.setPen(Qt.black)
+                painter.setBrush(self.brushes[color])
+                painter.drawPath(self.robotsPath(idx))
+            else:
+                painter.setPen(QPen(self.palette[color], max(2., robot_size * lod)))
+                painter.drawPoints(pg.functions.arrayToQPolygonF(self.x[idx], self.y[idx]))
+
+        return None
+
+    def robotsPath(self, idx: np.ndarray):
+        """
+        builds one path holding the polygons of the given robots
+
+        inputs:
+        -------
+            idx (np.ndarray): indices of the robots to include
+
+        return:
+        -------
+            path (QPainterPath): closed polygon of every robot
+        """
+        cos = np.cos(self.angle[idx])[:, None]
+        sin = np.sin(self.angle[idx])[:, None]
+
+        xs = self.x[idx, None] + self.template_x * cos - self.template_y * sin
+        ys = self.y[idx, None] + self.template_x * sin + self.template_y * cos
+
+        connect = np.ones(xs.shape, dtype=bool)
+        connect[:, -1] = False # do not join one robot to the next
+
+        return pg.functions.arrayToQPath(xs.ravel(), ys.ravel(), connect=connect.ravel())
+
+    def paintTrails(self, painter: QPainter, idx: np.ndarray, pen: QPen) -> None:
+        """
+        draws the trails of the given robots, oldest position first
+
+        inputs:
+        -------
+            painter (QPainter): painter object in charge of the fleet
+            idx (np.ndarray): indices of the robots to draw
+            pen (QPen): trail pen
+        """
+        order = (self.trail_head - self.trail_size + np.arange(self.trail_size)) % self.trail_length
+        xs = self.trail_x[np.ix_(order, idx)].T
+        ys = self.trail_y[np.ix_(order, idx)].T
+
+        connect = np.ones(xs.shape, dtype=bool)
+        connect[:, -1] = False # do not join one trail to the next
+
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPath(pg.functions.arrayToQPath(xs.ravel(), ys.ravel(), connect=connect.ravel()))
+
+        return None
@@ -0,0 +1,165 @@
+"""
+Author: Miguel Tamayo
+
+grid_layer.py
+Contains class for PyQt5 GraphicsItem in charge of drawing a tiled grid map
+"""
+
+from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QPainter, QImage, QPixmap
+
+import numpy as np
+
+from model.occupancy import TiledGrid
+from utilities.constants import *
+from utilities.constants import robot_color
+
+def argb(color, alpha: int) -> np.uint32:
+    """
+    packs a color into a 32-bit ARGB pixel
+
+    inputs:
+    -------
+        color (QColor): color
+        alpha (int): opacity, 0 to 255
+
+    return:
+    -------
+        pixel (np.uint32): ARGB pixel
+    """
+    return np.uint32((alpha << 24) | (color.red() << 16) | (color.green() << 8) | color.blue())
+
+def coverageColors(cells: np.ndarray) -> np.ndarray:
+    """
+    colors covered cells with the robot's color, the rest is transparent
+
+    inputs:
+    -------
+        cells (np.ndarray): coverage tile
+
+    return:
+    -------
+        pixels (np.ndarray): ARGB pixel of each cell
+    """
+    return np.where(cells > 0, argb(robot_color, 90), np.uint32(0))
+
+def occupancyColors(cells: np.ndarray) -> np.ndarray:
+    """
+    shades cells by occupancy: free cells light, occupied cells dark and unseen cells
+    transparent, more opaque as the map grows certain
+
+    inputs:
+    -------
+        cells (np.ndarray): occupancy tile, in log-odds
+
+    return:
+    -------
+        pixels (np.ndarray): ARGB pixel of each cell
+    """
+    probability = 1. / (1. + np.exp(-cells))
+    shade = np.rint(255 * (1. - probability)).astype(np.uint32)
+    alpha = np.rint(np.minimum(np.abs(probability - 0.5) * 2, 1.) * 200).astype(np.uint32)
+
+    return (alpha << 24) | (shade << 16) | (shade << 8) | shade
+
+class GridLayer(QGraphicsItem):
+    """
+    Class representing PyQt5 QGraphics item that draws a TiledGrid. Every tile is
+    turned into a pixmap once and kept; refresh() only rebuilds the tiles written
+    since the last refresh, so painting a frame is a handful of cached blits
+
+    inputs:
+    -------
+        grid (TiledGrid): grid to draw
+        colors: function mapping a tile of cells to ARGB pixels, e.g. coverageColors
+
+    return:
+    -------
+        layer (GridLayer): PyQt5 QGraphicsItem object
+    """
+    def __init__(self,
+                 grid: TiledGrid,
+                 colors=coverageColors,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption) # needed for option.exposedRect
+
+        self.grid = grid
+        self.colors = colors
+        self.tile_pixels = grid.tile_size * grid.resolution * m2x # side of a tile on the canvas [px]
+        self.pixmaps = {} # (tx, ty) -> QPixmap
+        self.bounding_rect = QRectF()
+
+    def boundingRect(self) -> QRectF:
+        """
+        returns the rectangle that bounds every drawn tile
+
+        return:
+        -------
+            bounding_rect (QRectF): layer's bounding rect
+        """
+        return self.bounding_rect
+
+    def tileRect(self, key: tuple[int, int]) -> QRectF:
+        """
+        gets the area of the canvas a tile covers
+
+        inputs:
+        -------
+            key (tuple[int, int]): tile indices (tx, ty)
+
+        return:
+        -------
+            rect (QRectF): tile's rectangle in pixels
+        """
+        tx, ty = key
+
+        # cartesian to pixel: the y-axis is flipped, so a tile's top is its largest y
+        return QRectF(tx * self.tile_pixels, -(ty + 1) * self.tile_pixels, self.tile_pixels, self.tile_pixels)
+
+    def refresh(self) -> None:
+        """
+        rebuilds the pixmaps of the tiles written since the last refresh
+        """
+        dirty = self.grid.takeDirty()
+        if not dirty:
+            return None
+
+        for key in dirty:
+            tile = self.grid.tiles.get(key)
+            if tile is None:
+                self.pixmaps.pop(key, None)
+                continue
+
+            # rows are flipped so the largest y is drawn on top
+            pixels = np.ascontiguousarray(self.colors(tile)[::-1], dtype=np.uint32)
+            image = QImage(pixels.data, pixels.shape[1], pixels.shape[0], pixels.strides[0], QImage.Format_ARGB32)
+            self.pixmaps[key] = QPixmap.fromImage(image) # copies the pixels
+
+        bounding_rect = QRectF()
+        for key in self.pixmaps:
+            bounding_rect = bounding_rect.united(self.tileRect(key))
+        if bounding_rect != self.bounding_rect:
+            self.prepareGeometryChange()
+            self.bounding_rect = bounding_rect
+        self.update()
+
+        return None
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget) -> None:
+        """
+        draws the cached tiles that are inside the exposed area
+
+        inputs:
+        -------
+            painter (QPainter): painter object in charge of the layer
+            option (QStyleOptionGraphicsItem): holds the exposed area
+        """
+        exposed = option.exposedRect
+        for key, pixmap in self.pixmaps.items():
+            rect = self.tileRect(key)
+            if rect.intersects(exposed):
+                painter.drawPixmap(rect, pixmap, QRectF(pixmap.rect()))
+
+        return None
@@ -7,19 +7,33 @@ Manages all the widgets on the user interface as well as the functions for inter
 
 import sys
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QGridLayout, QGraphicsView,
-                             QGraphicsScene, QHBoxLayout)
+                             QGraphicsScene, QHBoxLayout, QFileDialog, QSlider, QShortcut, QComboBox)
 
-from PyQt5.QtCore import QThread, QMetaObject
+from PyQt5.QtCore import Qt, QThread, QMetaObject, QTimer
+from PyQt5.QtGui import QKeySequence
 
 import numpy as np
 
 from .robot_display import RobotDisplay
+from .fleet_display import FleetDisplay
 from .path import Path
 from .plotter import Plotter
 from .button import Button
+from .slider import Slider
+from .replay_controller import ReplayController
+from .profiler_overlay import ProfilerOverlay
+from .grid_layer import GridLayer, coverageColors
 from model.states import RobotState, RobotDerivativeState
+from model.trajectory import TrajectoryRingBuffer
+from model.batch_kinematics import BatchRobotKinematics
+from model.occupancy import CoverageMap
 from .robot_simulate import RobotSimulate, RobotSimulate1
+from utilities.trajectory_io import loadLog, loadText
+from utilities.profiling import StageProfiler
+from model.scenario import scenarioNames, loadScenario, compileScenario, Timeline
+from model.scheduler import FixedRateScheduler
 from utilities.constants import *
+from utilities.constants import background_color, line_color
 
 from PyQt5.QtWidgets import QWidget
 
@@ -54,11 +68,20 @@ class MainWindow(QMainWindow):
         self.scene.setBackgroundBrush(background_color)
 
         self.robot = RobotDisplay() # create robot instance at the origin facing x+
-        self.robot_path = Path(line_color, 1.5) # path to follow robot's position
+        self.robot_path = Path(line_color, 1.5, max_points=path_max_points) # path to follow robot's position
+        self.fleet = None # optional fleet drawn next to the robot (see showFleet)
+        self.fleet_model = None
+        self.fleet_timeline = None # scenario driven by the demo fleet, None without it (see setFleet)
+
+        # floor covered by the robot, drawn under the path from cached tiles
+        self.coverage = CoverageMap(coverage_resolution, tile_size=coverage_tile_size)
+        self.coverage_layer = GridLayer(self.coverage.grid, coverageColors)
+        self.coverage_layer.setZValue(-1)
 
         # add robot and path to the scene
         self.scene.addItem(self.robot)
         self.scene.addItem(self.robot_path)
+        self.scene.addItem(self.coverage_layer)
 
         canvas.setScene(self.scene) # add the scene to the canvas
 
@@ -84,15 +107,49 @@ class MainWindow(QMainWindow):
 
         button_widget.setLayout(button_layout)
 
+        ### ----- scenario and replay controls ----- ###
+        replay_layout = QHBoxLayout()
+        replay_widget = QWidget()
+
+        # scenario the simulation drives, any file in scenarios/ is listed
+        self.scenario_box = QComboBox()
+        self.scenario_box.addItems(scenarioNames())
+
+        self.load_button = Button(txt="Load Run", width=int(button_width / 2))
+        self.load_button.buttonClickedSignal.connect(self.loadReplay)
+
+        # log10 of the playback speed
+        self.speed_slider = Slider(label="speed (log10)", min_val=np.log10(replay_speed_min),
+                                   max_val=np.log10(replay_speed_max), width=int(slider_width / 2))
+        self.speed_slider.valueChangedSignal.connect(self.changeReplaySpeed)
+
+        # replay time as a fraction of the run
+        self.seek_slider = QSlider(Qt.Horizontal)
+        self.seek_slider.setRange(0, 1000)
+        self.seek_slider.setDisabled(True)
+        self.seek_slider.sliderMoved.connect(self.seekReplay)
+
+        replay_layout.addWidget(self.scenario_box)
+        replay_layout.addWidget(self.load_button)
+        replay_layout.addWidget(self.speed_slider)
+        replay_layout.addWidget(self.seek_slider)
+        replay_widget.setLayout(replay_layout)
+
         ### ----- state graphs ----- ###
         # create graph area
         state_graph_widget = QWidget()
         state_graph_layout = QHBoxLayout()
 
+        # most recent samples of the run, shared by the graphs and the exporters
+        self.trajectory = TrajectoryRingBuffer(plot_capacity)
+
         # create graph objects
-        self.x_pos_plot = Plotter(title= "x-axis position", x_label="time (s)", y_label="position (m)")
-        self.y_pos_plot = Plotter(title="y-axis position", x_label="time (s)", y_label="position (m)")
-        self.phi_plot = Plotter(title="heading", x_label="time (s)", y_label="heading (deg)")
+        self.x_pos_plot = Plotter(title= "x-axis position", x_label="time (s)", y_label="position (m)",
+                                  buffer=self.trajectory, fields=["px"], window=plot_window)
+        self.y_pos_plot = Plotter(title="y-axis position", x_label="time (s)", y_label="position (m)",
+                                  buffer=self.trajectory, fields=["py"], window=plot_window)
+        self.phi_plot = Plotter(title="heading", x_label="time (s)", y_label="heading (deg)",
+                                buffer=self.trajectory, fields=["phi"], scale=np.rad2deg(1.), window=plot_window)
 
         # add the grapsh to the graph area
         state_graph_layout.addWidget(self.x_pos_plot)
@@ -104,8 +161,10 @@ class MainWindow(QMainWindow):
         vel_graph_widget = QWidget()
         vel_graph_layout = QHBoxLayout()
 
-        self.vl_plot = Plotter(title="left wheel linear vel", x_label="time (s)", y_label="velocity (m/s)")
-        self.vr_plot = Plotter(title="right wheel linear vel", x_label="time (s)", y_label="velocity (m/s)")
+        self.vl_plot = Plotter(title="left wheel linear vel", x_label="time (s)", y_label="velocity (m/s)",
+                               buffer=self.trajectory, fields=["vl"], window=plot_window)
+        self.vr_plot = Plotter(title="right wheel linear vel", x_label="time (s)", y_label="velocity (m/s)",
+                               buffer=self.trajectory, fields=["vr"], window=plot_window)
 
         vel_graph_layout.addWidget(self.vl_plot)
         vel_graph_layout.addWidget(self.vr_plot)
@@ -115,11 +174,12 @@ class MainWindow(QMainWindow):
         # row | column | rowSpan | ColumnSpan
         layout.addWidget(canvas, 0, 0, 2, 1)
         layout.addWidget(button_widget, 2, 0, 1, 1)
+        layout.addWidget(replay_widget, 3, 0, 1, 1)
         layout.addWidget(state_graph_widget, 0, 1, 1, 1)
         layout.addWidget(vel_graph_widget, 1, 1, 1, 1)
 
         layout.setSpacing(0)
-        layout.setRowStretch(3, 2)
+        layout.setRowStretch(4, 2)
         mainWdiget.setLayout(layout)
 
         ### ----- Simulation Thread ----- ###
@@ -127,36 +187,277 @@ class MainWindow(QMainWindow):
         self.robot_sim = RobotSimulate1() # create simulation object
         self.robot_sim.moveToThread(self.sim_thread) # move object into thread
 
-        # connect thread signals
-        self.sim_thread.started.connect(self.robot_sim.start_signal.emit)
-        self.sim_thread.finished.connect(self.robot_sim.stop_signal.emit)
-        self.robot_sim.finished_signal.connect(self.updateGUI)
-        self.robot_sim.update_plots_signal.connect(self.updatePlots)
+        # connect thread signals, both are emitted from the simulation thread itself
+        self.sim_thread.started.connect(self.robot_sim.run, Qt.DirectConnection)
+        self.sim_thread.finished.connect(self.robot_sim.stop, Qt.DirectConnection)
+
+        self.scenario_box.setCurrentText(self.robot_sim.scenario)
+        self.scenario_box.currentTextChanged.connect(self.changeScenario)
+
+        ### ----- Display Timer ----- ###
+        # redraws at the display rate, independently of the physics rate
+        self.frame_timer = QTimer()
+        self.frame_timer.timeout.connect(self.updateGUI)
+        self.frames = 0 # frames drawn since the last graph redraw
+
+        ### ----- Replay ----- ###
+        # plays recorded runs back on the same robot, path and graphs
+        self.replaying = False
+        self.replay = ReplayController(self.robot, self.robot_path, self.trajectory, self.updatePlots)
+        self.replay.time_signal.connect(self.showReplayTime)
+        self.replay.finished_signal.connect(self.pauseSimulation)
+
+        ### ----- Profiling ----- ###
+        # stage timings of the step and frame loops, F3 shows them over the canvas
+        self.profiler = StageProfiler()
+        self.active_profiler = None # self.profiler while profiling, None otherwise
+        self.profiler_overlay = ProfilerOverlay(self.profiler, parent=canvas)
+        self.profiler_shortcut = QShortcut(QKeySequence("F3"), self)
+        self.profiler_shortcut.activated.connect(lambda: self.setProfiling(self.active_profiler is None))
+        self.setProfiling(profiling)
+
+        ### ----- Coverage ----- ###
+        # F4 shows the floor covered by the robot
+        self.coverage_shortcut = QShortcut(QKeySequence("F4"), self)
+        self.coverage_shortcut.activated.connect(lambda: self.setCoverage(not self.coverage_layer.isVisible()))
+        self.setCoverage(coverage)
+
+        ### ----- Fleet ----- ###
+        # F5 drives a demo fleet along the scenario, stepped on the frame timer
+        self.fleet_scheduler = FixedRateScheduler(dt, max_steps=max_catch_up_steps)
+        self.fleet_shortcut = QShortcut(QKeySequence("F5"), self)
+        self.fleet_shortcut.activated.connect(lambda: self.setFleet(self.fleet_timeline is None))
+        self.setFleet(fleet)
+
+    def updateGUI(self) -> None:
+        """
+        Consumes every state published since the last frame and updates the canvas and graphs
+        """
+        profiler = self.active_profiler
+        if profiler is not None:
+            profiler.tick("frame_timer", 1 / frame_rate)
+            start = profiler.clock()
+
+        if self.fleet_timeline is not None:
+            for _ in range(self.fleet_scheduler.due()):
+                self.fleet_model.update(self.fleet_timeline.next())
+        if self.fleet is not None:
+            self.fleet.updateFleet(self.fleet_model.px, self.fleet_model.py, self.fleet_model.phi)
+
+        records = self.robot_sim.state_queue.drain()
+        if len(records) == 0:
+            return None
+
+        self.trajectory.extend(records)
+        self.robot_path.extendPath(records["px"], records["py"])
+        if self.coverage_layer.isVisible():
+            self.coverage.addPoses(records["px"], records["py"], records["phi"])
+            self.coverage_layer.refresh()
+
+        latest = records[-1]
+        self.robot.updatePosition(float(latest["px"]), float(latest["py"]), float(latest["phi"]))
+
+        if profiler is not None:
+            profiler.record("canvas", start)
+
+        self.frames += 1
+        if self.frames >= frame_rate // plot_rate:
+            self.updatePlots()
+
+        return None
 
-    def updateGUI(self, robot_state: RobotState) -> None:
+    def updatePlots(self) -> None:
         """
-        Updates the canvas and graphs
+        Updates GUI graphs from the recorded run
         """
-        self.robot_path.updatePath(robot_state.px, robot_state.py)
-        self.robot.updatePosition(robot_state.px, robot_state.py, robot_state.phi)
+        self.frames = 0
+
+        profiler = self.active_profiler
+        if profiler is not None:
+            start = profiler.clock()
+
+        self.x_pos_plot.update_plot_signal.emit()
+        self.y_pos_plot.update_plot_signal.emit()
+        self.phi_plot.update_plot_signal.emit()
+
+        self.vl_plot.update_plot_signal.emit()
+        self.vr_plot.update_plot_signal.emit()
+
+        if profiler is not None:
+            profiler.record("plots", start)
 
-    def updatePlots(self, time: float, state: RobotState, wheel_vel: RobotDerivativeState) -> None:
+    def setProfiling(self, enabled: bool) -> None:
         """
-        Updates GUI graphs
+        Turns the step and frame loop profiling, and its overlay, on or off
+
+        inputs:
+        -------
+            enabled (bool): True to profile
+        """
+        self.active_profiler = self.profiler if enabled else None
+        self.robot_sim.setProfiler(self.active_profiler)
+        self.profiler_overlay.setVisible(enabled)
+
+        return None
+
+    def setCoverage(self, enabled: bool) -> None:
         """
-        self.x_pos_plot.update_plot_signal.emit(time, [state.px])
-        self.y_pos_plot.update_plot_signal.emit(time, [state.py])
-        self.phi_plot.update_plot_signal.emit(time, [np.rad2deg(state.phi)])
+        Turns the coverage map, and its layer, on or off. Poses published while it is
+        off are not added
+
+        inputs:
+        -------
+            enabled (bool): True to draw the covered floor
+        """
+        self.coverage_layer.setVisible(enabled)
+        if not enabled:
+            self.coverage.previous = None # do not bridge the gap when turned back on
+
+        return None
+
+    def showFleet(self, fleet_model: BatchRobotKinematics, colors: np.ndarray=None, palette: list=None) -> None:
+        """
+        Draws a fleet of robots on the canvas, redrawn from its arrays on every frame
+
+        inputs:
+        -------
+            fleet_model (BatchRobotKinematics): fleet whose poses are drawn
+            colors (np.ndarray): palette index of each robot
+            palette (list): QColor of each palette index
+        """
+        if self.fleet is not None:
+            self.scene.removeItem(self.fleet)
+
+        self.fleet_model = fleet_model
+        self.fleet = FleetDisplay(fleet_model.n, colors=colors, palette=palette)
+        self.fleet.updateFleet(fleet_model.px, fleet_model.py, fleet_model.phi)
+        self.scene.addItem(self.fleet)
 
-        self.vl_plot.update_plot_signal.emit(time, [wheel_vel.vx])
-        self.vr_plot.update_plot_signal.emit(time, [wheel_vel.vy])
+        return None
+
+    def setFleet(self, enabled: bool) -> None:
+        """
+        Turns the demo fleet on or off. Its robots start on a grid around the origin with
+        headings spread over a full turn, and all drive the robot's scenario
+
+        inputs:
+        -------
+            enabled (bool): True to drive the demo fleet
+        """
+        if enabled and self.fleet_timeline is None:
+            self.showFleet(BatchRobotKinematics(fleet_size, dt=dt))
+            self.resetFleet()
+            if not self.simulationPaused and not self.replaying:
+                self.fleet_scheduler.start()
+        elif not enabled and self.fleet_timeline is not None:
+            self.scene.removeItem(self.fleet)
+            self.fleet = None
+            self.fleet_model = None
+            self.fleet_timeline = None
+            self.fleet_scheduler.stop()
+
+        return None
+
+    def resetFleet(self) -> None:
+        """
+        Puts the demo fleet back on its start grid, at the start of the current scenario
+        """
+        n = self.fleet_model.n
+        side = int(np.ceil(np.sqrt(n)))
+        row, column = np.divmod(np.arange(n), side)
+        self.fleet_model.reset()
+        self.fleet_model.setStates((column - (side - 1) / 2) * fleet_spacing,
+                                   (row - (side - 1) / 2) * fleet_spacing,
+                                   2 * np.pi * np.arange(n) / n)
+
+        self.fleet_timeline = Timeline(compileScenario(loadScenario(self.robot_sim.scenario), dt, L), dt)
+        self.fleet_scheduler.reset()
+        self.fleet.clearTrails()
+        self.fleet.updateFleet(self.fleet_model.px, self.fleet_model.py, self.fleet_model.phi)
+
+        return None
+
+    def loadReplay(self) -> None:
+        """
+        Asks for a recorded run (binary trajectory log or text file) and shows it instead of the simulation
+        """
+        filename, _ = QFileDialog.getOpenFileName(self, "Load Run", "", "Trajectory logs (*.trj *.trj.gz);;Text files (*.txt)")
+        if not filename:
+            return None
+
+        self.pauseSimulation()
+        trajectory = loadText(filename) if filename.endswith(".txt") else loadLog(filename)
+
+        self.replaying = True
+        self.seek_slider.setDisabled(False)
+        self.replay.load(trajectory)
+
+        return None
+
+    def changeReplaySpeed(self) -> None:
+        """
+        Sets the playback speed from the speed slider
+        """
+        self.replay.setSpeed(10 ** self.speed_slider.get_slider_value())
+
+    def seekReplay(self, position: int) -> None:
+        """
+        Jumps to the replay time selected on the seek slider
+
+        inputs:
+        -------
+            position (int): slider position, 0 to 1000
+        """
+        if self.replay.replay is None:
+            return None
+
+        start, end = self.replay.replay.start, self.replay.replay.end
+        self.replay.seek(start + (end - start) * position / 1000)
+
+        return None
+
+    def showReplayTime(self, replay_time: float) -> None:
+        """
+        Moves the seek slider to the current replay time
+
+        inputs:
+        -------
+            replay_time (float): replay time [s]
+        """
+        if self.seek_slider.isSliderDown():
+            return None
+
+        start, end = self.replay.replay.start, self.replay.replay.end
+        self.seek_slider.setValue(round(1000 * (replay_time - start) / (end - start)) if end > start else 0)
+
+        return None
+
+    def changeScenario(self, scenario: str) -> None:
+        """
+        Restarts the simulation from the origin on another scenario
+
+        inputs:
+        -------
+            scenario (str): scenario name
+        """
+        self.resetSimulation()
+        self.robot_sim.setScenario(scenario)
+        if self.fleet_timeline is not None:
+            self.resetFleet()
+
+        return None
 
     def playSimulation(self):
         """
-        Starts simulation if currently stopped
+        Starts simulation (or replay) if currently stopped
         """
-        # start thread
-        self.sim_thread.start()
+        if self.replaying:
+            self.replay.play()
+        else:
+            # start thread and display timer
+            self.sim_thread.start()
+            self.frame_timer.start(round(1000 / frame_rate))
+            self.fleet_scheduler.start()
 
         # update button statuses
         self.play_button.setDisabled(True)
@@ -165,9 +466,19 @@ class MainWindow(QMainWindow):
 
     def pauseSimulation(self):
         """
-        Pauses simulation if currently playing
+        Pauses simulation (or replay) if currently playing
         """
-        self.sim_thread.quit() # stop the thread
+        if self.replaying:
+            self.replay.pause()
+        else:
+            self.sim_thread.quit() # stop the thread
+            self.sim_thread.wait()
+            self.frame_timer.stop()
+            self.fleet_scheduler.stop()
+            self.updateGUI() # draw the states published before the thread stopped
+            self.updatePlots()
+            if self.active_profiler is not None:
+                self.active_profiler.pauseTimer("frame_timer")
 
         # update the button statues
         self.play_button.setDisabled(False)
@@ -177,10 +488,14 @@ class MainWindow(QMainWindow):
 
     def resetSimulation(self):
         """
-        Stops and resets the simulation
+        Stops and resets the simulation, leaving replay if a recorded run was shown
         """
         self.pauseSimulation() # pause the simulation
 
+        if self.replaying:
+            self.replaying = False
+            self.seek_slider.setDisabled(True)
+
         # reset robot object
         self.robot_sim.reset()
         robot_state = self.robot_sim.robot_model.getState()
@@ -188,10 +503,17 @@ class MainWindow(QMainWindow):
         self.scene.addItem(self.robot)
         self.robot.updatePosition(robot_state.px, robot_state.py, robot_state.phi)
 
-        # reset path object
+        # reset path objects
         self.robot_path.clear_path()
-
-        # reset the plots
+        self.coverage.clear()
+        self.coverage_layer.refresh()
+        if self.fleet_timeline is not None:
+            self.resetFleet()
+        elif self.fleet is not None:
+            self.fleet.clearTrails()
+
+        # reset the recorded run and the plots
+        self.trajectory.clear()
         self.x_pos_plot.reset_plot()
         self.y_pos_plot.reset_plot()
         self.phi_plot.reset_plot()
@@ -7,18 +7,30 @@ Contains class to create a path on the canvas
 
 from PyQt5.QtWidgets import QGraphicsPathItem
 from PyQt5.QtGui import QColor, QPen, QPainterPath
+from collections import deque
 import numpy as np
+import math
 
 from utilities.rotations import *
 from utilities.constants import *
 
 class Path(QGraphicsPathItem):
     """
-    Class creates QGraphicsPathItem to track objects on the canvas
-    
+    Class creates QGraphicsPathItem to track objects on the canvas. New points are
+    appended to a short tail path; once the tail holds chunk_size points it is frozen
+    into a child item and never copied again, so each update costs O(chunk_size)
+    instead of O(trail length)
+
     inputs:
     -------
-    
+        color (QColor): path color
+        width (float): path width [px]
+        chunk_size (int): points held by the tail before it is frozen
+        min_distance (float): points closer than this to the last point are dropped [px]
+        collinear_tolerance (float): a point that deviates less than this from the line
+            through its neighbours is dropped [px]
+        max_points (int): approximate maximum trail length in points, None keeps everything
+
     return:
     -------
         Path (QGraphicsPathItem): PyQt5 QGraphicsPathItem object
@@ -26,12 +38,26 @@ class Path(QGraphicsPathItem):
     def __init__(self,
                  color: QColor,
                  width: 1,
+                 chunk_size: int=path_chunk_size,
+                 min_distance: float=path_min_distance,
+                 collinear_tolerance: float=path_collinear_tolerance,
+                 max_points: int=None,
                  parent=None) -> None:
         super().__init__(parent)
 
         pen = QPen(color, width)
         self.setPen(pen)
 
+        self.chunk_size = chunk_size
+        self.min_distance = min_distance
+        self.collinear_tolerance = collinear_tolerance
+        self.max_chunks = None if max_points is None else max(1, -(-max_points // chunk_size))
+
+        self.chunks = deque() # frozen parts of the trail, oldest first
+        self.tail = QPainterPath() # part of the trail still being appended to
+        self.last_points = [] # last two points kept in the tail, for thinning
+        self.direction = (1., 0.) # unit direction the last segment started with
+
     def updatePath(self, x:float, y:float) -> None:
         """
         Adds new coorinates to the path and updates the path item
@@ -41,14 +67,98 @@ class Path(QGraphicsPathItem):
             x (float): new x-axis coordinate
             y (float): new y-axis coordinate
         """
-        
-        new_points = Cartesian2Pixel([[x, y]])
-        x = new_points[0][0]
-        y = new_points[0][1]
+        self.addPoint(x * m2x, -y * m2x) # cartesian to pixel
+        self.setPath(self.tail)
+
+        return None
 
-        path = QPainterPath(self.path())
-        path.lineTo(x * m2x, y * m2x)
-        self.setPath(path)
+    def extendPath(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        Adds several new coordinates to the path and updates the path item once
+
+        inputs:
+        -------
+            xs (np.ndarray): new x-axis coordinates
+            ys (np.ndarray): new y-axis coordinates
+        """
+        for x, y in zip((np.asarray(xs) * m2x).tolist(), (np.asarray(ys) * -m2x).tolist()):
+            self.addPoint(x, y)
+        self.setPath(self.tail)
+
+        return None
+
+    def addPoint(self, x: float, y: float) -> None:
+        """
+        Appends a point in pixel coordinates to the tail without redrawing, skipping
+        sub-pixel and collinear points
+
+        inputs:
+        -------
+            x (float): pixel x-axis coordinate
+            y (float): pixel y-axis coordinate
+        """
+        if not self.last_points:
+            self.tail.moveTo(x, y)
+            self.last_points.append((x, y))
+            return None
+
+        last_x, last_y = self.last_points[-1]
+        if math.hypot(x - last_x, y - last_y) < self.min_distance:
+            return None
+
+        if len(self.last_points) == 2 and self.tail.elementCount() > 1:
+            # deviation of the new point from the line the last segment started on
+            anchor_x, anchor_y = self.last_points[0]
+            dir_x, dir_y = self.direction
+            deviation = abs(dir_x * (y - anchor_y) - dir_y * (x - anchor_x))
+            progress = dir_x * (x - last_x) + dir_y * (y - last_y)
+            if deviation < self.collinear_tolerance and progress > 0:
+                # the new point continues the last segment, extend it instead of adding one
+                self.tail.setElementPositionAt(self.tail.elementCount() - 1, x, y)
+                self.last_points[-1] = (x, y)
+                return None
+
+        self.tail.lineTo(x, y)
+        self.last_points = [self.last_points[-1], (x, y)]
+
+        length = math.hypot(x - last_x, y - last_y)
+        self.direction = ((x - last_x) / length, (y - last_y) / length)
+
+        if self.tail.elementCount() >= self.chunk_size:
+            self.freezeTail()
+
+        return None
+
+    def freezeTail(self) -> None:
+        """
+        Moves the tail into its own child item and starts a new tail at its last point
+        """
+        chunk = QGraphicsPathItem(self.tail, self)
+        chunk.setPen(self.pen())
+        self.chunks.append(chunk)
+
+        if self.max_chunks is not None and len(self.chunks) > self.max_chunks:
+            self.removeChunk(self.chunks.popleft())
+
+        last_x, last_y = self.last_points[-1]
+        self.tail = QPainterPath()
+        self.tail.moveTo(last_x, last_y)
+        self.last_points = [(last_x, last_y)]
+
+        return None
+
+    def removeChunk(self, chunk: QGraphicsPathItem) -> None:
+        """
+        Deletes a frozen part of the trail from the canvas
+
+        inputs:
+        -------
+            chunk (QGraphicsPathItem): frozen part of the trail
+        """
+        scene = chunk.scene()
+        chunk.setParentItem(None)
+        if scene is not None:
+            scene.removeItem(chunk)
 
         return None
 
@@ -56,7 +166,11 @@ class Path(QGraphicsPathItem):
         """
         Removes points that were in the path
         """
+        while self.chunks:
+            self.removeChunk(self.chunks.popleft())
 
-        path = QPainterPath(self.path())
-        path.clear()
-        self.setPath(path)
\ No newline at end of file
+        self.tail = QPainterPath()
+        self.last_points = []
+        self.setPath(self.tail)
+
+        return None
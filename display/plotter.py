@@ -8,41 +8,56 @@ Contains class for PyQtGraph widget
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 
+from model.trajectory import TrajectoryBuffer
+from utilities.decimation import decimateMinMax
 from utilities.constants import *
 
+import numpy as np
 import pyqtgraph as pg
 
 class Plotter(pg.PlotWidget):
     """
-    Class representing PyQtGraph plot widget
-    
+    Class representing PyQtGraph plot widget. The plotted data is read straight
+    from a shared TrajectoryBuffer or TrajectoryRingBuffer, so the widget keeps no
+    copy of its own. Only the last window seconds are drawn and they are min/max
+    decimated down to max_points, so each update costs the same however long the run
+
     inputs:
     -------
         title (str): plot title
         x_label (str): x-axis label
         y_label (str): y-axis label
-        num_plots (int): number of lines to be drawn on the plot
+        buffer (TrajectoryBuffer): recorded run the lines are read from
+        fields (list): buffer columns plotted against time, one line each
+        scale (float): factor applied to the plotted values (e.g. rad to deg)
+        window (float): seconds of most recent data drawn, None draws everything stored
+        max_points (int): points drawn per line, None uses twice the widget's width in pixels
         legends (list): list of legend names for lines
 
     return:
     -------
         plot (Plotter): PyQtGraph plot object
     """
-    update_plot_signal = pyqtSignal(float, list) # signal that will trigger a plot update
+    update_plot_signal = pyqtSignal() # signal that will trigger a plot update
     def __init__(self,
                  title: str,
                  x_label: str,
                  y_label: str,
-                 num_plots: int=1,
+                 buffer: TrajectoryBuffer,
+                 fields: list,
+                 scale: float=1.,
+                 window: float=None,
+                 max_points: int=None,
                  legends: list=None) -> None:
         super().__init__(parent=None)
 
         self.line_colors = [plot_blue, plot_red, plot_orange]
-        self.time = []
-        self.data_sets = []
+        self.buffer = buffer
+        self.fields = fields
+        self.scale = scale
+        self.window = window
+        self.max_points = max_points
         self.plot_lines = []
-        num_plots
-        legends
 
         # figure attributes
         self.setBackground(plot_white)
@@ -65,8 +80,7 @@ class Plotter(pg.PlotWidget):
             self.plot_item.addLegend(labelTextColor=plot_black, brush=plot_grey)
 
         # iterate over the number of lines and add a plot instance
-        for idx in range(num_plots): 
-            self.data_sets.append([]) # append a list for this line set
+        for idx in range(len(fields)):
             if legends is not None:
                 self.plot_lines.append(self.plot_item.plot(name=legends[idx], pen=pg.mkPen(self.line_colors[idx])))
             else:
@@ -74,30 +88,33 @@ class Plotter(pg.PlotWidget):
 
         self.update_plot_signal.connect(self.update_plot)
 
-    def update_plot(self, time: float, new_data:list) -> None:
+    def update_plot(self) -> None:
         """
-        Adds new data to the plot
-
-        inputs:
-        -------
-            time (float): x-axis value
-            new_data (list): y-axis values for each line to be plotted
+        Redraws the lines from the samples currently stored in the buffer
         """
-        self.time.append(time) # add time point
+        time = self.buffer["time"]
+
+        # only keep the samples inside the time window
+        start = 0
+        if self.window is not None and len(time) > 0:
+            start = int(np.searchsorted(time, time[-1] - self.window))
+        time = time[start:]
+
+        max_points = self.max_points if self.max_points is not None else 2 * self.width()
 
-        for data_set, plot_line, data_point in zip(self.data_sets, self.plot_lines, new_data):
-            data_set.append(data_point) # append the data to its corresponding list
-            plot_line.setData(self.time, data_set) # update the plot
+        for field, plot_line in zip(self.fields, self.plot_lines):
+            x, y = decimateMinMax(time, self.buffer[field][start:], max_points)
+            if self.scale != 1.:
+                y = y * self.scale
+            plot_line.setData(x, y) # update the plot
 
         return None
 
     def reset_plot(self) -> None:
         """
-        Clears all the plots and erases the sotred data
+        Clears all the plots. The buffer itself is cleared by its owner
         """
-        self.time.clear() # clear time list
-        for data_set, plot_line in zip(self.data_sets, self.plot_lines):
-            data_set.clear()
-            plot_line.setData(self.time, data_set)
+        for plot_line in self.plot_lines:
+            plot_line.setData([], [])
 
         return None
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Author: Miguel Tamayo
+
+profiler_overlay.py
+Contains class that shows the profiler's statistics on top of the canvas
+"""
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QLabel, QWidget
+
+from utilities.profiling import StageProfiler
+from utilities.constants import *
+
+class ProfilerOverlay(QLabel):
+    """
+    Semi-transparent text box drawn over a widget with the profiler's stage latencies
+    and timer statistics. It refreshes itself at profiler_overlay_rate while shown and
+    does nothing while hidden
+
+    inputs:
+    -------
+        profiler (StageProfiler): profiler whose report is shown
+        parent (QWidget): widget the overlay is drawn over
+
+    return:
+    -------
+        overlay (ProfilerOverlay): PyQt5 label object
+    """
+    def __init__(self,
+                 profiler: StageProfiler,
+                 parent: QWidget=None) -> None:
+        super().__init__(parent)
+
+        self.profiler = profiler
+
+        self.setFont(QFont("monospace", 8))
+        self.setStyleSheet("color: rgb(230, 230, 230); background-color: rgba(0, 0, 0, 160); padding: 4px;")
+        self.move(5, 5)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.hide()
+
+    def refresh(self) -> None:
+        """
+        redraws the profiler's report
+        """
+        self.setText(self.profiler.format())
+        self.adjustSize()
+
+        return None
+
+    def showEvent(self, event) -> None:
+        self.refresh()
+        self.refresh_timer.start(round(1000 / profiler_overlay_rate))
+        super().showEvent(event)
+
+    def hideEvent(self, event) -> None:
+        self.refresh_timer.stop()
+        super().hideEvent(event)
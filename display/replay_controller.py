@@ -0,0 +1,175 @@
+"""
+Author: Miguel Tamayo
+
+replay_controller.py
+Plays a recorded run back on the canvas and graphs at an adjustable speed
+"""
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, QTimer
+
+from model.replay import TrajectoryReplay
+from model.trajectory import TrajectoryBuffer
+from .robot_display import RobotDisplay
+from .path import Path
+from utilities.constants import *
+
+import time
+
+class ReplayController(QObject):
+    """
+    Drives a RobotDisplay, its Path and the graphs' buffer from a recorded run instead
+    of the simulation. Playback follows the wall clock scaled by the replay speed, and
+    every frame only draws the samples reached since the previous one
+
+    inputs:
+    -------
+        robot (RobotDisplay): robot drawn on the canvas
+        path (Path): path following the robot
+        buffer (TrajectoryRingBuffer): buffer the graphs read from
+        update_plots: callable redrawing the graphs
+
+    return:
+    -------
+        controller (ReplayController): replay controller instance
+    """
+    time_signal = pyqtSignal(float) # sends the replay time after every frame or seek
+    finished_signal = pyqtSignal() # sent when playback reaches the end of the run
+
+    def __init__(self,
+                 robot: RobotDisplay,
+                 path: Path,
+                 buffer,
+                 update_plots) -> None:
+        super().__init__(parent=None)
+
+        self.robot = robot
+        self.path = path
+        self.buffer = buffer
+        self.update_plots = update_plots
+
+        self.replay = None
+        self.speed = 1. # replay time per wall-clock time
+        self.time = 0. # replay time [s]
+        self.index = 0 # last sample drawn
+        self.frames = 0 # frames drawn since the last graph redraw
+        self.wall_time = 0.
+
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.takeFrame)
+
+    def load(self, trajectory: TrajectoryBuffer) -> None:
+        """
+        loads a recorded run and shows its first sample
+
+        inputs:
+        -------
+            trajectory (TrajectoryBuffer): recorded run
+        """
+        self.pause()
+        self.replay = TrajectoryReplay(trajectory)
+        self.seek(self.replay.start)
+
+        return None
+
+    def play(self) -> None:
+        """
+        starts playback from the current replay time
+        """
+        if self.replay is None:
+            return None
+
+        self.wall_time = time.perf_counter()
+        self.timer.start(round(1000 / frame_rate))
+
+        return None
+
+    def pause(self) -> None:
+        """
+        stops playback, keeping the current replay time
+        """
+        self.timer.stop()
+
+        return None
+
+    def setSpeed(self, speed: float) -> None:
+        """
+        sets the playback speed
+
+        inputs:
+        -------
+            speed (float): replay time per wall-clock time, limited to [replay_speed_min, replay_speed_max]
+        """
+        self.speed = min(max(speed, replay_speed_min), replay_speed_max)
+
+        return None
+
+    def seek(self, replay_time: float) -> None:
+        """
+        jumps to any time of the run, rebuilding the path and graphs up to it
+
+        inputs:
+        -------
+            replay_time (float): replay time [s]
+        """
+        if self.replay is None:
+            return None
+
+        self.time = min(max(replay_time, self.replay.start), self.replay.end)
+        self.index = self.replay.indexAt(self.time)
+        history = self.replay.records[:self.index + 1]
+
+        # path: at most replay_path_points evenly spaced samples, always ending on the last one
+        stride = max(1, len(history) // replay_path_points)
+        self.path.clear_path()
+        self.path.extendPath(history["px"][::stride], history["py"][::stride])
+        self.path.updatePath(float(history["px"][-1]), float(history["py"][-1]))
+
+        self.buffer.clear()
+        self.buffer.extend(history[-self.buffer.capacity:])
+
+        self.drawRobot()
+        self.update_plots()
+        self.time_signal.emit(self.time)
+
+        return None
+
+    def takeFrame(self) -> None:
+        """
+        advances the replay time by the elapsed wall-clock time and draws the new samples
+        """
+        now = time.perf_counter()
+        self.time += (now - self.wall_time) * self.speed
+        self.wall_time = now
+
+        if self.time >= self.replay.end:
+            self.time = self.replay.end
+            self.pause()
+            self.finished_signal.emit()
+
+        idx = self.replay.indexAt(self.time)
+        if idx > self.index:
+            new_records = self.replay.records[self.index + 1:idx + 1]
+            self.path.extendPath(new_records["px"], new_records["py"])
+            self.buffer.extend(new_records)
+            self.index = idx
+
+        self.drawRobot()
+
+        self.frames += 1
+        if self.frames >= frame_rate // plot_rate or not self.timer.isActive():
+            self.frames = 0
+            self.update_plots()
+
+        self.time_signal.emit(self.time)
+
+        return None
+
+    def drawRobot(self) -> None:
+        """
+        draws the robot at the current replay time
+        """
+        state = self.replay.stateAt(self.time)
+        self.robot.updatePosition(state.px, state.py, state.phi)
+
+        return None
@@ -13,16 +13,20 @@ from PyQt5.QtCore import (Qt, QPoint, QPointF, QRectF)
 
 from PyQt5.QtGui import (QPainter, QColor, QPen, QPolygon, QBrush, QPolygonF, QTransform)
 
+import math
 import numpy as np
 
 from utilities.constants import *
+from utilities.constants import robot_color
 from utilities.rotations import *
 
 meters_to_pixel = 1
 
 class RobotDisplay(QGraphicsItem):
     """
-    Class representing PyQt5 QGraphics widget
+    Class representing PyQt5 QGraphics widget. The robot's polygon is built once in
+    its own frame and the item is moved with setPos/setRotation, so a position update
+    does not rebuild any geometry
     
     inputs:
     -------
@@ -41,24 +45,21 @@ class RobotDisplay(QGraphicsItem):
                  parent = None,) -> None:
         super().__init__(parent)
 
-        self.painter = QPainter()
         self.x_pos = origin_x # robot's position in the x-axis [cm]
         self.y_pos = origin_y # robot's position in the y-axis [cm]
         self.heading = origin_phi # robot's heading [rad]
-        self.robot = QPolygonF()
 
         # vehicle vertices
-        # defined with vehicle facing +x
-        #|---\
-        #|---/
+        # defined with vehicle facing +x, shared with the world's collision footprint
         # [x, y] points
-        self.vertices = [[-robot_size/2, robot_size/2], # top left
-                         [robot_size/2, robot_size/2],  # top right
-                         [robot_size/2 + front_size, 0], # front
-                         [robot_size/2, -robot_size/2], # bottom right
-                         [-robot_size/2, -robot_size/2]] # bottom left
+        self.vertices = [list(vertex) for vertex in robot_vertices]
 
-        # robot item with initial vertix locations. This will be updated throughout the simulation
+        # robot polygon in the item's own (pixel) frame, built once
+        self.robot = QPolygonF([QPointF(point[0], point[1]) for point in Cartesian2Pixel(self.vertices)])
+        self.bounding_rect = self.robot.boundingRect()
+        self.brush = QBrush(QColor(robot_color))
+
+        # place the robot at its initial location. This will be updated throughout the simulation
         self.updatePosition(self.x_pos, self.y_pos, self.heading)
 
     def boundingRect(self) -> QRectF:
@@ -69,7 +70,7 @@ class RobotDisplay(QGraphicsItem):
         -------
             bounding_rect (QRectF): robot's bounding rect
         """
-        return self.robot.boundingRect()
+        return self.bounding_rect
     
     def paint(self, painter: QPainter, option, widget) -> None:
         """
@@ -80,8 +81,7 @@ class RobotDisplay(QGraphicsItem):
             painter (Qpainter): painter object in charge of the robot
         """ 
         # draw the custom polygon
-        color = QColor(robot_color)
-        painter.setBrush(QBrush(color))
+        painter.setBrush(self.brush)
         painter.drawPolygon(self.robot)
 
         return None
@@ -97,17 +97,12 @@ class RobotDisplay(QGraphicsItem):
             phi (float): heading
         """
 
-        new_points = self.vertices # get the vertices at the origin
-        rot_matrix = rotation_matrix(phi= phi)
-
-        # rotate and offset vertices
-        new_points = np.matmul(new_points, rot_matrix)
-        new_points = offset(new_points, x * m2x, y * m2x)
+        self.x_pos = x
+        self.y_pos = y
+        self.heading = phi
 
-        # offset vertices
-        new_points = Cartesian2Pixel(new_points)
+        # cartesian to pixel: y-axis and rotation direction are flipped
+        self.setPos(x * m2x, -y * m2x)
+        self.setRotation(-math.degrees(phi))
 
-        self.robot = QPolygonF([QPointF(point[0], point[1]) for point in new_points]) # create new robot object
-        self.update()
-        
         return None
@@ -5,164 +5,173 @@ robot_simulate.py
 Handles all aspects of the robot's simulation such as updating its position
 """
 
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot, QTimer
 from model.robot_kinematics import RobotKinematics
+from model.simulate import RobotSimulate
+from model.state_queue import StateQueue
+from model.scheduler import FixedRateScheduler
+from model.scenario import Timeline, loadScenario, compileScenario
 from model.states import RobotState, RobotDerivativeState
 from inputs.control_inputs import WheelLinearInputs
 from utilities.constants import *
-import math
 
 class RobotSimulate1(QObject):
-    # sends the robot's state when calculations are finished
-    finished_signal = pyqtSignal(RobotState)
+    """
+    Steps the robot on its own thread at the physics rate (1 / dt). Every step is
+    published into state_queue instead of being signalled, so the GUI can redraw at
+    its own rate and consume all the pending states at once
+
+    inputs:
+    -------
+        dt (float): physics step time [s]
 
+    return:
+    -------
+        robot_sim (RobotSimulate1): threaded simulation instance
+    """
     stop_signal = pyqtSignal() # signal to stop the internal timer
     start_signal = pyqtSignal() # signal to start the internal timer
 
-    # sends parameters necessary to update the plots
-    update_plots_signal = pyqtSignal(float, RobotState, RobotDerivativeState)
-
-    def __init__(self) -> None:
+    def __init__(self,
+                 dt: float=dt) -> None:
         super().__init__(parent=None)
         self.dt = dt # time steps
         self.time = 0. # initialize simulation time ot 0
         self.robot_model = RobotKinematics(dt=self.dt)
         self.ticks = 0
-        self.cur_edge = 0
-        self.edge_cnt = 0
-        self.shape = "square"
-        self.n = 10
-        self.circumcircle = True
+        self.scenario = "square" # scenario driven, see scenarios/
+        self.timeline = Timeline(compileScenario(loadScenario(self.scenario), self.dt, L), self.dt)
+        self.state_queue = StateQueue() # states waiting to be drawn
+        self.telemetry = None # optional sink every step is recorded to
+        self.profiler = None # optional StageProfiler timing every step
+
+        # the timer only wakes the simulation up, the scheduler decides how many steps are due
+        self.scheduler = FixedRateScheduler(self.dt, max_steps=max_catch_up_steps)
 
         # setup the timer for the object
-        self.simulationTimedThread = QTimer()
-        self.simulationTimedThread.timeout.connect(self.takeStep)
+        self.simulationTimedThread = QTimer(self) # child, so it moves to the simulation thread with this object
+        self.simulationTimedThread.setTimerType(Qt.PreciseTimer)
+        self.simulationTimedThread.timeout.connect(self.runDueSteps)
 
         # connect the signals to start and stop the simulation
         self.start_signal.connect(self.run)
         self.stop_signal.connect(self.stop)
         
 
+    @pyqtSlot()
     def run(self) -> None:
         """
         runs the timer for the main robot updates on this new thread
         """
-        self.simulationTimedThread.start(10)
+        self.scheduler.start()
+        self.simulationTimedThread.start(max(1, round(self.dt * 1000)))
 
+    @pyqtSlot()
     def stop(self) -> None:
         """
         stops the internal simulation timer
         """
         self.simulationTimedThread.stop()
+        self.scheduler.stop()
+        if self.profiler is not None:
+            self.profiler.pauseTimer("step_timer")
+
+    @pyqtSlot()
+    def runDueSteps(self) -> None:
+        """
+        runs every step owed since the last timer tick, so late ticks are caught up and
+        simulated time stays on wall time
+        """
+        if self.profiler is not None:
+            self.profiler.tick("step_timer", self.dt)
+
+        for _ in range(self.scheduler.due()):
+            self.takeStep()
+
+        return None
 
     def takeStep(self) -> None:
         """
-        advances the robot (through its kinematics) in time
+        advances the robot (through its kinematics) in time and publishes the new state
         """
+        profiler = self.profiler
+        if profiler is not None:
+            start = profiler.clock()
+
         self.ticks += 1
         self.time += self.dt # step in time
-        self.cur_edge += self.dt
-
-        if self.shape == "square":
-            inputs = WheelLinearInputs(vl=0.5, vr=0.5)
-            self.robot_model.update(inputs) # update robot state
-            if self.edge_cnt >= 4:
-                return None
-
-            # turn logic (for square)
-            #print(self.cur_edge)
-            if self.cur_edge > 3:
-                inputs = WheelLinearInputs(vl=0, vr=31.41592653)
-                self.robot_model.update(inputs)
-                self.cur_edge = 0
-                self.edge_cnt += 1
-        elif self.shape == "straight":
-            inputs = WheelLinearInputs(vl=0.5, vr=0.5)
-            self.robot_model.update(inputs) # update robot state
-            pass
-        elif self.shape == "hexagon":
-            inputs = WheelLinearInputs(vl=0.5, vr=0.5)
-            self.robot_model.update(inputs) # update robot state
-            if self.edge_cnt >= 6:
-                return None
-
-            # turn logic (for square)
-            #print(self.cur_edge)
-            if self.cur_edge > 3:
-                inputs = WheelLinearInputs(vl=0, vr=31.41592653 * 4 / 6)
-                self.robot_model.update(inputs)
-                self.cur_edge = 0
-                self.edge_cnt += 1
-        elif self.shape == "n-gon":
-            inputs = WheelLinearInputs(vl=5, vr=5)
-            self.robot_model.update(inputs) # update robot state
-            if self.edge_cnt >= self.n:
-                if self.circumcircle:
-                    #inputs = WheelLinearInputs(vl=0, vr=-math.pi * 10 * 4 / self.n)
-                    #self.robot_model.update(inputs)
-                    inputs = WheelLinearInputs(vl=1, vr=1.5945)
-                    self.robot_model.update(inputs) # update robot state
-                else:
-                    return None
-
-            # turn logic (for square)
-            #print(self.cur_edge)
-            if self.cur_edge > 0.25 and self.edge_cnt < self.n - 1:
-                inputs = WheelLinearInputs(vl=0, vr=math.pi * 10 * 4 / self.n)
-                self.robot_model.update(inputs)
-                self.cur_edge = 0
-                self.edge_cnt += 1
-
-            if self.cur_edge > 0.25 and self.edge_cnt == self.n - 1:
-                inputs = WheelLinearInputs(vl=0, vr=math.pi * 5 * 4 / self.n)
-                self.robot_model.update(inputs)
-                self.cur_edge = 0
-                self.edge_cnt += 1
-
-        self.finished_signal.emit(self.robot_model.getState()) # emit a signal to tell we're done
-
-        if self.ticks % plotUpdateTicks == 0:
-            self.update_plots_signal.emit(self.time, self.robot_model.getState(), self.robot_model.getWheelVelocities())
+        self.robot_model.update(self.timeline.next()) # update robot state
+
+        if profiler is not None:
+            start = profiler.record("physics", start)
+
+        # publish the new state for the GUI
+        self.state_queue.push(self.time, self.robot_model.getState(), self.robot_model.getDotState(),
+                              self.robot_model.getWheelVelocities())
+
+        # record it to disk, the sink's writer thread does the file I/O
+        if self.telemetry is not None:
+            self.telemetry.record(self.time, self.robot_model.getState(), self.robot_model.getDotState(),
+                                  self.robot_model.getWheelVelocities())
+
+        if profiler is not None:
+            profiler.record("publish", start)
 
         return None
-    
-    def getStates(self) -> list:
+
+    def setScenario(self, scenario: str, **parameters) -> None:
         """
-        returns the different states of interest from the robot
+        compiles a scenario and drives the robot along it from the next step. Call it
+        while the simulation is paused, together with reset() to start from the origin
+
+        inputs:
+        -------
+            scenario (str): scenario name (see scenarios/) or path of a scenario file
+            parameters: values overriding the scenario's parameters
         """
+        self.scenario = scenario
+        self.timeline = Timeline(compileScenario(loadScenario(scenario), self.dt, L, **parameters), self.dt)
 
-        return self.robot_model.getState(), self.robot_model.getWheelVelocities()
+        return None
 
-    def reset(self) -> None:
+    def setProfiler(self, profiler) -> None:
         """
-        resets the robot's states
+        times every following step with a profiler
+
+        inputs:
+        -------
+            profiler (StageProfiler): stage profiler, None stops profiling
         """
-        self.time = 0.
-        self.robot_model.reset() 
+        self.profiler = profiler
 
-class RobotSimulate:
-    """
-    Wrapper class that handles the robot's dynamics, states, and advancing the robot in time
+        return None
 
-    return:
-    -------
-        robot_sim (RobotSimulate): Robot simulation instance
-    """
-    def __init__(self) -> None:
-        self.dt = dt # time steps
-        self.time = 0. # initialize simulation time to 0
-        self.robot_model = RobotKinematics(dt=self.dt)
-    
-    def takeStep(self, controls: WheelLinearInputs) -> None:
+    def setTelemetrySink(self, sink) -> None:
         """
-        advances the robot (through its dynamics) in time
+        records every following step to a telemetry sink
 
         inputs:
         -------
-            controls (WheelLinearInputs): robot's left and rigth wheel velocities
+            sink (TelemetrySink): telemetry sink, None stops recording
         """
-        self.time += self.dt # step in time
-        self.robot_model.update(controls) # update robot state
+        self.telemetry = sink
 
         return None
-    
+
+    def getStates(self) -> list:
+        """
+        returns the different states of interest from the robot
+        """
+
+        return self.robot_model.getState(), self.robot_model.getWheelVelocities()
+
+    def reset(self) -> None:
+        """
+        resets the robot's states
+        """
+        self.time = 0.
+        self.ticks = 0
+        self.robot_model.reset()
+        self.timeline.reset()
+        self.scheduler.reset()
+        self.state_queue.clear()
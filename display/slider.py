@@ -11,12 +11,13 @@ from PyQt5.QtWidgets import QWidget, QSlider, QHBoxLayout, QLabel
 
 class Slider(QWidget):
     """
-    Class representing PyQt5 slider widget with labels and values
+    Class representing PyQt5 slider widget with labels and values. The QSlider
+    moves in integer steps, scaled so the wider side of the range spans internal_max steps
 
     inputs:
     -------
-        min_val (int): slider's minimum value
-        max_val (int): slider's maximum value
+        min_val (float): slider's minimum value
+        max_val (float): slider's maximum value
         width (int): slider object width
         init_val (int): slider's initial value
         tick_interval (int): sliders ticks
@@ -28,18 +29,17 @@ class Slider(QWidget):
     """
     valueChangedSignal = pyqtSignal()
     internal_max = 100
-    internal_min = -100
     def __init__(self,
                  label: str,
-                 min_val: int,
-                 max_val: int,
+                 min_val: float,
+                 max_val: float,
                  width: int,
                  init_val: int = 0,
                  orientation: int = 1) -> None:
         super().__init__(parent=None)
 
         self.init_val = init_val
-        self.ratio = (max_val - min_val) / (self.internal_max - self.internal_min)
+        self.ratio = max(abs(min_val), abs(max_val)) / self.internal_max # value of one slider step
         self.value = init_val
 
         layout = QHBoxLayout() # want a horizontal layout
@@ -50,7 +50,7 @@ class Slider(QWidget):
         # slider and alider attributes
         self.slider = QSlider()
         self.slider.setOrientation(orientation)
-        self.slider.setRange(self.internal_min, self.internal_max)
+        self.slider.setRange(round(min_val / self.ratio), round(max_val / self.ratio))
         self.slider.setMaximumWidth(width)
 
         # add the items to the layout
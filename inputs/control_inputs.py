@@ -18,9 +18,29 @@ class WheelLinearInputs:
     -------
         inputs (WheelLinearInputs): robot's inputs
     """
+    __slots__ = ("vl", "vr")
+
     def __init__(self,
                  vl: float,
                  vr: float) -> None:
         
         self.vl = vl
-        self.vr = vr
\ No newline at end of file
+        self.vr = vr
+
+    def set(self, vl: float, vr: float) -> "WheelLinearInputs":
+        """
+        overwrites the inputs in place, so a controller can reuse a single instance
+
+        inputs:
+        -------
+            vl (float): left wheel linear velocity [m/s]
+            vr (float): right wheel linear velocity [m/s]
+
+        return:
+        -------
+            inputs (WheelLinearInputs): these inputs
+        """
+        self.vl = vl
+        self.vr = vr
+
+        return self
@@ -2,9 +2,29 @@
 Author: Miguel Tamayo
 
 controls.py
-Contains controllers for the robot
+Contains controllers for the robot. Every controller works on floats for a single
+robot or on NumPy arrays for a fleet, in one call
 """
 
+from .control_inputs import WheelLinearInputs
+from utilities.constants import *
+
+import numpy as np
+
+def wrapAngle(angle):
+    """
+    wraps angles to [-pi, pi)
+
+    inputs:
+    -------
+        angle (float | np.ndarray): angle [rad]
+
+    return:
+    -------
+        angle (float | np.ndarray): wrapped angle [rad]
+    """
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
 class P():
     """
     Proportional controller
@@ -30,7 +50,7 @@ class P():
         -------
             command (float): commanded / desired state
             current (float): current state
-        
+
         return:
         -------
             u (float): controller output
@@ -39,4 +59,416 @@ class P():
         e = command - current # error
         u = self.kp * e # controller output
 
-        return u
\ No newline at end of file
+        return u
+
+    def updateError(self, e):
+        """
+        Calculates the controller's output (u) from an error computed by the caller,
+        e.g. a wrapped heading error
+
+        inputs:
+        -------
+            e (float | np.ndarray): error
+
+        return:
+        -------
+            u (float | np.ndarray): controller output
+        """
+        return self.kp * e
+
+    def reset(self) -> None:
+        """
+        Clears the controller's memory
+        """
+        return None
+
+class PI(P):
+    """
+    Proportional-integral controller. The integral is clamped to +/- limit / ki
+    so it cannot wind up while the output is saturated
+
+    Inputs:
+    -------
+        kp (float): proportional gain
+        ki (float): integral gain
+        dt (float): time between updates [s]
+        limit (float): largest integral contribution to the output, None for no limit
+
+    return:
+    -------
+        pi_controller (PI): proportional-integral controller
+    """
+    def __init__(self,
+                 kp: float=0.0,
+                 ki: float=0.0,
+                 dt: float=dt,
+                 limit: float=None) -> None:
+        super().__init__(kp)
+
+        self.ki = ki
+        self.dt = dt
+        self.limit = limit
+        self.integral = 0. # accumulated error, an array once updated with arrays
+
+    def update(self, command, current):
+        return self.updateError(command - current)
+
+    def updateError(self, e):
+        self.integral = self.integral + e * self.dt
+        if self.limit is not None and self.ki != 0.:
+            self.integral = np.clip(self.integral, -self.limit / abs(self.ki), self.limit / abs(self.ki))
+
+        return self.kp * e + self.ki * self.integral
+
+    def reset(self) -> None:
+        self.integral = 0.
+
+        return None
+
+class PID(PI):
+    """
+    Proportional-integral-derivative controller. The derivative term is zero on
+    the first update after a reset
+
+    Inputs:
+    -------
+        kp (float): proportional gain
+        ki (float): integral gain
+        kd (float): derivative gain
+        dt (float): time between updates [s]
+        limit (float): largest integral contribution to the output, None for no limit
+
+    return:
+    -------
+        pid_controller (PID): proportional-integral-derivative controller
+    """
+    def __init__(self,
+                 kp: float=0.0,
+                 ki: float=0.0,
+                 kd: float=0.0,
+                 dt: float=dt,
+                 limit: float=None) -> None:
+        super().__init__(kp, ki, dt, limit)
+
+        self.kd = kd
+        self.previous = None # error of the previous update
+
+    def updateError(self, e):
+        u = super().updateError(e)
+        if self.previous is not None:
+            u = u + self.kd * (e - self.previous) / self.dt
+        self.previous = e
+
+        return u
+
+    def reset(self) -> None:
+        super().reset()
+        self.previous = None
+
+        return None
+
+def wheelInputs(v, w, wheel_base: float, vmax: float, out: WheelLinearInputs) -> WheelLinearInputs:
+    """
+    converts body velocities into wheel velocities. When a wheel would exceed vmax,
+    both wheels are scaled down together so the robot keeps the same turning radius
+
+    inputs:
+    -------
+        v (float | np.ndarray): linear velocity [m/s]
+        w (float | np.ndarray): angular velocity [rad/s]
+        wheel_base (float): distance between both wheels [m]
+        vmax (float): wheels' max linear velocity [m/s], None leaves them unbounded
+        out (WheelLinearInputs): inputs overwritten with the result
+
+    return:
+    -------
+        inputs (WheelLinearInputs): left and right wheel velocities
+    """
+    vl = v - w * wheel_base / 2
+    vr = v + w * wheel_base / 2
+
+    if vmax is not None:
+        scale = vmax / np.maximum(np.maximum(np.abs(vl), np.abs(vr)), vmax)
+        if np.ndim(scale) == 0:
+            scale = float(scale)
+        vl = vl * scale
+        vr = vr * scale
+
+    return out.set(vl, vr)
+
+class HeadingController:
+    """
+    Drives at a constant speed while steering towards a goal heading. The heading
+    error is wrapped to [-pi, pi) so the robot always turns the short way
+
+    inputs:
+    -------
+        controller (P): P, PI or PID acting on the heading error, output in rad/s
+        speed (float): linear velocity [m/s]
+        wheel_base (float): distance between both wheels [m]
+        vmax (float): wheels' max linear velocity [m/s], None leaves them unbounded
+
+    return:
+    -------
+        heading_controller (HeadingController): heading controller instance
+    """
+    def __init__(self,
+                 controller: P=None,
+                 speed: float=0.5,
+                 wheel_base: float=L,
+                 vmax: float=vmax) -> None:
+
+        self.controller = controller if controller is not None else P(kp=5.)
+        self.speed = speed
+        self.wheel_base = wheel_base
+        self.vmax = vmax
+        self.inputs = WheelLinearInputs(vl=0., vr=0.) # overwritten on every update
+
+    def update(self, goal, state) -> WheelLinearInputs:
+        """
+        computes the wheel velocities steering towards the goal heading
+
+        inputs:
+        -------
+            goal (float | np.ndarray): goal heading of each robot [rad]
+            state: RobotState, or an object with px, py and phi arrays such as BatchRobotKinematics
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities, overwritten by the next update
+        """
+        w = self.controller.updateError(wrapAngle(goal - state.phi))
+
+        return wheelInputs(self.speed, w, self.wheel_base, self.vmax, self.inputs)
+
+    def reset(self) -> None:
+        """
+        clears the controller's memory
+        """
+        self.controller.reset()
+
+        return None
+
+class PoseController:
+    """
+    Drives to a goal pose with the polar-coordinates control law for differential drive
+    robots: with rho the distance to the goal, alpha the bearing of the goal from the
+    robot's heading and beta the angle still to turn once there,
+
+        v = k_rho * rho,    w = k_alpha * alpha + k_beta * beta
+
+    which converges when k_rho > 0, k_beta < 0 and k_alpha > k_rho. Goals behind the
+    robot are reached in reverse. Robots within tolerance of their goal stop
+
+    inputs:
+    -------
+        k_rho (float): distance gain [1/s]
+        k_alpha (float): bearing gain [1/s]
+        k_beta (float): final heading gain [1/s]
+        tolerance (float): distance to the goal under which a robot stops [m]
+        wheel_base (float): distance between both wheels [m]
+        vmax (float): wheels' max linear velocity [m/s], None leaves them unbounded
+
+    return:
+    -------
+        pose_controller (PoseController): pose controller instance
+    """
+    def __init__(self,
+                 k_rho: float=1.,
+                 k_alpha: float=4.,
+                 k_beta: float=-1.5,
+                 tolerance: float=0.01,
+                 wheel_base: float=L,
+                 vmax: float=vmax) -> None:
+
+        self.k_rho = k_rho
+        self.k_alpha = k_alpha
+        self.k_beta = k_beta
+        self.tolerance = tolerance
+        self.wheel_base = wheel_base
+        self.vmax = vmax
+        self.inputs = WheelLinearInputs(vl=0., vr=0.) # overwritten on every update
+
+    def update(self, goal, state) -> WheelLinearInputs:
+        """
+        computes the wheel velocities driving towards the goal pose
+
+        inputs:
+        -------
+            goal: goal pose, a RobotState or an object with px, py and phi arrays
+            state: RobotState, or an object with px, py and phi arrays such as BatchRobotKinematics
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities, overwritten by the next update
+        """
+        dx = goal.px - state.px
+        dy = goal.py - state.py
+        rho = np.hypot(dx, dy)
+        alpha = wrapAngle(np.arctan2(dy, dx) - state.phi)
+
+        # goals behind the robot are driven to in reverse
+        reverse = np.abs(alpha) > np.pi / 2
+        direction = np.where(reverse, -1., 1.)
+        alpha = wrapAngle(alpha + reverse * np.pi)
+        beta = wrapAngle(goal.phi - state.phi - alpha)
+
+        moving = rho > self.tolerance
+        v = np.where(moving, direction * self.k_rho * rho, 0.)
+        w = np.where(moving, self.k_alpha * alpha + self.k_beta * beta, 0.)
+
+        if np.ndim(v) == 0: # single robot: plain floats like the rest of the scalar model
+            v, w = float(v), float(w)
+
+        return wheelInputs(v, w, self.wheel_base, self.vmax, self.inputs)
+
+    def reset(self) -> None:
+        """
+        the pose controller has no memory
+        """
+        return None
+
+class ControllerSchedule:
+    """
+    Simulation stage that turns (goal, state) into wheel inputs with a controller, in
+    the same schedule(time, state) -> WheelLinearInputs form as the open-loop schedules,
+    so it can be handed to RobotSimulate.simulate or BatchRobotKinematics.run
+
+    inputs:
+    -------
+        controller: HeadingController, PoseController or any object with update(goal, state)
+        goal: fixed goal, or a callable goal(time) for a moving one
+
+    return:
+    -------
+        schedule (ControllerSchedule): callable schedule(time, state) -> WheelLinearInputs
+    """
+    def __init__(self,
+                 controller,
+                 goal) -> None:
+
+        self.controller = controller
+        self.goal = goal
+
+    def __call__(self, time: float, state) -> WheelLinearInputs:
+        """
+        gets the wheel inputs of the next step
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state: robot's (or fleet's) current state
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities for this step
+        """
+        goal = self.goal(time) if callable(self.goal) else self.goal
+
+        return self.controller.update(goal, state)
+
+class WaypointFollower:
+    """
+    Drives along planned paths, one per robot, such as the Waypoints of Planner.plan.
+    Each robot steers towards its current waypoint and moves on to the next one once
+    within the lookahead distance of it, so corners are cut smoothly. The robot slows
+    down when facing away from its waypoint and on the approach to its last one, and
+    stops within tolerance of it. Robots without waypoints stay still
+
+    inputs:
+    -------
+        speed (float): cruise linear velocity [m/s]
+        k_rho (float): gain of the slow-down on the approach to the last waypoint [1/s]
+        k_alpha (float): gain from the bearing of the waypoint to the angular velocity [1/s]
+        lookahead (float): distance at which a robot moves on to its next waypoint [m]
+        tolerance (float): distance to the last waypoint under which a robot stops [m]
+        wheel_base (float): distance between both wheels [m]
+        vmax (float): wheels' max linear velocity [m/s], None leaves them unbounded
+
+    return:
+    -------
+        waypoint_follower (WaypointFollower): waypoint follower instance
+    """
+    def __init__(self,
+                 speed: float=0.5,
+                 k_rho: float=1.,
+                 k_alpha: float=4.,
+                 lookahead: float=0.25,
+                 tolerance: float=0.02,
+                 wheel_base: float=L,
+                 vmax: float=vmax) -> None:
+
+        self.speed = speed
+        self.k_rho = k_rho
+        self.k_alpha = k_alpha
+        self.lookahead = lookahead
+        self.tolerance = tolerance
+        self.wheel_base = wheel_base
+        self.vmax = vmax
+        self.inputs = WheelLinearInputs(vl=0., vr=0.) # overwritten on every update
+
+        self.waypoints = None # paths being followed
+        self.index = None # current waypoint of each robot, in the flat waypoint arrays
+
+    def update(self, waypoints, state) -> WheelLinearInputs:
+        """
+        computes the wheel velocities driving along the paths. New waypoints restart
+        every robot at the first waypoint of its path
+
+        inputs:
+        -------
+            waypoints: Waypoints, or an object with flat x and y arrays and the starts and
+                counts of each robot's path
+            state: RobotState, or an object with px, py and phi arrays such as BatchRobotKinematics
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities, overwritten by the next update
+        """
+        if waypoints is not self.waypoints:
+            self.waypoints = waypoints
+            self.index = waypoints.starts.copy()
+
+        px, py, phi = np.atleast_1d(state.px), np.atleast_1d(state.py), np.atleast_1d(state.phi)
+        last = waypoints.starts + np.maximum(waypoints.counts, 1) - 1
+        has_path = waypoints.counts > 0
+        target = np.where(has_path, self.index, 0)
+        x = waypoints.x if len(waypoints.x) else np.zeros(1) # robots without a path look at a dummy waypoint
+        y = waypoints.y if len(waypoints.y) else np.zeros(1)
+
+        # move on past the waypoints already within reach
+        while True:
+            near = has_path & (target < last) & \
+                (np.hypot(x[target] - px, y[target] - py) < self.lookahead)
+            if not near.any():
+                break
+            target = target + near
+        self.index = np.where(has_path, target, self.index)
+
+        dx = x[target] - px
+        dy = y[target] - py
+        rho = np.hypot(dx, dy)
+        alpha = wrapAngle(np.arctan2(dy, dx) - phi)
+
+        # full speed towards intermediate waypoints, slowing down on the last one
+        v = np.where(target < last, self.speed, np.minimum(self.speed, self.k_rho * rho))
+        v = v * np.maximum(np.cos(alpha), 0.) # turn in place when facing away
+        w = self.k_alpha * alpha
+
+        moving = has_path & ((target < last) | (rho > self.tolerance))
+        v = np.where(moving, v, 0.)
+        w = np.where(moving, w, 0.)
+
+        if np.ndim(state.px) == 0: # single robot: plain floats like the rest of the scalar model
+            v, w = float(v[0]), float(w[0])
+
+        return wheelInputs(v, w, self.wheel_base, self.vmax, self.inputs)
+
+    def reset(self) -> None:
+        """
+        restarts every robot at the first waypoint of its path
+        """
+        self.waypoints = None
+        self.index = None
+
+        return None
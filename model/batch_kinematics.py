@@ -0,0 +1,317 @@
+"""
+Author: Miguel Tamayo
+
+batch_kinematics.py
+Contains class describing the kinematics of a fleet of robots stepped together
+"""
+
+from .states import RobotState, RobotDerivativeState
+from inputs.control_inputs import WheelLinearInputs
+from utilities.constants import *
+
+import numpy as np
+
+class BatchRobotKinematics:
+    """
+    class that holds the kinematics model of N robots in contiguous arrays.
+    Every robot follows the same model as RobotKinematics, but the whole fleet
+    is advanced with a single vectorized pass
+
+    inputs:
+    -------
+        n (int): number of robots in the fleet
+        dt (float): robots' step time
+        wheel_base (float): distance between both wheels [m]
+        integrator (str): "midpoint" for the fixed-step midpoint-heading update or
+            "exact" for the closed-form arc solution of constant wheel inputs
+
+    return:
+    -------
+        kinematics (BatchRobotKinematics): fleet kinematics instance
+    """
+    def __init__(self,
+                 n: int,
+                 dt: float=0.01,
+                 wheel_base: float=L,
+                 integrator: str="midpoint") -> None:
+
+        if integrator not in ("midpoint", "exact"):
+            raise ValueError(f"unknown integrator: {integrator}")
+
+        self.n = n      # number of robots
+        self.dt = dt    # sampling time
+        self.wheel_base = wheel_base # distance between both wheels
+        self.integrator = integrator # integration mode used by update()
+
+        # rows of each array are contiguous so they can be handed out as views
+        self.state = np.zeros((3, n))   # px, py, phi
+        self.dot = np.zeros((3, n))     # vx, vy, w
+        self.wheels = np.zeros((2, n))  # vl, vr
+
+        self.px, self.py, self.phi = self.state
+        self.vx, self.vy, self.w = self.dot
+        self.vl, self.vr = self.wheels
+
+        # scratch buffers reused on every step so update() does not allocate
+        self._v = np.empty(n)
+        self._heading = np.empty(n)
+        self._step = np.empty((3, n))
+
+    def setState(self, idx: int, state: RobotState) -> None:
+        """
+        sets a single robot's state to desired state
+
+        inputs:
+        -------
+            idx (int): index of the robot in the fleet
+            state (RobotState): new robot's state
+        """
+        self.px[idx] = state.px
+        self.py[idx] = state.py
+        self.phi[idx] = state.phi
+
+        return None
+
+    def setStates(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> None:
+        """
+        sets the state of every robot in the fleet
+
+        inputs:
+        -------
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+        """
+        self.px[:] = px
+        self.py[:] = py
+        self.phi[:] = phi
+
+        return None
+
+    def reset(self) -> None:
+        """
+        makes every robot's state, derivative state and wheel velocities zero
+        """
+        self.state.fill(0.)
+        self.dot.fill(0.)
+        self.wheels.fill(0.)
+
+        return None
+
+    def getState(self, idx: int) -> RobotState:
+        """
+        gets a single robot's current state
+
+        inputs:
+        -------
+            idx (int): index of the robot in the fleet
+
+        return:
+        -------
+            state (RobotState): robot's state
+        """
+        return RobotState(px=float(self.px[idx]), py=float(self.py[idx]), phi=float(self.phi[idx]))
+
+    def getDotState(self, idx: int) -> RobotDerivativeState:
+        """
+        gets a single robot's derivative state
+
+        inputs:
+        -------
+            idx (int): index of the robot in the fleet
+
+        return:
+        -------
+            derivative (RobotDerivativeState): robot's derivative state
+        """
+        return RobotDerivativeState(vx=float(self.vx[idx]), vy=float(self.vy[idx]), r_rate=float(self.w[idx]))
+
+    def getWheelVelocities(self, idx: int) -> RobotDerivativeState:
+        """
+        gets a single robot's left and right wheel velocities. Mirrors
+        RobotKinematics where vx maps to the left wheel and vy to the right
+
+        inputs:
+        -------
+            idx (int): index of the robot in the fleet
+
+        return:
+        -------
+            velocities (RobotDerivativeState): robot's left and right wheel velocities
+        """
+        return RobotDerivativeState(vx=float(self.vl[idx]), vy=float(self.vr[idx]))
+
+    def update(self, controls: WheelLinearInputs) -> None:
+        """
+        updates every robot's kinematics by one step
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): wheel velocities, either scalars shared
+                by the whole fleet or arrays with one entry per robot
+        """
+        if self.integrator == "exact":
+            return self.advance(controls, self.dt)
+
+        self.vl[:] = controls.vl
+        self.vr[:] = controls.vr
+
+        self.computeDerivative(phi=self.phi, vl=self.vl, vr=self.vr, out=self.dot) # calculate new derivative
+        self.integrateState(state=self.state, dot=self.dot, out=self.state) # integrate by dT
+
+        return None
+
+    def run(self, duration: float, schedule, time: float=0.) -> float:
+        """
+        steps the whole fleet for a fixed amount of simulated time, as fast as possible.
+        The schedule sees the fleet itself as its state, so a closed-loop controller
+        (see inputs/controls.py::ControllerSchedule) reads every robot's pose at once
+
+        inputs:
+        -------
+            duration (float): simulated time to run for [s]
+            schedule: callable schedule(time, fleet) -> WheelLinearInputs, evaluated
+                at the start of every step
+            time (float): simulation time of the first step [s]
+
+        return:
+        -------
+            time (float): simulation time after the last step [s]
+        """
+        for step in range(int(round(duration / self.dt))):
+            self.update(schedule(time, self))
+            time += self.dt
+
+        return time
+
+    def advance(self, controls: WheelLinearInputs, duration: float) -> None:
+        """
+        advances every robot across a whole interval of constant wheel inputs in one
+        step using the exact arc solution
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): wheel velocities held for the whole interval
+            duration (float): length of the interval [s]
+        """
+        self.vl[:] = controls.vl
+        self.vr[:] = controls.vr
+
+        self.computeArcDerivative(phi=self.phi, vl=self.vl, vr=self.vr, duration=duration, out=self.dot)
+        np.multiply(self.dot, duration, out=self._step)
+        self.state += self._step
+
+        return None
+
+    def computeArcDerivative(self,
+                             phi: np.ndarray,
+                             vl: np.ndarray,
+                             vr: np.ndarray,
+                             duration: float,
+                             out: np.ndarray=None) -> np.ndarray:
+        """
+        computes the fleet's average time-derivative over an interval of constant wheel inputs
+        (see RobotKinematics.computeArcDerivative)
+
+        inputs:
+        -------
+            phi (np.ndarray): robots' headings at the start of the interval [rad]
+            vl (np.ndarray): left wheel linear velocity inputs [m/s]
+            vr (np.ndarray): right wheel linear velocity inputs [m/s]
+            duration (float): length of the interval [s]
+            out (np.ndarray): optional (3, n) array the derivative is written into
+
+        return:
+        -------
+            dot (np.ndarray): (3, n) array of average vx, vy and w
+        """
+        if out is None:
+            out = np.empty((3, self.n))
+
+        v = self._v
+        half_turn = self._heading
+
+        np.add(vr, vl, out=v)
+        v /= 2. # robots' linear velocity in robots' frame
+        np.subtract(vr, vl, out=out[2])
+        out[2] /= self.wheel_base # robots' angular velocity around center
+
+        np.multiply(out[2], duration, out=half_turn)
+        half_turn /= 2
+        v *= np.sinc(half_turn / np.pi) # chord to arc length ratio
+        np.add(phi, half_turn, out=half_turn)
+
+        np.cos(half_turn, out=out[0])
+        out[0] *= v # vel in global frame
+        np.sin(half_turn, out=out[1])
+        out[1] *= v # vel in global frame
+
+        return out
+
+    def computeDerivative(self,
+                          phi: np.ndarray,
+                          vl: np.ndarray,
+                          vr: np.ndarray,
+                          out: np.ndarray=None) -> np.ndarray:
+        """
+        computes the fleet's time-derivative given the wheel linear velocities in each robot's local frame
+
+        inputs:
+        -------
+            phi (np.ndarray): robots' current headings [rad]
+            vl (np.ndarray): left wheel linear velocity inputs [m/s]
+            vr (np.ndarray): right wheel linear velocity inputs [m/s]
+            out (np.ndarray): optional (3, n) array the derivative is written into
+
+        return:
+        -------
+            dot (np.ndarray): (3, n) array of vx, vy and w
+        """
+        if out is None:
+            out = np.empty((3, self.n))
+
+        v = self._v
+        heading = self._heading
+
+        np.add(vr, vl, out=v)
+        v /= 2. # robots' linear velocity in robots' frame
+        np.subtract(vr, vl, out=out[2])
+        out[2] /= self.wheel_base # robots' angular velocity around center
+
+        # heading at the middle of the step
+        np.multiply(out[2], self.dt, out=heading)
+        heading /= 2
+        np.add(phi, heading, out=heading)
+
+        np.cos(heading, out=out[0])
+        out[0] *= v # vel in global frame
+        np.sin(heading, out=out[1])
+        out[1] *= v # vel in global frame
+
+        return out
+
+    def integrateState(self,
+                       state: np.ndarray,
+                       dot: np.ndarray,
+                       out: np.ndarray=None) -> np.ndarray:
+        """
+        integrates the fleet's state by one step
+
+        inputs:
+        -------
+            state (np.ndarray): (3, n) array of px, py, phi to integrate
+            dot (np.ndarray): (3, n) array of vx, vy, w
+            out (np.ndarray): optional (3, n) array the new state is written into,
+                may be state itself
+
+        return:
+        -------
+            new_state (np.ndarray): (3, n) array with integrated components
+        """
+        if out is None:
+            out = np.empty((3, self.n))
+
+        np.multiply(dot, self.dt, out=self._step)
+        np.add(state, self._step, out=out)
+
+        return out
@@ -0,0 +1,262 @@
+"""
+Author: Miguel Tamayo
+
+integrators.py
+Contains the integration schemes the kinematics model can step with
+"""
+
+from .states import RobotState, RobotDerivativeState
+
+import math
+
+class MidpointIntegrator:
+    """
+    Fixed-step Euler update that evaluates the velocity at the heading reached in the
+    middle of the step. Cheap, and exact for straight lines, but turns are cut short
+    by a relative error of about (w*dt)^2 / 24
+
+    return:
+    -------
+        integrator (MidpointIntegrator): integrator instance
+    """
+    name = "midpoint"
+    adaptive = False # True when the scheme picks its own sub-steps, see RobotKinematics.advance
+
+    def derivative(self,
+                   state: RobotState,
+                   vl: float,
+                   vr: float,
+                   duration: float,
+                   wheel_base: float,
+                   out: RobotDerivativeState=None) -> RobotDerivativeState:
+        """
+        computes the robot's average time-derivative over an interval of constant wheel inputs
+
+        inputs:
+        -------
+            state (RobotState): robot's state at the start of the interval
+            vl (float): left wheel linear velocity input [m/s]
+            vr (float): right wheel linear velocity input [m/s]
+            duration (float): length of the interval [s]
+            wheel_base (float): distance between both wheels [m]
+            out (RobotDerivativeState): optional derivative state overwritten with the result
+
+        return:
+        -------
+            dot (RobotDerivativeState): average time derivative over the interval
+        """
+        dot = out if out is not None else RobotDerivativeState()
+        v = (vr + vl) / 2. # robot's linear velocity in robot's frame
+        w = (vr - vl) / wheel_base # robot's angular velocity around center
+
+        heading = state.phi + (w*duration)/2
+        dot.vx = v * math.cos(heading) # vel in global frame
+        dot.vy = v * math.sin(heading) # vel in global frame
+        dot.w = w
+
+        return dot
+
+class ExactIntegrator(MidpointIntegrator):
+    """
+    Closed-form solution of constant wheel inputs: the robot follows a circular arc
+    whose chord points along the heading at the middle of the interval and is
+    shortened by sinc(w*duration/2). Exact for any duration
+
+    return:
+    -------
+        integrator (ExactIntegrator): integrator instance
+    """
+    name = "exact"
+
+    def derivative(self,
+                   state: RobotState,
+                   vl: float,
+                   vr: float,
+                   duration: float,
+                   wheel_base: float,
+                   out: RobotDerivativeState=None) -> RobotDerivativeState:
+        dot = out if out is not None else RobotDerivativeState()
+        v = (vr + vl) / 2. # robot's linear velocity in robot's frame
+        w = (vr - vl) / wheel_base # robot's angular velocity around center
+
+        half_turn = (w*duration)/2
+        chord = math.sin(half_turn) / half_turn if half_turn != 0. else 1. # chord to arc length ratio
+
+        dot.vx = v * chord * math.cos(state.phi + half_turn) # vel in global frame
+        dot.vy = v * chord * math.sin(state.phi + half_turn) # vel in global frame
+        dot.w = w
+
+        return dot
+
+def bodyRates(phi: float, v: float, w: float) -> tuple[float, float, float]:
+    """
+    right-hand side of the kinematics ODE
+
+    inputs:
+    -------
+        phi (float): robot's heading [rad]
+        v (float): robot's linear velocity in robot's frame [m/s]
+        w (float): robot's angular velocity [rad/s]
+
+    return:
+    -------
+        rates (tuple[float, float, float]): vx, vy and w in global frame
+    """
+    return v * math.cos(phi), v * math.sin(phi), w
+
+class RK4Integrator(MidpointIntegrator):
+    """
+    Classic fixed-step fourth order Runge-Kutta. Four derivative evaluations per
+    step; the error of a turn drops with (w*dt)^5 instead of (w*dt)^3
+
+    return:
+    -------
+        integrator (RK4Integrator): integrator instance
+    """
+    name = "rk4"
+
+    def derivative(self,
+                   state: RobotState,
+                   vl: float,
+                   vr: float,
+                   duration: float,
+                   wheel_base: float,
+                   out: RobotDerivativeState=None) -> RobotDerivativeState:
+        dot = out if out is not None else RobotDerivativeState()
+        v = (vr + vl) / 2.
+        w = (vr - vl) / wheel_base
+        h = duration
+
+        # the turn rate is constant, so every stage's heading is known up front
+        phi1 = state.phi
+        phi2 = phi1 + h / 2 * w
+        phi3 = phi1 + h / 2 * w
+        phi4 = phi1 + h * w
+
+        # average derivative: weighted mean of the four slopes
+        dot.vx = v * (math.cos(phi1) + 2 * math.cos(phi2) + 2 * math.cos(phi3) + math.cos(phi4)) / 6
+        dot.vy = v * (math.sin(phi1) + 2 * math.sin(phi2) + 2 * math.sin(phi3) + math.sin(phi4)) / 6
+        dot.w = w
+
+        return dot
+
+class RK45Integrator(MidpointIntegrator):
+    """
+    Embedded Dormand-Prince 5(4) Runge-Kutta with error control. Each interval is
+    covered with as many sub-steps as needed to keep the local error under tolerance:
+    straight segments are crossed in a single sub-step, tight turns are split. The
+    last accepted sub-step size is reused as the first guess of the next interval
+
+    Through RobotKinematics.update the interval is one dt, so a sub-step is never
+    longer than the fixed-step schemes' step and only a coarse dt pays off. Through
+    RobotKinematics.advance (e.g. RobotSimulate.playSegments) the interval is a whole
+    segment of constant inputs, and the sub-steps grow as long as the error allows
+
+    inputs:
+    -------
+        tolerance (float): maximum local error per sub-step, in meters and radians
+        min_step (float): smallest sub-step, taken even if the error is not met [s]
+
+    return:
+    -------
+        integrator (RK45Integrator): integrator instance
+    """
+    name = "rk45"
+    adaptive = True
+
+    # Dormand-Prince tableau, the stage times are not needed as the inputs are constant
+    a = ((),
+         (1/5,),
+         (3/40, 9/40),
+         (44/45, -56/15, 32/9),
+         (19372/6561, -25360/2187, 64448/6561, -212/729),
+         (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+         (35/384, 0., 500/1113, 125/192, -2187/6784, 11/84))
+    b5 = (35/384, 0., 500/1113, 125/192, -2187/6784, 11/84, 0.)
+    b4 = (5179/57600, 0., 7571/16695, 393/640, -92097/339200, 187/2100, 1/40)
+
+    def __init__(self,
+                 tolerance: float=1e-9,
+                 min_step: float=1e-6) -> None:
+
+        self.tolerance = tolerance
+        self.min_step = min_step
+        self.step_size = math.inf # next sub-step to try [s]
+        self.substeps = 0 # accepted sub-steps
+        self.rejected = 0 # sub-steps retried with a smaller size
+
+    def derivative(self,
+                   state: RobotState,
+                   vl: float,
+                   vr: float,
+                   duration: float,
+                   wheel_base: float,
+                   out: RobotDerivativeState=None) -> RobotDerivativeState:
+        dot = out if out is not None else RobotDerivativeState()
+        v = (vr + vl) / 2.
+        w = (vr - vl) / wheel_base
+
+        if duration == 0.: # nothing to average over: the rates at the start of the interval
+            return dot.set(*bodyRates(state.phi, v, w))
+
+        x = y = 0. # displacement since the start of the interval
+        phi = state.phi
+        elapsed = 0.
+        h = min(self.step_size, duration) # sub-step size to try
+
+        while elapsed < duration:
+            step = min(h, duration - elapsed)
+
+            k = []
+            for stage in range(7):
+                stage_phi = phi + step * sum(a * slope[2] for a, slope in zip(self.a[stage], k))
+                k.append(bodyRates(stage_phi, v, w))
+
+            # difference between the 5th and 4th order solutions
+            error = step * max(abs(sum((b5 - b4) * slope[idx] for b5, b4, slope in zip(self.b5, self.b4, k)))
+                               for idx in range(3))
+
+            accepted = error <= self.tolerance or step <= self.min_step
+            if accepted:
+                x += step * sum(b * slope[0] for b, slope in zip(self.b5, k))
+                y += step * sum(b * slope[1] for b, slope in zip(self.b5, k))
+                phi += step * sum(b * slope[2] for b, slope in zip(self.b5, k))
+                elapsed += step
+                self.substeps += 1
+            else:
+                self.rejected += 1
+
+            # grow or shrink the next sub-step from the error (5th order: exponent 1/5)
+            scale = 5. if error == 0. else min(5., max(0.2, 0.9 * (self.tolerance / error) ** 0.2))
+            proposal = max(step * scale, self.min_step)
+            # a sub-step cut short by the end of the interval says nothing against the size tried
+            h = max(h, proposal) if accepted and step < h else proposal
+
+        self.step_size = h
+
+        return dot.set(x / duration, y / duration, (phi - state.phi) / duration)
+
+# integrators RobotKinematics can be created with, by name
+integrators = {"midpoint": MidpointIntegrator,
+               "exact": ExactIntegrator,
+               "rk4": RK4Integrator,
+               "rk45": RK45Integrator}
+
+def makeIntegrator(integrator) -> MidpointIntegrator:
+    """
+    builds an integrator from its name, integrator instances are returned as they are
+
+    inputs:
+    -------
+        integrator (str | MidpointIntegrator): name in integrators, or an integrator instance
+
+    return:
+    -------
+        integrator (MidpointIntegrator): integrator instance
+    """
+    if not isinstance(integrator, str):
+        return integrator
+    if integrator not in integrators:
+        raise ValueError(f"unknown integrator: {integrator}")
+
+    return integrators[integrator]()
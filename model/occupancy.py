@@ -0,0 +1,532 @@
+"""
+Author: Miguel Tamayo
+
+occupancy.py
+Contains tiled grids and the coverage and occupancy maps built on them from robot
+trajectories and range scans
+"""
+
+from .world import robot_footprint, ranges
+
+import numpy as np
+
+def packCells(ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+    """
+    packs cell indices into single integers, e.g. to sort or deduplicate cells
+
+    inputs:
+    -------
+        ix, iy (np.ndarray): cell indices, within +/- 2^31
+
+    return:
+    -------
+        keys (np.ndarray): one int64 per cell
+    """
+    return (np.asarray(ix, dtype=np.int64) << 32) + (np.asarray(iy, dtype=np.int64) & 0xFFFFFFFF)
+
+def unpackCells(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    recovers the cell indices of packCells
+
+    inputs:
+    -------
+        keys (np.ndarray): packed cells
+
+    return:
+    -------
+        ix, iy (np.ndarray): cell indices
+    """
+    return keys >> 32, ((keys & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000
+
+def uniqueCells(keys: np.ndarray) -> np.ndarray:
+    """
+    sorts packed cells and drops the repeated ones
+
+    inputs:
+    -------
+        keys (np.ndarray): packed cells (see packCells)
+
+    return:
+    -------
+        keys (np.ndarray): sorted distinct cells
+    """
+    keys = np.sort(keys)
+
+    return keys[np.diff(keys, prepend=keys[:1] - 1) != 0]
+
+class TiledGrid:
+    """
+    Unbounded 2D grid of cells stored as square tiles that are only allocated once a
+    cell in them is written, so a large floor costs memory only where robots went.
+    Cells are addressed by integer indices (ix, iy) = floor((x, y) / resolution).
+    Every write takes whole arrays of cells: they are grouped by tile with one sort
+    and each touched tile is written with a single fancy-indexing operation
+
+    inputs:
+    -------
+        resolution (float): side of a cell [m]
+        tile_size (int): cells along each side of a tile
+        dtype (np.dtype): cell type
+        fill: value of cells never written
+
+    return:
+    -------
+        grid (TiledGrid): tiled grid instance
+    """
+    def __init__(self,
+                 resolution: float=0.05,
+                 tile_size: int=64,
+                 dtype=np.uint8,
+                 fill=0) -> None:
+
+        self.resolution = resolution
+        self.tile_size = tile_size
+        self.dtype = np.dtype(dtype)
+        self.fill = fill
+        self.tiles = {} # (tx, ty) -> (tile_size, tile_size) array indexed [local iy, local ix]
+        self.dirty = set() # tiles written since the last takeDirty()
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        memory used by the allocated tiles [bytes]
+        """
+        return len(self.tiles) * self.tile_size * self.tile_size * self.dtype.itemsize
+
+    def cellOf(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        gets the cell holding each point
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            ix, iy (np.ndarray): cell indices
+        """
+        return (np.floor(np.asarray(x) / self.resolution).astype(np.int64),
+                np.floor(np.asarray(y) / self.resolution).astype(np.int64))
+
+    def groupByTile(self, ix: np.ndarray, iy: np.ndarray):
+        """
+        splits cells by the tile holding them
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            groups: iterator of ((tx, ty), selection, local iy, local ix), selection being
+                the positions of the tile's cells in ix and iy
+        """
+        ix = np.asarray(ix, dtype=np.int64).ravel()
+        iy = np.asarray(iy, dtype=np.int64).ravel()
+        tx = ix // self.tile_size
+        ty = iy // self.tile_size
+        keys = packCells(tx, ty)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.diff(sorted_keys, prepend=sorted_keys[:1] - 1))
+        ends = np.append(starts[1:], len(order))
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            selection = order[start:end]
+            first = order[start]
+            yield ((int(tx[first]), int(ty[first])), selection,
+                   iy[selection] - ty[first] * self.tile_size, ix[selection] - tx[first] * self.tile_size)
+
+    def tile(self, key: tuple[int, int]) -> np.ndarray:
+        """
+        gets a tile, allocating it on first use
+
+        inputs:
+        -------
+            key (tuple[int, int]): tile indices (tx, ty)
+
+        return:
+        -------
+            tile (np.ndarray): (tile_size, tile_size) cells indexed [local iy, local ix]
+        """
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = np.full((self.tile_size, self.tile_size), self.fill, dtype=self.dtype)
+
+        return tile
+
+    def mark(self, ix: np.ndarray, iy: np.ndarray, value=1) -> None:
+        """
+        sets cells to a value
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+            value: new value of the cells
+        """
+        for key, _, local_y, local_x in self.groupByTile(ix, iy):
+            self.tile(key)[local_y, local_x] = value
+            self.dirty.add(key)
+
+        return None
+
+    def add(self, ix: np.ndarray, iy: np.ndarray, values, low=None, high=None) -> None:
+        """
+        adds values to cells, repeated cells adding up, and clips the written cells
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+            values (float | np.ndarray): value added to each cell
+            low, high: bounds the cells are clipped to, None for no bound
+        """
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype), np.shape(np.ravel(ix)))
+        for key, selection, local_y, local_x in self.groupByTile(ix, iy):
+            tile = self.tile(key)
+            np.add.at(tile, (local_y, local_x), values[selection])
+            if low is not None or high is not None: # only the written cells, others keep their values
+                tile[local_y, local_x] = np.clip(tile[local_y, local_x], low, high)
+            self.dirty.add(key)
+
+        return None
+
+    def values(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        """
+        reads cells
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            values (np.ndarray): value of each cell, fill for unallocated tiles
+        """
+        values = np.full(np.shape(np.ravel(ix)), self.fill, dtype=self.dtype)
+        for key, selection, local_y, local_x in self.groupByTile(ix, iy):
+            tile = self.tiles.get(key)
+            if tile is not None:
+                values[selection] = tile[local_y, local_x]
+
+        return values.reshape(np.shape(ix))
+
+    def count(self) -> int:
+        """
+        counts the cells that differ from fill
+
+        return:
+        -------
+            cells (int): written cells
+        """
+        return int(sum(np.count_nonzero(tile != self.fill) for tile in self.tiles.values()))
+
+    def bounds(self) -> tuple[int, int, int, int]:
+        """
+        gets the cells covered by the allocated tiles
+
+        return:
+        -------
+            bounds (tuple): (ix_min, iy_min, ix_max, iy_max), exclusive max, all 0 when empty
+        """
+        if not self.tiles:
+            return 0, 0, 0, 0
+
+        keys = np.array(list(self.tiles))
+        low = keys.min(axis=0) * self.tile_size
+        high = (keys.max(axis=0) + 1) * self.tile_size
+
+        return int(low[0]), int(low[1]), int(high[0]), int(high[1])
+
+    def dense(self) -> tuple[np.ndarray, int, int]:
+        """
+        copies the allocated tiles into a single array, e.g. to save or analyze the map
+
+        return:
+        -------
+            cells (np.ndarray): cells indexed [iy - iy_min, ix - ix_min]
+            ix_min, iy_min (int): cell indices of cells[0, 0]
+        """
+        ix_min, iy_min, ix_max, iy_max = self.bounds()
+        cells = np.full((iy_max - iy_min, ix_max - ix_min), self.fill, dtype=self.dtype)
+        for (tx, ty), tile in self.tiles.items():
+            row = ty * self.tile_size - iy_min
+            column = tx * self.tile_size - ix_min
+            cells[row:row + self.tile_size, column:column + self.tile_size] = tile
+
+        return cells, ix_min, iy_min
+
+    def takeDirty(self) -> set:
+        """
+        gets the tiles written since the last call and forgets them
+
+        return:
+        -------
+            keys (set): (tx, ty) of the written tiles
+        """
+        dirty, self.dirty = self.dirty, set()
+
+        return dirty
+
+    def clear(self) -> None:
+        """
+        frees every tile
+        """
+        self.dirty.update(self.tiles)
+        self.tiles = {}
+
+        return None
+
+def traceCells(x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray,
+               resolution: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    rasterizes line segments into the cells they cross, every segment at once: each
+    segment takes as many steps as cells along its longer axis, like Bresenham's line,
+    and every step of every segment is generated in one pass. The end cell is left out
+
+    inputs:
+    -------
+        x0, y0 (np.ndarray): segments' starts [m]
+        x1, y1 (np.ndarray): segments' ends [m]
+        resolution (float): side of a cell [m]
+
+    return:
+    -------
+        ix, iy (np.ndarray): crossed cells
+        segment (np.ndarray): segment of each cell
+    """
+    cx0 = np.floor(np.asarray(x0) / resolution).astype(np.int64)
+    cy0 = np.floor(np.asarray(y0) / resolution).astype(np.int64)
+    cx1 = np.floor(np.asarray(x1) / resolution).astype(np.int64)
+    cy1 = np.floor(np.asarray(y1) / resolution).astype(np.int64)
+    steps = np.maximum(np.abs(cx1 - cx0), np.abs(cy1 - cy0))
+
+    segment = np.repeat(np.arange(len(steps)), steps)
+    step = ranges(np.zeros(len(steps)), steps)
+    fraction = step / np.maximum(steps[segment], 1)
+
+    return (cx0[segment] + np.rint(fraction * (cx1 - cx0)[segment]).astype(np.int64),
+            cy0[segment] + np.rint(fraction * (cy1 - cy0)[segment]).astype(np.int64),
+            segment)
+
+class CoverageMap:
+    """
+    Floor covered by a robot's footprint along its trajectory. Poses are only stamped
+    once the robot moved (or turned, measured at the footprint's edge) by half a cell
+    since the last stamp; each stamp rasterizes the footprint over a template of the
+    cells around the robot in one vectorized test
+
+    inputs:
+    -------
+        resolution (float): side of a cell [m]
+        footprint (np.ndarray): (k, 2) convex robot outline in its own frame [m]
+        tile_size (int): cells along each side of a tile
+
+    return:
+    -------
+        coverage (CoverageMap): coverage map instance
+    """
+    def __init__(self,
+                 resolution: float=0.02,
+                 footprint: np.ndarray=robot_footprint,
+                 tile_size: int=64) -> None:
+
+        self.grid = TiledGrid(resolution, tile_size, np.uint8, 0)
+        self.resolution = resolution
+        self.footprint = np.asarray(footprint, dtype=np.float64)
+        self.radius = float(np.hypot(self.footprint[:, 0], self.footprint[:, 1]).max())
+        self.spacing = resolution / 2 # distance between stamps [m]
+
+        # footprint edges as half-planes: a point p is inside when normal . p <= offset for all
+        edges = np.roll(self.footprint, -1, axis=0) - self.footprint
+        self.normals = np.stack((edges[:, 1], -edges[:, 0]), axis=1)
+        if np.mean(self.normals @ self.footprint.mean(axis=0) - np.sum(self.normals * self.footprint, axis=1)) > 0:
+            self.normals = -self.normals # clockwise outline
+        self.offsets = np.sum(self.normals * self.footprint, axis=1)
+
+        # cells around the robot's cell that the footprint can reach
+        reach = int(np.ceil(self.radius / resolution)) + 1
+        offset_x, offset_y = np.meshgrid(np.arange(-reach, reach + 1), np.arange(-reach, reach + 1))
+        self.template_x = offset_x.ravel()
+        self.template_y = offset_y.ravel()
+
+        self.previous = None # last pose added
+        self.travel = 0. # motion since the last multiple of the spacing [m]
+
+    @property
+    def area(self) -> float:
+        """
+        covered floor [m^2]
+        """
+        return self.grid.count() * self.resolution ** 2
+
+    def stamp(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray, chunk: int=4096) -> None:
+        """
+        marks the cells whose center is under the footprint at each pose
+
+        inputs:
+        -------
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+            chunk (int): poses rasterized at once, bounds the temporary memory
+        """
+        for start in range(0, len(px), chunk):
+            x, y, heading = px[start:start + chunk], py[start:start + chunk], phi[start:start + chunk]
+            ix, iy = self.grid.cellOf(x, y)
+            cells_x = ix[:, None] + self.template_x
+            cells_y = iy[:, None] + self.template_y
+
+            # cell centers in the robot's frame
+            dx = (cells_x + 0.5) * self.resolution - x[:, None]
+            dy = (cells_y + 0.5) * self.resolution - y[:, None]
+            cos, sin = np.cos(heading)[:, None], np.sin(heading)[:, None]
+            local_x = cos * dx + sin * dy
+            local_y = -sin * dx + cos * dy
+
+            inside = np.ones(local_x.shape, dtype=bool)
+            for (normal_x, normal_y), offset in zip(self.normals.tolist(), self.offsets.tolist()):
+                inside &= normal_x * local_x + normal_y * local_y <= offset
+
+            self.grid.mark(cells_x[inside], cells_y[inside])
+
+        return None
+
+    def addPoses(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> int:
+        """
+        adds the next poses of the robot's trajectory, in order
+
+        inputs:
+        -------
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+
+        return:
+        -------
+            stamps (int): poses that were rasterized
+        """
+        px = np.asarray(px, dtype=np.float64).ravel()
+        py = np.asarray(py, dtype=np.float64).ravel()
+        phi = np.asarray(phi, dtype=np.float64).ravel()
+        if len(px) == 0:
+            return 0
+
+        first = self.previous is None
+        if first:
+            self.previous = (px[0], py[0], phi[0])
+
+        # motion from pose to pose; a stamp each time the travel crosses a multiple of the spacing
+        motion = (np.hypot(np.diff(px, prepend=self.previous[0]), np.diff(py, prepend=self.previous[1]))
+                  + self.radius * np.abs(np.diff(phi, prepend=self.previous[2])))
+        travel = self.travel + np.cumsum(motion)
+        crossed = np.floor(travel / self.spacing)
+        stamps = np.diff(crossed, prepend=0.) > 0
+        stamps[0] |= first
+        stamps = np.flatnonzero(stamps)
+        self.stamp(px[stamps], py[stamps], phi[stamps])
+
+        self.travel = travel[-1] - crossed[-1] * self.spacing
+        self.previous = (px[-1], py[-1], phi[-1])
+
+        return len(stamps)
+
+    def clear(self) -> None:
+        """
+        forgets every covered cell
+        """
+        self.grid.clear()
+        self.previous = None
+        self.travel = 0.
+
+        return None
+
+class OccupancyMap:
+    """
+    Log-odds occupancy grid built from range scans. Each beam lowers the odds of the
+    cells it crosses and raises the odds of the cell it ends in when it hit something.
+    A cell is updated once per scan however many beams reach it, and a hit wins over
+    a beam crossing the same cell
+
+    inputs:
+    -------
+        resolution (float): side of a cell [m]
+        tile_size (int): cells along each side of a tile
+        free (float): log-odds added to crossed cells
+        occupied (float): log-odds added to hit cells
+        limit (float): log-odds are clipped to +/- limit so the map can change its mind
+
+    return:
+    -------
+        occupancy (OccupancyMap): occupancy map instance
+    """
+    def __init__(self,
+                 resolution: float=0.05,
+                 tile_size: int=64,
+                 free: float=-0.4,
+                 occupied: float=0.85,
+                 limit: float=4.) -> None:
+
+        self.grid = TiledGrid(resolution, tile_size, np.float32, 0.)
+        self.resolution = resolution
+        self.free = free
+        self.occupied = occupied
+        self.limit = limit
+
+    def addScan(self, sensor, distance: np.ndarray, state) -> None:
+        """
+        integrates a scan of every robot
+
+        inputs:
+        -------
+            sensor (RangeSensor): sensor the scan was taken with
+            distance (np.ndarray): (m, beams) or (beams,) distances from sensor.scan [m]
+            state: poses the scan was taken from, see RangeSensor.scan
+        """
+        end_x, end_y = sensor.points(distance, state)
+        end_x, end_y = end_x.ravel(), end_y.ravel()
+        start_x = np.repeat(np.atleast_1d(state.px), sensor.beams)
+        start_y = np.repeat(np.atleast_1d(state.py), sensor.beams)
+
+        crossed_x, crossed_y, _ = traceCells(start_x, start_y, end_x, end_y, self.resolution)
+        # hits are nudged along the beam so a hit on a cell border lands in the obstacle's cell
+        hit = np.ravel(distance) < sensor.max_range
+        nudged_x, nudged_y = sensor.points(distance + self.resolution * 1e-3, state)
+        hit_x, hit_y = self.grid.cellOf(nudged_x.ravel()[hit], nudged_y.ravel()[hit])
+
+        # one update per cell and scan
+        crossed = uniqueCells(packCells(crossed_x, crossed_y))
+        hits = uniqueCells(packCells(hit_x, hit_y))
+        if len(hits):
+            crossed = crossed[hits[np.minimum(np.searchsorted(hits, crossed), len(hits) - 1)] != crossed]
+
+        self.grid.add(*unpackCells(crossed), self.free, -self.limit, self.limit)
+        self.grid.add(*unpackCells(hits), self.occupied, -self.limit, self.limit)
+
+        return None
+
+    def probability(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        gets the probability of the points being occupied
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            probability (np.ndarray): occupancy probability, 0.5 where nothing was seen
+        """
+        return 1. / (1. + np.exp(-self.grid.values(*self.grid.cellOf(x, y))))
+
+    def clear(self) -> None:
+        """
+        forgets every scan
+        """
+        self.grid.clear()
+
+        return None
@@ -0,0 +1,605 @@
+"""
+Author: Miguel Tamayo
+
+planner.py
+Contains grid path planners: cost-to-go fields cached per goal, shared by every robot
+heading there, and a one-off A* search
+"""
+
+from .world import World, ranges
+from .occupancy import OccupancyMap
+
+from collections import OrderedDict
+import heapq
+import math
+import numpy as np
+
+# 8-connected moves (dx, dy) and their lengths [cells]
+moves = np.array([[1, 0], [-1, 0], [0, 1], [0, -1], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+move_costs = np.hypot(moves[:, 0], moves[:, 1])
+
+class PlanningGrid:
+    """
+    Cells a robot's center cannot enter. Every change bumps the version, which tells
+    the planners their cached fields are stale
+
+    inputs:
+    -------
+        blocked (np.ndarray): (rows, columns) True for blocked cells, indexed [iy, ix]
+        resolution (float): side of a cell [m]
+        origin (tuple[float, float]): position of the corner of cell (0, 0) [m]
+
+    return:
+    -------
+        grid (PlanningGrid): planning grid instance
+    """
+    def __init__(self,
+                 blocked: np.ndarray,
+                 resolution: float=0.1,
+                 origin: tuple[float, float]=(0., 0.)) -> None:
+
+        self.resolution = resolution
+        self.origin_x, self.origin_y = origin
+        self.version = 0
+        self.setBlocked(blocked)
+
+    def setBlocked(self, blocked: np.ndarray) -> None:
+        """
+        replaces every cell of the grid
+
+        inputs:
+        -------
+            blocked (np.ndarray): (rows, columns) True for blocked cells, indexed [iy, ix]
+        """
+        self.blocked = np.array(blocked, dtype=bool)
+        self.rows, self.columns = self.blocked.shape
+        self.version += 1
+
+        return None
+
+    def block(self, x: np.ndarray, y: np.ndarray, blocked: bool=True) -> int:
+        """
+        blocks (or frees) the cells holding the given points, e.g. a newly seen obstacle
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+            blocked (bool): False to free the cells instead
+
+        return:
+        -------
+            changed (int): cells that changed
+        """
+        ix, iy = self.cellOf(x, y)
+        inside = self.inGrid(ix, iy)
+        ix, iy = ix[inside], iy[inside]
+
+        changed = np.count_nonzero(self.blocked[iy, ix] != blocked)
+        if changed:
+            self.blocked[iy, ix] = blocked
+            self.version += 1
+
+        return int(changed)
+
+    def cellOf(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        gets the cell holding each point
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            ix, iy (np.ndarray): cell indices, possibly outside the grid
+        """
+        ix = np.floor((np.atleast_1d(x) - self.origin_x) / self.resolution).astype(np.int64)
+        iy = np.floor((np.atleast_1d(y) - self.origin_y) / self.resolution).astype(np.int64)
+
+        return ix, iy
+
+    def inGrid(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        """
+        checks which cells are inside the grid
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            inside (np.ndarray): True for cells inside the grid
+        """
+        return (ix >= 0) & (ix < self.columns) & (iy >= 0) & (iy < self.rows)
+
+    def cellCenter(self, ix: np.ndarray, iy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        gets the position of the cells' centers
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            x, y (np.ndarray): cells' centers [m]
+        """
+        return self.origin_x + (ix + 0.5) * self.resolution, self.origin_y + (iy + 0.5) * self.resolution
+
+def inflateCells(blocked: np.ndarray, cells: int) -> np.ndarray:
+    """
+    grows the blocked cells by a disk
+
+    inputs:
+    -------
+        blocked (np.ndarray): (rows, columns) True for blocked cells
+        cells (int): disk's radius [cells]
+
+    return:
+    -------
+        inflated (np.ndarray): (rows, columns) blocked cells grown by the disk
+    """
+    inflated = blocked.copy()
+    rows, columns = blocked.shape
+    for dy in range(-cells, cells + 1):
+        for dx in range(-cells, cells + 1):
+            if (dx == 0 and dy == 0) or dx * dx + dy * dy > cells * cells:
+                continue
+            inflated[max(dy, 0):rows + min(dy, 0), max(dx, 0):columns + min(dx, 0)] |= \
+                blocked[max(-dy, 0):rows + min(-dy, 0), max(-dx, 0):columns + min(-dx, 0)]
+
+    return inflated
+
+def gridFromWorld(world: World, resolution: float=0.1, inflation: float=None) -> PlanningGrid:
+    """
+    rasterizes the world's obstacles over its bounds. A cell is blocked when its center
+    is inside an obstacle or closer than the inflation to one
+
+    inputs:
+    -------
+        world (World): world holding the obstacles
+        resolution (float): side of a cell [m]
+        inflation (float): clearance kept from the obstacles [m], None uses the robot's
+            radius so the path is free whatever the robot's heading
+
+    return:
+    -------
+        grid (PlanningGrid): planning grid over the world's bounds
+    """
+    inflation = world.radius if inflation is None else inflation
+    xmin, ymin, xmax, ymax = world.bounds
+    grid = PlanningGrid(np.zeros((int(np.ceil((ymax - ymin) / resolution)),
+                                  int(np.ceil((xmax - xmin) / resolution))), dtype=bool),
+                        resolution, (xmin, ymin))
+
+    ix, iy = np.meshgrid(np.arange(grid.columns), np.arange(grid.rows))
+    x, y = grid.cellCenter(ix.ravel(), iy.ravel())
+    blocked = world.occupied(x, y)
+
+    # distance from the cell centers to the edges within the inflation
+    if inflation > 0. and len(world.edges):
+        starts, counts, bucket = world.bucketEdges(inflation)
+        column = np.clip(np.floor((x - xmin) / world.cell_size), 0, world.columns - 1).astype(np.int64)
+        row = np.clip(np.floor((y - ymin) / world.cell_size), 0, world.rows - 1).astype(np.int64)
+        cell = column * world.rows + row
+        point = np.repeat(np.arange(len(x)), counts[cell])
+        x0, y0, x1, y1 = world.edges[bucket[ranges(starts[cell], counts[cell])]].T
+        ex, ey = x1 - x0, y1 - y0
+        along = np.clip(((x[point] - x0) * ex + (y[point] - y0) * ey) / np.maximum(ex * ex + ey * ey, 1e-12), 0., 1.)
+        near = np.hypot(x0 + along * ex - x[point], y0 + along * ey - y[point]) < inflation
+        blocked[point[near]] = True
+
+    grid.setBlocked(blocked.reshape(grid.rows, grid.columns))
+
+    return grid
+
+def gridFromOccupancy(occupancy: OccupancyMap, threshold: float=0., inflation: float=0.,
+                      unknown_blocked: bool=False) -> PlanningGrid:
+    """
+    thresholds an occupancy map over its allocated tiles
+
+    inputs:
+    -------
+        occupancy (OccupancyMap): map built from range scans
+        threshold (float): log-odds above which a cell is blocked, 0 is a probability of 0.5
+        inflation (float): clearance kept from the blocked cells [m]
+        unknown_blocked (bool): True to block the cells never seen
+
+    return:
+    -------
+        grid (PlanningGrid): planning grid over the map's tiles
+    """
+    cells, ix_min, iy_min = occupancy.grid.dense()
+    blocked = (cells > threshold) | (unknown_blocked & (cells == 0.))
+    blocked = inflateCells(blocked, int(np.ceil(inflation / occupancy.resolution)))
+
+    return PlanningGrid(blocked, occupancy.resolution,
+                        (ix_min * occupancy.resolution, iy_min * occupancy.resolution))
+
+def paddedMoves(columns: int, blocked: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    gets the flat offsets of the moves in a grid padded by one blocked cell, and which
+    moves each cell allows. Diagonal moves may not cut the corner of a blocked cell
+
+    inputs:
+    -------
+        columns (int): columns of the padded grid
+        blocked (np.ndarray): (rows * columns,) padded blocked cells, flat
+
+    return:
+    -------
+        offsets (np.ndarray): (8,) flat offset of each move
+        allowed (np.ndarray): (8, rows * columns) True where the move stays on free cells
+    """
+    offsets = moves[:, 1] * columns + moves[:, 0]
+    free = ~blocked
+    allowed = np.empty((len(moves), len(blocked)), dtype=bool)
+    for k, (dx, dy) in enumerate(moves.tolist()):
+        # the padding is blocked, so moves out of a free cell never wrap around
+        allowed[k] = free & np.roll(free, -offsets[k])
+        if dx != 0 and dy != 0:
+            allowed[k] &= np.roll(free, -dx) & np.roll(free, -dy * columns)
+
+    return offsets, allowed
+
+class CostField:
+    """
+    Cost to go from every cell to one goal cell over 8-connected moves, and the move
+    each cell takes on its shortest path. It is computed once with a wavefront that
+    relaxes all the cells whose cost dropped at the same time, after which following
+    a path from anywhere is a lookup per cell
+
+    inputs:
+    -------
+        grid (PlanningGrid): grid the field is computed on
+        goal_ix, goal_iy (int): goal cell
+
+    return:
+    -------
+        field (CostField): cost-to-go field instance
+    """
+    def __init__(self,
+                 grid: PlanningGrid,
+                 goal_ix: int,
+                 goal_iy: int) -> None:
+
+        self.goal = (goal_ix, goal_iy)
+        self.version = grid.version
+        self.columns = grid.columns + 2 # padded by one blocked cell on each side
+        self.rows = grid.rows + 2
+
+        blocked = np.ones((self.rows, self.columns), dtype=bool)
+        blocked[1:-1, 1:-1] = grid.blocked
+        blocked = blocked.ravel()
+        offsets, allowed = paddedMoves(self.columns, blocked)
+
+        # wavefront: cells whose cost dropped relax their neighbors, until nothing drops
+        self.cost = np.full(len(blocked), np.inf)
+        goal = (goal_iy + 1) * self.columns + goal_ix + 1
+        frontier = np.array([goal]) if grid.inGrid(goal_ix, goal_iy) and not blocked[goal] \
+            else np.zeros(0, dtype=np.int64)
+        self.cost[frontier] = 0.
+        while len(frontier):
+            # moves are symmetric, so a neighbor reaches the frontier cell with the reverse move
+            move, cell = np.nonzero(allowed[:, frontier])
+            neighbor = frontier[cell] + offsets[move]
+            cost = self.cost[frontier[cell]] + move_costs[move]
+            improved = cost < self.cost[neighbor]
+            neighbor, cost = neighbor[improved], cost[improved]
+            np.minimum.at(self.cost, neighbor, cost)
+            frontier = np.unique(neighbor)
+
+        # next cell of every cell on its shortest path, the goal and unreachable cells stay put
+        cells = np.arange(len(blocked))
+        through = self.cost[cells + offsets[:, None] * allowed] + np.where(allowed, move_costs[:, None], np.inf)
+        self.next = cells + offsets[np.argmin(through, axis=0)]
+        stay = (self.cost == 0.) | ~np.isfinite(self.cost)
+        self.next[stay] = cells[stay]
+
+    def flat(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        """
+        gets the index of cells in the field's padded arrays, cells outside the grid map
+        to the (blocked) padding
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            index (np.ndarray): flat padded indices
+        """
+        return np.clip(iy + 1, 0, self.rows - 1) * self.columns + np.clip(ix + 1, 0, self.columns - 1)
+
+    def costToGo(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        """
+        gets the cost from cells to the goal
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): cell indices
+
+        return:
+        -------
+            cost (np.ndarray): path length to the goal [cells], inf if unreachable
+        """
+        return self.cost[self.flat(ix, iy)]
+
+    def descend(self, ix: np.ndarray, iy: np.ndarray) -> list[np.ndarray]:
+        """
+        follows the shortest paths from many cells at once
+
+        inputs:
+        -------
+            ix, iy (np.ndarray): start cells
+
+        return:
+        -------
+            cells (list[np.ndarray]): flat padded cells, one array per step, from the start
+                cells until every path reached the goal
+        """
+        cell = self.flat(ix, iy)
+        cells = [cell]
+        while True:
+            cell = self.next[cell]
+            if np.array_equal(cell, cells[-1]):
+                return cells
+            cells.append(cell)
+
+class Waypoints:
+    """
+    Paths of many robots packed in flat arrays: the waypoints of robot i are
+    x[starts[i]:starts[i] + counts[i]] and the same slice of y. A robot without a path
+    has no waypoints
+
+    inputs:
+    -------
+        paths (list[np.ndarray]): (k, 2) waypoints of each robot [m]
+
+    return:
+    -------
+        waypoints (Waypoints): waypoints instance
+    """
+    def __init__(self,
+                 paths: list[np.ndarray]) -> None:
+
+        paths = [np.reshape(np.asarray(path, dtype=np.float64), (-1, 2)) for path in paths]
+        self.counts = np.array([len(path) for path in paths], dtype=np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.int64)
+        points = np.concatenate(paths) if paths else np.zeros((0, 2))
+        self.x = points[:, 0]
+        self.y = points[:, 1]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def path(self, i: int) -> np.ndarray:
+        """
+        gets the waypoints of one robot
+
+        inputs:
+        -------
+            i (int): robot index
+
+        return:
+        -------
+            path (np.ndarray): (k, 2) waypoints [m]
+        """
+        start, count = self.starts[i], self.counts[i]
+
+        return np.stack((self.x[start:start + count], self.y[start:start + count]), axis=1)
+
+class Planner:
+    """
+    Plans paths on a grid from cost-to-go fields, one per goal cell, kept in a small
+    least-recently-used cache. Every robot heading to the same goal shares its field,
+    so re-planning a fleet is a lookup per cell of its paths. Fields computed for an
+    older version of the grid are recomputed when next used
+
+    inputs:
+    -------
+        grid (PlanningGrid): grid to plan on
+        cache_size (int): most fields kept
+
+    return:
+    -------
+        planner (Planner): planner instance
+    """
+    def __init__(self,
+                 grid: PlanningGrid,
+                 cache_size: int=16) -> None:
+
+        self.grid = grid
+        self.cache_size = cache_size
+        self.fields = OrderedDict() # (goal_ix, goal_iy) -> CostField
+        self.hits = 0 # plans served from a cached field
+        self.misses = 0 # fields computed
+
+    def field(self, goal_ix: int, goal_iy: int) -> CostField:
+        """
+        gets the cost-to-go field of a goal cell, from the cache when still valid
+
+        inputs:
+        -------
+            goal_ix, goal_iy (int): goal cell
+
+        return:
+        -------
+            field (CostField): cost-to-go field
+        """
+        key = (int(goal_ix), int(goal_iy))
+        field = self.fields.get(key)
+        if field is not None and field.version == self.grid.version:
+            self.fields.move_to_end(key)
+            self.hits += 1
+            return field
+
+        self.misses += 1
+        field = CostField(self.grid, *key)
+        self.fields[key] = field
+        self.fields.move_to_end(key)
+        while len(self.fields) > self.cache_size:
+            self.fields.popitem(last=False)
+
+        return field
+
+    def invalidate(self) -> None:
+        """
+        drops every cached field
+        """
+        self.fields.clear()
+
+        return None
+
+    def plan(self, px, py, goal_x, goal_y, simplify: bool=True) -> Waypoints:
+        """
+        plans the shortest collision-free paths of many robots, each to its own goal
+
+        inputs:
+        -------
+            px, py (float | np.ndarray): start positions [m]
+            goal_x, goal_y (float | np.ndarray): goal positions, one for all or one per robot [m]
+            simplify (bool): keep only the cells where the path turns
+
+        return:
+        -------
+            waypoints (Waypoints): cell centers along each path, ending on the goal itself.
+                Robots that cannot reach their goal, or start on a blocked cell, get no waypoints
+        """
+        px, py = np.atleast_1d(px).astype(np.float64), np.atleast_1d(py).astype(np.float64)
+        goal_x = np.broadcast_to(np.asarray(goal_x, dtype=np.float64), px.shape)
+        goal_y = np.broadcast_to(np.asarray(goal_y, dtype=np.float64), px.shape)
+        ix, iy = self.grid.cellOf(px, py)
+        goal_ix, goal_iy = self.grid.cellOf(goal_x, goal_y)
+
+        paths = [None] * len(px)
+        goals = np.unique(np.stack((goal_ix, goal_iy), axis=1), axis=0)
+        for gx, gy in goals.tolist():
+            robots = np.flatnonzero((goal_ix == gx) & (goal_iy == gy))
+            field = self.field(gx, gy)
+            cells = np.stack(field.descend(ix[robots], iy[robots]), axis=1)
+            reached = field.cost[cells[:, -1]] == 0.
+
+            for k, robot in enumerate(robots.tolist()):
+                if not reached[k]:
+                    paths[robot] = np.zeros((0, 2))
+                    continue
+                path = cells[k]
+                path = path[:np.argmax(path == path[-1]) + 1] # paths shorter than the longest stop early
+                path_x, path_y = self.grid.cellCenter(path % field.columns - 1, path // field.columns - 1)
+                if simplify:
+                    path_x, path_y = simplifyPath(path_x, path_y)
+                path_x[-1], path_y[-1] = goal_x[robot], goal_y[robot]
+                paths[robot] = np.stack((path_x, path_y), axis=1)
+
+        return Waypoints(paths)
+
+    def costToGo(self, px, py, goal_x: float, goal_y: float) -> np.ndarray:
+        """
+        gets the length of the shortest paths from many positions to one goal
+
+        inputs:
+        -------
+            px, py (float | np.ndarray): start positions [m]
+            goal_x, goal_y (float): goal position [m]
+
+        return:
+        -------
+            cost (np.ndarray): path lengths [m], inf if unreachable
+        """
+        goal_ix, goal_iy = self.grid.cellOf(goal_x, goal_y)
+        field = self.field(goal_ix[0], goal_iy[0])
+
+        return field.costToGo(*self.grid.cellOf(px, py)) * self.grid.resolution
+
+def simplifyPath(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    drops the cells of a grid path where it goes straight on
+
+    inputs:
+    -------
+        x, y (np.ndarray): cell centers along the path [m]
+
+    return:
+    -------
+        x, y (np.ndarray): first cell, cells where the path turns and last cell [m]
+    """
+    if len(x) < 3:
+        return x.copy(), y.copy()
+
+    dx, dy = np.diff(x), np.diff(y)
+    turns = np.flatnonzero(np.abs(dx[1:] * dy[:-1] - dy[1:] * dx[:-1]) > 1e-12) + 1
+    keep = np.concatenate(([0], turns, [len(x) - 1]))
+
+    return x[keep], y[keep]
+
+def aStar(grid: PlanningGrid, px: float, py: float, goal_x: float, goal_y: float,
+          simplify: bool=True) -> np.ndarray:
+    """
+    plans one path with A* and the octile distance as heuristic, which is cheaper than
+    a whole cost-to-go field for a goal that is only asked for once
+
+    inputs:
+    -------
+        grid (PlanningGrid): grid to plan on
+        px, py (float): start position [m]
+        goal_x, goal_y (float): goal position [m]
+        simplify (bool): keep only the cells where the path turns
+
+    return:
+    -------
+        path (np.ndarray): (k, 2) cell centers along the path, ending on the goal itself,
+            empty if the goal cannot be reached [m]
+    """
+    (start_ix,), (start_iy,) = grid.cellOf(px, py)
+    (goal_ix,), (goal_iy,) = grid.cellOf(goal_x, goal_y)
+    start, goal = (int(start_ix), int(start_iy)), (int(goal_ix), int(goal_iy))
+    blocked = grid.blocked
+
+    def free(ix, iy):
+        return 0 <= ix < grid.columns and 0 <= iy < grid.rows and not blocked[iy, ix]
+
+    def heuristic(ix, iy):
+        dx, dy = abs(ix - goal[0]), abs(iy - goal[1])
+        return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+    if not free(*start) or not free(*goal):
+        return np.zeros((0, 2))
+
+    steps = list(zip(moves.tolist(), move_costs.tolist()))
+    cost = {start: 0.}
+    parent = {start: None}
+    queue = [(heuristic(*start), 0., start)]
+    while queue:
+        _, g, cell = heapq.heappop(queue)
+        if cell == goal:
+            break
+        if g > cost[cell]:
+            continue # stale entry
+
+        ix, iy = cell
+        for (dx, dy), step in steps:
+            neighbor = (ix + dx, iy + dy)
+            if not free(*neighbor) or (dx and dy and not (free(ix + dx, iy) and free(ix, iy + dy))):
+                continue
+            g_neighbor = g + step
+            if g_neighbor < cost.get(neighbor, math.inf):
+                cost[neighbor] = g_neighbor
+                parent[neighbor] = cell
+                heapq.heappush(queue, (g_neighbor + heuristic(*neighbor), g_neighbor, neighbor))
+    else:
+        return np.zeros((0, 2))
+
+    cells = []
+    while cell is not None:
+        cells.append(cell)
+        cell = parent[cell]
+    ix, iy = np.array(cells[::-1]).T
+    path_x, path_y = grid.cellCenter(ix, iy)
+    if simplify:
+        path_x, path_y = simplifyPath(path_x, path_y)
+    path_x[-1], path_y[-1] = goal_x, goal_y
+
+    return np.stack((path_x, path_y), axis=1)
@@ -0,0 +1,108 @@
+"""
+Author: Miguel Tamayo
+
+replay.py
+Contains class that seeks through a recorded run without simulating it again
+"""
+
+from .states import RobotState
+from .trajectory import TrajectoryBuffer
+from utilities.constants import *
+
+import math
+import numpy as np
+
+class TrajectoryReplay:
+    """
+    Time index over a recorded run. Every keyframe_interval-th sample is kept as a
+    keyframe in a small in-memory index, so a seek is a binary search over the
+    keyframes followed by one over a single block of samples: O(log n), and only one
+    block of a memory-mapped log is read. Between two samples the pose is rebuilt
+    exactly from the recorded wheel velocities, so any time can be shown
+
+    inputs:
+    -------
+        trajectory (TrajectoryBuffer): recorded run, with increasing times
+        keyframe_interval (int): samples between two keyframes
+        wheel_base (float): distance between both wheels of the recorded robot [m]
+
+    return:
+    -------
+        replay (TrajectoryReplay): replay instance
+    """
+    def __init__(self,
+                 trajectory: TrajectoryBuffer,
+                 keyframe_interval: int=1024,
+                 wheel_base: float=L) -> None:
+
+        if len(trajectory) == 0:
+            raise ValueError("cannot replay an empty trajectory")
+
+        self.trajectory = trajectory
+        self.records = trajectory.records
+        self.times = self.records["time"]
+        self.keyframe_interval = keyframe_interval
+        self.keyframe_times = np.array(self.times[::keyframe_interval]) # copied so the index stays in memory
+        self.wheel_base = wheel_base
+
+        self.start = float(self.times[0])
+        self.end = float(self.times[-1])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def indexAt(self, time: float) -> int:
+        """
+        finds the last sample recorded at or before a time
+
+        inputs:
+        -------
+            time (float): replay time [s]
+
+        return:
+        -------
+            idx (int): sample index, 0 if time is before the first sample
+        """
+        keyframe = max(int(np.searchsorted(self.keyframe_times, time, side="right")) - 1, 0)
+        start = keyframe * self.keyframe_interval
+        block = self.times[start:start + self.keyframe_interval]
+
+        return max(start + int(np.searchsorted(block, time, side="right")) - 1, 0)
+
+    def stateAt(self, time: float) -> RobotState:
+        """
+        gets the robot's pose at any time of the run. The pose is advanced from the last
+        sample with the wheel velocities applied until the next one, using the exact arc
+        solution, so the result does not depend on the recording's sample rate
+
+        inputs:
+        -------
+            time (float): replay time [s]
+
+        return:
+        -------
+            state (RobotState): robot's state
+        """
+        idx = self.indexAt(time)
+        record = self.records[idx]
+        state = RobotState(px=float(record["px"]), py=float(record["py"]), phi=float(record["phi"]))
+
+        elapsed = time - float(record["time"])
+        if elapsed <= 0. or idx + 1 >= len(self.records):
+            return state
+
+        # inputs of the step ending at the next sample
+        following = self.records[idx + 1]
+        vl = float(following["vl"])
+        vr = float(following["vr"])
+
+        v = (vr + vl) / 2.
+        w = (vr - vl) / self.wheel_base
+        half_turn = (w * elapsed) / 2
+        chord = math.sin(half_turn) / half_turn if half_turn != 0. else 1.
+
+        state.px += v * chord * elapsed * math.cos(state.phi + half_turn)
+        state.py += v * chord * elapsed * math.sin(state.phi + half_turn)
+        state.phi += w * elapsed
+
+        return state
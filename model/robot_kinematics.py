@@ -6,6 +6,7 @@ Contains class describing the robot's dynamics
 """
 
 from .states import RobotState, RobotDerivativeState
+from .integrators import MidpointIntegrator, ExactIntegrator, makeIntegrator
 from inputs.control_inputs import WheelLinearInputs
 from utilities.constants import *
 
@@ -18,40 +19,52 @@ class RobotKinematics:
     inputs:
     -------
         dt (float): robot's step time
+        wheel_base (float): distance between both wheels [m]
+        integrator (str): scheme used by update(): "midpoint" for the fixed-step
+            midpoint-heading update, "exact" for the closed-form arc solution of constant
+            wheel inputs, "rk4" for fourth order Runge-Kutta or "rk45" for the adaptive
+            Dormand-Prince solver (see model/integrators.py). An integrator instance can
+            be given instead of a name
 
     return:
     -------
         kinematics (RobotKinematics): robot's kinematics instance
     """
     def __init__(self,
-                 dt: float=0.01) -> None:
-        
+                 dt: float=0.01,
+                 wheel_base: float=L,
+                 integrator: str="midpoint") -> None:
+
         self.state = RobotState()           # initialize current robot state to 0
         self.dot = RobotDerivativeState()   # initialize current robot derivative to 0
         self.local_dot = RobotDerivativeState() # derivative state to keep track of local vx, vy
         self.dt = dt                        # sampling time
+        self.wheel_base = wheel_base        # distance between both wheels
+        self.integrator = makeIntegrator(integrator) # integration scheme used by update()
+        self.midpoint = MidpointIntegrator() # scheme of computeDerivative
+        self.arc = ExactIntegrator() # scheme of computeArcDerivative and advance
 
     def setState(self, state:RobotState) -> None:
         """
-        sets state to desired state
+        sets state to desired state. The values are copied, the robot keeps its own instance
         
         inputs:
         -------
             state (RobotState): new robot's state
         """
-        self.state = state
+        self.state.copyFrom(state)
 
         return None
 
     def setDotState(self, dot:RobotDerivativeState) -> None:
         """
-        sets derivative state to desired derivative state
+        sets derivative state to desired derivative state. The values are copied
 
         inputs:
         -------
             dot (RobotDerivativeState): robot's new derivative state
         """
-        self.dot = dot
+        self.dot.copyFrom(dot)
 
         return None
 
@@ -59,8 +72,8 @@ class RobotKinematics:
         """
         makes the robot's state and derivative state zero
         """
-        self.setState(RobotState()) # reset state
-        self.setDotState(RobotDerivativeState()) # reset derivative state
+        self.state.set(0., 0., 0.) # reset state
+        self.dot.set(0., 0., 0.) # reset derivative state
 
 
         return None
@@ -68,7 +81,8 @@ class RobotKinematics:
 
     def getState(self) -> RobotState:
         """
-        gets the robot's current state
+        gets the robot's current state. This is the robot's own instance, updated in
+        place by every step: copy() it to keep a snapshot or to hand it to another thread
 
         return:
         -------
@@ -78,7 +92,7 @@ class RobotKinematics:
     
     def getDotState(self) -> RobotDerivativeState:
         """
-        gets the robot's derivative state
+        gets the robot's derivative state, updated in place like getState()
 
         return:
         -------
@@ -109,12 +123,66 @@ class RobotKinematics:
         self.local_dot.vx = controls.vl
         self.local_dot.vy = controls.vr
 
-        self.dot = self.computeDerivative(state=self.state, vl=controls.vl, vr=controls.vr) # calculate new derivative
-        self.state = self.integrateState(state=self.state, dot=self.dot) # integrate by dT
+        # average derivative over the step, from the selected integrator. Both are updated
+        # in place, so a step allocates no state objects
+        self.integrator.derivative(self.state, controls.vl, controls.vr, self.dt, self.wheel_base, out=self.dot)
+        self.integrateState(state=self.state, dot=self.dot, out=self.state) # integrate by dT
         
         return None
 
-    def computeDerivative(self, state: RobotState, vl: float, vr: float) -> RobotDerivativeState:
+    def advance(self, controls: WheelLinearInputs, duration: float) -> None:
+        """
+        advances the robot across a whole interval of constant wheel inputs in one
+        call. Adaptive integrators (rk45) pick their own sub-steps over the interval,
+        the others use the exact arc solution, whose cost does not depend on the duration
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): robot's inputs, held for the whole interval
+            duration (float): length of the interval [s]
+        """
+        self.local_dot.vx = controls.vl
+        self.local_dot.vy = controls.vr
+
+        integrator = self.integrator if self.integrator.adaptive else self.arc
+        integrator.derivative(self.state, controls.vl, controls.vr, duration, self.wheel_base, out=self.dot)
+
+        self.state.px += self.dot.vx * duration
+        self.state.py += self.dot.vy * duration
+        self.state.phi += self.dot.w * duration
+
+        return None
+
+    def computeArcDerivative(self,
+                             state: RobotState,
+                             vl: float,
+                             vr: float,
+                             duration: float,
+                             out: RobotDerivativeState=None) -> RobotDerivativeState:
+        """
+        computes the robot's average time-derivative over an interval of constant wheel inputs.
+        The robot follows a circular arc, so its displacement is the arc's chord: it points
+        along the heading at the middle of the interval and is shortened by sinc(w*duration/2)
+
+        inputs:
+        -------
+            state (RobotState): robot's state at the start of the interval
+            vl (float): left wheel linear velocity input [m/s]
+            vr (float): right wheel linear velocity input [m/s]
+            duration (float): length of the interval [s]
+            out (RobotDerivativeState): optional derivative state overwritten with the result
+
+        return:
+        -------
+            dot (RobotDerivativeState): average time derivative over the interval
+        """
+        return self.arc.derivative(state, vl, vr, duration, self.wheel_base, out=out)
+
+    def computeDerivative(self,
+                          state: RobotState,
+                          vl: float,
+                          vr: float,
+                          out: RobotDerivativeState=None) -> RobotDerivativeState:
         """
         computes the robot's time-derivative give the linear velocities in the robot's loca frame
 
@@ -123,23 +191,18 @@ class RobotKinematics:
             state (RobotState): robot's current state
             vl (float): left wheel linear velocity input [m/s]
             vr (float): right wheel linear velocity input [m/s]
+            out (RobotDerivativeState): optional derivative state overwritten with the result
 
         return:
         -------
             dot (RobotDerivativeState): time derivative state
         """
-        dot = RobotDerivativeState() # empty state
-        v = (vr + vl) / 2. # robot's linear velocity in robot's frame
-        w = (vr - vl) / L # robot's angular velocity around center
-
-        # create derivative state
-        dot.vx = v * np.cos(state.phi + (w*self.dt)/2) # vel in global frame
-        dot.vy = v * np.sin(state.phi + (w*self.dt)/2) # vel in global frame
-        dot.w = w
-
-        return dot
+        return self.midpoint.derivative(state, vl, vr, self.dt, self.wheel_base, out=out)
     
-    def integrateState(self, state: RobotState, dot: RobotDerivativeState) -> RobotState:
+    def integrateState(self,
+                       state: RobotState,
+                       dot: RobotDerivativeState,
+                       out: RobotState=None) -> RobotState:
         """
         integrates the vehicle state using trapezoidal integration
 
@@ -147,14 +210,15 @@ class RobotKinematics:
         -------
             state (RobotState): robot state to integrate
             dot (RobotDerivativeState): robot derivative state
+            out (RobotState): optional state overwritten with the result, may be state itself
 
         return:
         -------
             new_state (RobotState): new robot state with integrated components
         """
-        new_state = RobotState() # create empty instance
-        new_state.px = state.px + dot.vx * self.dt
-        new_state.py = state.py + dot.vy * self.dt
-        new_state.phi = state.phi + dot.w * self.dt
+        new_state = out if out is not None else RobotState()
+        new_state.set(state.px + dot.vx * self.dt,
+                      state.py + dot.vy * self.dt,
+                      state.phi + dot.w * self.dt)
 
         return new_state
\ No newline at end of file
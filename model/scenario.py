@@ -0,0 +1,216 @@
+"""
+Author: Miguel Tamayo
+
+scenario.py
+Compiles declarative driving scenarios into timelines of constant wheel inputs
+"""
+
+from inputs.control_inputs import WheelLinearInputs
+from utilities.constants import *
+
+import ast
+import json
+import math
+import operator
+import os
+import numpy as np
+
+# folder holding the scenarios that can be loaded by name
+scenario_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scenarios")
+
+# operators and functions allowed in scenario expressions
+expression_operators = {ast.Add: operator.add,
+                        ast.Sub: operator.sub,
+                        ast.Mult: operator.mul,
+                        ast.Div: operator.truediv,
+                        ast.Pow: operator.pow,
+                        ast.USub: operator.neg,
+                        ast.UAdd: operator.pos}
+expression_functions = {"abs": abs, "min": min, "max": max,
+                        "sqrt": math.sqrt, "sin": math.sin, "cos": math.cos, "radians": math.radians}
+
+def evaluate(expression, names: dict) -> float:
+    """
+    evaluates a scenario value: a number, a boolean (as 0 or 1), None (forever) or an
+    arithmetic expression over the scenario's parameters, e.g. "2 * pi / edges * L / dt"
+
+    inputs:
+    -------
+        expression (float | bool | str | None): value to evaluate
+        names (dict): values the expression's names refer to
+
+    return:
+    -------
+        value (float): evaluated value, inf for None
+    """
+    if expression is None:
+        return math.inf
+    if not isinstance(expression, str):
+        return float(expression)
+
+    def visit(node):
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise ValueError(f"unknown name in scenario expression: {node.id}")
+            return names[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in expression_operators:
+            return expression_operators[type(node.op)](visit(node.left), visit(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in expression_operators:
+            return expression_operators[type(node.op)](visit(node.operand))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in expression_functions and not node.keywords):
+            return expression_functions[node.func.id](*(visit(arg) for arg in node.args))
+        raise ValueError(f"unsupported scenario expression: {expression}")
+
+    return float(visit(ast.parse(expression, mode="eval")))
+
+def loadScenario(name: str) -> dict:
+    """
+    reads a scenario from a JSON file, either a path or the name of a file in scenarios/
+
+    inputs:
+    -------
+        name (str): scenario path, or name such as "square"
+
+    return:
+    -------
+        scenario (dict): scenario description (see compileScenario)
+    """
+    filename = name if os.path.isfile(name) else os.path.join(scenario_dir, f"{name}.json")
+    if not os.path.isfile(filename):
+        raise ValueError(f"unknown scenario: {name}")
+
+    with open(filename) as file:
+        return json.load(file)
+
+def scenarioNames() -> list[str]:
+    """
+    lists the scenarios that can be loaded by name
+
+    return:
+    -------
+        names (list[str]): names of the files in scenarios/, sorted
+    """
+    return sorted(filename[:-len(".json")] for filename in os.listdir(scenario_dir) if filename.endswith(".json"))
+
+def compileScenario(scenario: dict, dt: float=dt, wheel_base: float=L, **parameters) -> np.ndarray:
+    """
+    compiles a scenario into an array of (duration, vl, vr) segments, once, before the run.
+    A scenario is a dict with:
+
+        "parameters": name -> value or expression, evaluated in order. Later ones
+            may use earlier ones, as well as dt, L (the wheel base) and pi
+        "timeline": list of items played in order, each one either
+            {"duration": d, "vl": a, "vr": b}, a segment. A null duration lasts forever
+            {"repeat": n, "timeline": [...]}, a nested timeline played n times
+
+    Every value can be a number or an expression. Segments lasting zero seconds are dropped
+
+    inputs:
+    -------
+        scenario (dict): scenario description, see loadScenario
+        dt (float): simulation step time [s]
+        wheel_base (float): distance between both wheels [m]
+        parameters: values overriding the scenario's parameters
+
+    return:
+    -------
+        segments (np.ndarray): (k, 3) array of duration [s], vl and vr [m/s]
+    """
+    declared = scenario.get("parameters", {})
+    unknown = set(parameters) - set(declared)
+    if unknown:
+        raise ValueError(f"unknown scenario parameters: {', '.join(sorted(unknown))}")
+
+    names = {"dt": dt, "L": wheel_base, "pi": math.pi}
+    for name, value in declared.items():
+        names[name] = evaluate(parameters.get(name, value), names)
+
+    segments = []
+    def expand(timeline: list) -> None:
+        for item in timeline:
+            if "repeat" in item:
+                for _ in range(int(evaluate(item["repeat"], names))):
+                    expand(item["timeline"])
+            else:
+                duration = evaluate(item.get("duration"), names)
+                if duration > 0.:
+                    segments.append((duration, evaluate(item["vl"], names), evaluate(item["vr"], names)))
+
+    expand(scenario["timeline"])
+
+    return np.array(segments, dtype=np.float64).reshape(-1, 3)
+
+class Timeline:
+    """
+    Plays compiled segments back one fixed step at a time. Durations are converted to
+    step counts when the timeline is built, so each step only decrements a counter and
+    moves to the next segment when it runs out: O(1) per step, whatever the scenario.
+    Once the last segment ends the wheels are stopped
+
+    inputs:
+    -------
+        segments (np.ndarray): (k, 3) array of duration [s], vl and vr [m/s] (see compileScenario)
+        dt (float): simulation step time [s]
+
+    return:
+    -------
+        timeline (Timeline): timeline instance
+    """
+    def __init__(self,
+                 segments: np.ndarray,
+                 dt: float=dt) -> None:
+
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 3)
+        durations = segments[:, 0]
+
+        # steps of each segment, -1 for a segment that lasts forever
+        self.steps = np.where(np.isinf(durations), -1, np.maximum(np.round(durations / dt), 1)).astype(np.int64).tolist()
+        self.vl = segments[:, 1].tolist()
+        self.vr = segments[:, 2].tolist()
+        self.inputs = WheelLinearInputs(vl=0., vr=0.) # overwritten on every step
+
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def reset(self) -> None:
+        """
+        rewinds to the start of the first segment
+        """
+        self.index = -1 # current segment
+        self.remaining = 0 # steps left in the current segment
+
+        return None
+
+    @property
+    def finished(self) -> bool:
+        """
+        True once every segment has been played
+        """
+        return self.remaining == 0 and self.index >= len(self.steps) - 1
+
+    def next(self) -> WheelLinearInputs:
+        """
+        gets the wheel inputs of the next step
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities, overwritten by the next call
+        """
+        if self.remaining == 0:
+            if self.index >= len(self.steps) - 1:
+                return self.inputs.set(0., 0.)
+
+            self.index += 1
+            self.remaining = self.steps[self.index]
+            self.inputs.set(self.vl[self.index], self.vr[self.index])
+
+        self.remaining -= 1 # a forever segment counts down from -1 and never reaches 0
+
+        return self.inputs
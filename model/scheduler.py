@@ -0,0 +1,127 @@
+"""
+Author: Miguel Tamayo
+
+scheduler.py
+Contains the scheduler that keeps fixed-step simulated time locked to wall time
+"""
+
+import time
+
+class FixedRateScheduler:
+    """
+    Decides how many fixed physics steps are due from the monotonic clock instead of
+    counting timer ticks, so a late or missed tick is caught up on the next one and
+    simulated time does not drift behind wall time. Steps are owed against the time
+    the scheduler was started, not against the previous tick, so rounding never
+    accumulates. At most max_steps are run per tick; when the simulation falls further
+    behind than that, the excess is skipped (not simulated) and reported as an overrun,
+    so a slow machine does not spiral into ever longer catch-ups
+
+    inputs:
+    -------
+        dt (float): physics step time [s]
+        max_steps (int): most steps run on a single tick
+        clock: monotonic clock returning seconds
+
+    return:
+    -------
+        scheduler (FixedRateScheduler): scheduler instance
+    """
+    def __init__(self,
+                 dt: float,
+                 max_steps: int=10,
+                 clock=time.perf_counter) -> None:
+
+        self.dt = dt
+        self.max_steps = max_steps
+        self.clock = clock
+
+        self.origin = None # wall time matching step 0, None while stopped [s]
+        self.steps = 0 # steps handed out since the scheduler was reset
+        self.overruns = 0 # ticks that hit max_steps and skipped steps
+        self.skipped = 0 # steps skipped to stay on wall time
+        self.max_backlog = 0 # most steps that were due on a single tick
+
+    def start(self) -> None:
+        """
+        starts or resumes scheduling. Time spent stopped is not caught up
+        """
+        self.origin = self.clock() - self.steps * self.dt
+
+        return None
+
+    def stop(self) -> None:
+        """
+        stops scheduling, keeping the step count
+        """
+        self.origin = None
+
+        return None
+
+    def reset(self) -> None:
+        """
+        forgets every step and statistic, a running scheduler starts over from now
+        """
+        self.steps = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_backlog = 0
+        if self.origin is not None:
+            self.start()
+
+        return None
+
+    def due(self) -> int:
+        """
+        counts the steps owed since the last call and marks them as run
+
+        return:
+        -------
+            steps (int): steps to run now, at most max_steps
+        """
+        if self.origin is None:
+            return 0
+
+        backlog = int((self.clock() - self.origin) / self.dt) - self.steps
+        if backlog <= 0:
+            return 0
+        self.max_backlog = max(self.max_backlog, backlog)
+
+        steps = backlog
+        if backlog > self.max_steps:
+            # give up on the excess: move the origin so the skipped time is never owed again
+            steps = self.max_steps
+            self.overruns += 1
+            self.skipped += backlog - steps
+            self.origin += (backlog - steps) * self.dt
+
+        self.steps += steps
+
+        return steps
+
+    def lag(self) -> float:
+        """
+        how far simulated time is behind wall time, not counting skipped time
+
+        return:
+        -------
+            lag (float): wall time not simulated yet [s], 0 while stopped
+        """
+        if self.origin is None:
+            return 0.
+
+        return max(self.clock() - self.origin - self.steps * self.dt, 0.)
+
+    def summary(self) -> dict:
+        """
+        summarizes the scheduler
+
+        return:
+        -------
+            summary (dict): steps, overruns, skipped steps and time [s], and largest backlog
+        """
+        return {"steps": self.steps,
+                "overruns": self.overruns,
+                "skipped": self.skipped,
+                "skipped_time": self.skipped * self.dt,
+                "max_backlog": self.max_backlog}
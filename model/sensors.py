@@ -0,0 +1,221 @@
+"""
+Author: Miguel Tamayo
+
+sensors.py
+Contains simulated range sensors that cast rays against the world's obstacles for a
+whole fleet in one call
+"""
+
+from .world import World, ranges
+
+import numpy as np
+
+class RangeSensor:
+    """
+    Set of range beams fixed to the robot, e.g. a ring of sonars. The beams' unit
+    vectors and their sorted angles are tabulated once in the robot's frame. A scan
+    gets the obstacle edges within range of each robot from a single grid lookup,
+    finds the slice of the angle table each edge covers as seen from the robot, and
+    only intersects those beams with the edge: the work grows with the edges in view,
+    never with a per-ray walk through the map
+
+    Other robots are not seen, only the world's obstacles
+
+    inputs:
+    -------
+        angles (np.ndarray): beams' directions relative to the robot's heading [rad]
+        max_range (float): longest distance measured, returned when nothing is hit [m]
+        noise (float): standard deviation of the Gaussian noise added to hits [m]
+        seed (int): seed of the noise generator
+
+    return:
+    -------
+        sensor (RangeSensor): range sensor instance
+    """
+    def __init__(self,
+                 angles: np.ndarray,
+                 max_range: float=5.,
+                 noise: float=0.,
+                 seed: int=None) -> None:
+
+        self.angles = np.asarray(angles, dtype=np.float64).ravel()
+        self.beams = len(self.angles)
+        self.max_range = max_range
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+        # unit ray table in the robot's frame
+        self.ray_cos = np.cos(self.angles)
+        self.ray_sin = np.sin(self.angles)
+
+        # beams sorted by angle in [0, 2*pi), twice so an arc can run past 2*pi
+        wrapped = np.mod(self.angles, 2 * np.pi)
+        self.beam_order = np.argsort(wrapped, kind="stable")
+        self.beam_order = np.concatenate((self.beam_order, self.beam_order))
+        self.beam_angles = np.concatenate((np.sort(wrapped), np.sort(wrapped) + 2 * np.pi))
+
+        self.world = None # world the edge buckets were built for
+        self.buckets = None # cell -> edges within max_range, see World.bucketEdges
+
+    def rays(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        builds every beam of every robot in global frame
+
+        inputs:
+        -------
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+
+        return:
+        -------
+            ox, oy (np.ndarray): (m * beams,) rays' origins [m]
+            dx, dy (np.ndarray): (m * beams,) rays' unit directions
+        """
+        cos = np.cos(phi)[:, None]
+        sin = np.sin(phi)[:, None]
+        dx = cos * self.ray_cos - sin * self.ray_sin
+        dy = sin * self.ray_cos + cos * self.ray_sin
+
+        return np.repeat(px, self.beams), np.repeat(py, self.beams), dx.ravel(), dy.ravel()
+
+    def cast(self, world: World, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> np.ndarray:
+        """
+        casts every beam of every robot against the world's obstacles
+
+        inputs:
+        -------
+            world (World): world holding the obstacles
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+
+        return:
+        -------
+            distance (np.ndarray): (m * beams,) distance to the first hit of each beam,
+                max_range if none [m]
+        """
+        if world is not self.world:
+            self.world = world
+            self.buckets = world.bucketEdges(self.max_range)
+        starts, counts, bucket = self.buckets
+
+        # edges within range of each robot: the bucket of the grid cell closest to it
+        xmin, ymin, _, _ = world.bounds
+        column = np.clip(np.floor((px - xmin) / world.cell_size), 0, world.columns - 1).astype(np.int64)
+        row = np.clip(np.floor((py - ymin) / world.cell_size), 0, world.rows - 1).astype(np.int64)
+        cell = column * world.rows + row
+        robot = np.repeat(np.arange(len(px)), counts[cell])
+        x0, y0, x1, y1 = world.edges[bucket[ranges(starts[cell], counts[cell])]].T
+        x0, y0, x1, y1 = x0 - px[robot], y0 - py[robot], x1 - px[robot], y1 - py[robot] # relative to the robot
+
+        # drop the bucket's edges that are out of range after all
+        ex, ey = x1 - x0, y1 - y0
+        along = np.clip(-(x0 * ex + y0 * ey) / np.maximum(ex * ex + ey * ey, 1e-12), 0., 1.)
+        near = np.flatnonzero(np.hypot(x0 + along * ex, y0 + along * ey) < self.max_range)
+        robot, x0, y0, ex, ey = robot[near], x0[near], y0[near], ex[near], ey[near]
+
+        # arc of beam angles each edge covers, in the robot's frame, slightly widened so
+        # beams through an end point are kept. Every beam of the arc crosses the edge
+        first = np.mod(np.arctan2(y0, x0) - phi[robot], 2 * np.pi)
+        sweep = np.mod(np.arctan2(y0 + ey, x0 + ex) - phi[robot] - first + np.pi, 2 * np.pi) - np.pi
+        first = np.where(sweep < 0., first + sweep, first)
+        first = np.where(first < 0., first + 2 * np.pi, first) - 1e-9
+        low = np.searchsorted(self.beam_angles, first, side="left")
+        high = np.searchsorted(self.beam_angles, first + np.abs(sweep) + 2e-9, side="right")
+        high = np.minimum(high, low + self.beams)
+
+        # beam directions of every robot, from the ray table
+        cos, sin = np.cos(phi)[:, None], np.sin(phi)[:, None]
+        ray_x = (cos * self.ray_cos - sin * self.ray_sin).ravel()
+        ray_y = (sin * self.ray_cos + cos * self.ray_sin).ravel()
+
+        # (edge, beam) pairs: ray t * d against the edge's line, t = (p0 x e) / (d x e)
+        pair = np.repeat(np.arange(len(robot)), high - low)
+        ray = robot[pair] * self.beams + self.beam_order[ranges(low, high - low)]
+        numerator = (x0 * ey - y0 * ex)[pair]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = numerator / (ray_x[ray] * ey[pair] - ray_y[ray] * ex[pair])
+        valid = (t >= 0.) & (t < self.max_range)
+
+        distance = np.full(len(px) * self.beams, self.max_range)
+        np.minimum.at(distance, ray[valid], t[valid])
+
+        return distance
+
+    def scan(self, world: World, state) -> np.ndarray:
+        """
+        measures the distance along every beam of every robot
+
+        inputs:
+        -------
+            world (World): world holding the obstacles
+            state: RobotState, or an object with px, py and phi arrays such as BatchRobotKinematics
+
+        return:
+        -------
+            distance (np.ndarray): (m, beams) measured distances, (beams,) for a single robot.
+                Beams that hit nothing read max_range [m]
+        """
+        px = np.atleast_1d(np.asarray(state.px, dtype=np.float64))
+        py = np.atleast_1d(np.asarray(state.py, dtype=np.float64))
+        phi = np.atleast_1d(np.asarray(state.phi, dtype=np.float64))
+
+        distance = self.cast(world, px, py, phi).reshape(len(px), self.beams)
+        if self.noise > 0.:
+            hit = distance < self.max_range
+            distance[hit] = np.clip(distance[hit] + self.rng.normal(0., self.noise, np.count_nonzero(hit)),
+                                    0., self.max_range)
+
+        return distance[0] if np.ndim(state.px) == 0 else distance
+
+    def points(self, distance: np.ndarray, state) -> tuple[np.ndarray, np.ndarray]:
+        """
+        converts measured distances into points in global frame
+
+        inputs:
+        -------
+            distance (np.ndarray): (m, beams) or (beams,) distances from scan [m]
+            state: poses the scan was taken from
+
+        return:
+        -------
+            x, y (np.ndarray): positions of the beams' ends, same shape as distance [m]
+        """
+        px = np.atleast_1d(np.asarray(state.px, dtype=np.float64))
+        py = np.atleast_1d(np.asarray(state.py, dtype=np.float64))
+        phi = np.atleast_1d(np.asarray(state.phi, dtype=np.float64))
+        ox, oy, dx, dy = self.rays(px, py, phi)
+        flat = np.reshape(distance, -1)
+
+        return (ox + flat * dx).reshape(np.shape(distance)), (oy + flat * dy).reshape(np.shape(distance))
+
+class Lidar(RangeSensor):
+    """
+    Scanning range finder: beams evenly spread over a field of view centered on the
+    robot's heading
+
+    inputs:
+    -------
+        beams (int): number of beams per scan
+        fov (float): field of view [rad], 2*pi for a full turn
+        max_range (float): longest distance measured [m]
+        noise (float): standard deviation of the Gaussian noise added to hits [m]
+        seed (int): seed of the noise generator
+
+    return:
+    -------
+        lidar (Lidar): lidar instance
+    """
+    def __init__(self,
+                 beams: int=64,
+                 fov: float=2 * np.pi,
+                 max_range: float=5.,
+                 noise: float=0.,
+                 seed: int=None) -> None:
+
+        full_turn = np.isclose(fov, 2 * np.pi)
+        angles = np.linspace(-fov / 2, fov / 2, beams, endpoint=not full_turn) if beams > 1 else np.zeros(1)
+        super().__init__(angles, max_range, noise, seed)
+
+        self.fov = fov
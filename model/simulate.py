@@ -0,0 +1,213 @@
+"""
+Author: Miguel Tamayo
+
+simulate.py
+Handles advancing the robot in time without any GUI. Runs as fast as the CPU allows
+"""
+
+from .robot_kinematics import RobotKinematics
+from .states import RobotState
+from .trajectory import TrajectoryBuffer
+from inputs.control_inputs import WheelLinearInputs
+from utilities.constants import *
+
+import numpy as np
+
+class SegmentSchedule:
+    """
+    Input schedule made of piecewise-constant wheel velocities. Once the last
+    segment ends the wheels are stopped. Segment boundaries are matched with a
+    small tolerance so a segment lasting exactly one step is never skipped or
+    repeated because of round-off in the accumulated simulation time
+
+    inputs:
+    -------
+        segments (list): (duration, vl, vr) tuples played back in order
+
+    return:
+    -------
+        schedule (SegmentSchedule): callable schedule(time, state) -> WheelLinearInputs
+    """
+    def __init__(self,
+                 segments: list) -> None:
+
+        self.segments = [WheelLinearInputs(vl=vl, vr=vr) for _, vl, vr in segments]
+        self.ends = np.cumsum([duration for duration, _, _ in segments]) # end time of each segment
+        self.stopped = WheelLinearInputs(vl=0., vr=0.)
+        self.tolerance = 1e-9 # [s]
+
+    def __call__(self, time: float, state: RobotState) -> WheelLinearInputs:
+        """
+        gets the wheel inputs active at a given time
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's current state (unused)
+
+        return:
+        -------
+            inputs (WheelLinearInputs): wheel velocities for this step
+        """
+        idx = int(np.searchsorted(self.ends, time + self.tolerance, side="right"))
+        if idx >= len(self.segments):
+            return self.stopped
+
+        return self.segments[idx]
+
+class RobotSimulate:
+    """
+    Wrapper class that handles the robot's dynamics, states, and advancing the robot in time
+
+    inputs:
+    -------
+        dt (float): simulation step time [s]
+        wheel_base (float): distance between both wheels [m]
+        integrator (str): integration mode of the kinematics (see RobotKinematics)
+        vmax (float): wheels' max linear velocity [m/s], None leaves the inputs unbounded
+
+    return:
+    -------
+        robot_sim (RobotSimulate): Robot simulation instance
+    """
+    def __init__(self,
+                 dt: float=dt,
+                 wheel_base: float=L,
+                 integrator: str="midpoint",
+                 vmax: float=None) -> None:
+        self.dt = dt # time steps
+        self.time = 0. # initialize simulation time to 0
+        self.vmax = vmax
+        self.saturated = WheelLinearInputs(vl=0., vr=0.) # reused by saturate()
+        self.robot_model = RobotKinematics(dt=self.dt, wheel_base=wheel_base, integrator=integrator)
+        self.telemetry = None # optional sink every step is recorded to (see setTelemetrySink)
+
+    def setTelemetrySink(self, sink) -> None:
+        """
+        records every following step to a telemetry sink
+
+        inputs:
+        -------
+            sink (TelemetrySink): sink with a record(time, state, dot, wheel_vel) method, None stops recording
+        """
+        self.telemetry = sink
+
+        return None
+
+    def recordTelemetry(self) -> None:
+        """
+        hands the current sample to the telemetry sink, if any
+        """
+        if self.telemetry is not None:
+            self.telemetry.record(self.time, self.robot_model.getState(), self.robot_model.getDotState(),
+                                  self.robot_model.getWheelVelocities())
+
+        return None
+
+    def saturate(self, controls: WheelLinearInputs) -> WheelLinearInputs:
+        """
+        limits the wheel velocities to [-vmax, vmax]
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): requested wheel velocities
+
+        return:
+        -------
+            controls (WheelLinearInputs): wheel velocities within the limits, overwritten by the next call
+        """
+        if self.vmax is None or (abs(controls.vl) <= self.vmax and abs(controls.vr) <= self.vmax):
+            return controls
+
+        return self.saturated.set(min(max(controls.vl, -self.vmax), self.vmax),
+                                  min(max(controls.vr, -self.vmax), self.vmax))
+
+    def takeStep(self, controls: WheelLinearInputs) -> None:
+        """
+        advances the robot (through its dynamics) in time
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): robot's left and rigth wheel velocities
+        """
+        self.time += self.dt # step in time
+        self.robot_model.update(self.saturate(controls)) # update robot state
+        self.recordTelemetry()
+
+        return None
+
+    def advance(self, controls: WheelLinearInputs, duration: float) -> None:
+        """
+        advances the robot across a whole interval of constant wheel inputs in one
+        call (see RobotKinematics.advance)
+
+        inputs:
+        -------
+            controls (WheelLinearInputs): robot's left and right wheel velocities
+            duration (float): length of the interval [s]
+        """
+        self.time += duration
+        self.robot_model.advance(self.saturate(controls), duration)
+        self.recordTelemetry()
+
+        return None
+
+    def reset(self) -> None:
+        """
+        resets the simulation time and the robot's states
+        """
+        self.time = 0.
+        self.robot_model.reset()
+
+        return None
+
+    def simulate(self, duration: float, schedule) -> TrajectoryBuffer:
+        """
+        runs the simulation for a fixed amount of simulated time, as fast as possible
+
+        inputs:
+        -------
+            duration (float): simulated time to run for [s]
+            schedule: either a list of (duration, vl, vr) segments or a callable
+                schedule(time, state) -> WheelLinearInputs evaluated at the start of every step
+
+        return:
+        -------
+            trajectory (TrajectoryBuffer): every sample of the run, including the initial one
+        """
+        if not callable(schedule):
+            schedule = SegmentSchedule(schedule)
+
+        steps = int(round(duration / self.dt))
+        trajectory = TrajectoryBuffer(steps + 1)
+        model = self.robot_model
+
+        trajectory.append(self.time, model.getState(), model.getDotState(), model.getWheelVelocities())
+        for _ in range(steps):
+            self.takeStep(schedule(self.time, model.getState()))
+            trajectory.append(self.time, model.getState(), model.getDotState(), model.getWheelVelocities())
+
+        return trajectory
+
+    def playSegments(self, segments: list) -> TrajectoryBuffer:
+        """
+        plays back piecewise-constant wheel inputs with one advance per segment: an exact
+        arc, or adaptive sub-steps as long as each segment allows with rk45
+
+        inputs:
+        -------
+            segments (list): (duration, vl, vr) tuples played back in order
+
+        return:
+        -------
+            trajectory (TrajectoryBuffer): initial sample plus one sample at the end of every segment
+        """
+        trajectory = TrajectoryBuffer(len(segments) + 1)
+        model = self.robot_model
+
+        trajectory.append(self.time, model.getState(), model.getDotState(), model.getWheelVelocities())
+        for duration, vl, vr in segments:
+            self.advance(WheelLinearInputs(vl=vl, vr=vr), duration)
+            trajectory.append(self.time, model.getState(), model.getDotState(), model.getWheelVelocities())
+
+        return trajectory
@@ -0,0 +1,103 @@
+"""
+Author: Miguel Tamayo
+
+state_queue.py
+Contains the queue the simulation thread publishes its states into
+"""
+
+from .states import RobotState, RobotDerivativeState
+from .trajectory import trajectory_dtype
+
+import threading
+import numpy as np
+
+class StateQueue:
+    """
+    Bounded, thread-safe queue of simulation samples. The simulation thread pushes
+    one sample per physics step and the GUI drains every pending sample once per
+    frame, so the two can run at different rates. Storage is preallocated; when the
+    consumer falls behind, the oldest samples are dropped and counted
+
+    inputs:
+    -------
+        capacity (int): maximum number of pending samples
+
+    return:
+    -------
+        queue (StateQueue): state queue instance
+    """
+    def __init__(self,
+                 capacity: int=4096) -> None:
+
+        self.capacity = capacity
+        self.dropped = 0 # samples overwritten before they were drained
+
+        self._lock = threading.Lock()
+        self._pending = np.zeros(capacity, dtype=trajectory_dtype) # ring of pending samples
+        self._drained = np.zeros(capacity, dtype=trajectory_dtype) # samples handed to the consumer
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self,
+             time: float,
+             state: RobotState,
+             dot: RobotDerivativeState,
+             wheel_vel: RobotDerivativeState) -> None:
+        """
+        publishes a sample, dropping the oldest pending one when full
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's state
+            dot (RobotDerivativeState): robot's derivative state
+            wheel_vel (RobotDerivativeState): robot's left (vx) and right (vy) wheel velocities
+        """
+        record = (time, state.px, state.py, state.phi,
+                  dot.vx, dot.vy, dot.w,
+                  wheel_vel.vx, wheel_vel.vy)
+
+        with self._lock:
+            if self._size == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+                self._size -= 1
+                self.dropped += 1
+
+            self._pending[(self._start + self._size) % self.capacity] = record
+            self._size += 1
+
+        return None
+
+    def drain(self) -> np.ndarray:
+        """
+        takes every pending sample out of the queue, oldest first. The returned
+        array is reused by the next drain, so it must be consumed before then
+
+        return:
+        -------
+            records (np.ndarray): pending samples with trajectory_dtype layout
+        """
+        with self._lock:
+            size = self._size
+            first = min(size, self.capacity - self._start) # samples before the ring wraps
+
+            self._drained[:first] = self._pending[self._start:self._start + first]
+            self._drained[first:size] = self._pending[:size - first]
+
+            self._start = 0
+            self._size = 0
+
+        return self._drained[:size]
+
+    def clear(self) -> None:
+        """
+        drops every pending sample
+        """
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+        return None
@@ -9,7 +9,8 @@ import numpy as np
 
 class RobotState:
     """
-    Defines vehicle's current position
+    Defines vehicle's current position. Instances are slotted and the kinematics
+    update them in place, so copy() a state to keep it or hand it to another thread
 
     inputs:
     -------
@@ -21,6 +22,8 @@ class RobotState:
     -------
         state (RobotState): robot's state instance
     """
+    __slots__ = ("px", "py", "phi")
+
     def __init__(self,
                  px: float = 0.0,
                  py: float = 0.0,
@@ -30,6 +33,50 @@ class RobotState:
         self.py = py
         self.phi = phi
 
+    def set(self, px: float, py: float, phi: float) -> "RobotState":
+        """
+        overwrites the state in place
+
+        inputs:
+        -------
+            px (float): robot x position in global frame [m]
+            py (float): robot y position in global frame [m]
+            phi (float): robot orientation [rad]
+
+        return:
+        -------
+            state (RobotState): this state
+        """
+        self.px = px
+        self.py = py
+        self.phi = phi
+
+        return self
+
+    def copyFrom(self, state: "RobotState") -> "RobotState":
+        """
+        overwrites the state in place with another state's values
+
+        inputs:
+        -------
+            state (RobotState): state to copy
+
+        return:
+        -------
+            state (RobotState): this state
+        """
+        self.px = state.px
+        self.py = state.py
+        self.phi = state.phi
+
+        return self
+
+    def copy(self) -> "RobotState":
+        """
+        returns an independent copy of the state
+        """
+        return RobotState(self.px, self.py, self.phi)
+
     def __str__(self) -> str:
         """
         formats robot state into string
@@ -39,7 +86,7 @@ class RobotState:
         
 class RobotDerivativeState:
     """
-    defines robot's rates
+    defines robot's rates. Slotted and updated in place like RobotState
 
     inputs:
     -------
@@ -52,6 +99,8 @@ class RobotDerivativeState:
     -------
         derivative (RobotDerivativeState): robot's derivative instance
     """
+    __slots__ = ("vx", "vy", "w")
+
     def __init__(self,
                  vx: float = 0.0,
                  vy: float = 0.0,
@@ -61,6 +110,50 @@ class RobotDerivativeState:
         self.vy = vy
         self.w = r_rate
 
+    def set(self, vx: float, vy: float, r_rate: float) -> "RobotDerivativeState":
+        """
+        overwrites the derivative state in place
+
+        inputs:
+        -------
+            vx (float): robot x velocity in global frame [m/s]
+            vy (float): robot y velocity in global frame [m/s]
+            r_rate (float): robot turning rate [rad/s]
+
+        return:
+        -------
+            derivative (RobotDerivativeState): this derivative state
+        """
+        self.vx = vx
+        self.vy = vy
+        self.w = r_rate
+
+        return self
+
+    def copyFrom(self, dot: "RobotDerivativeState") -> "RobotDerivativeState":
+        """
+        overwrites the derivative state in place with another one's values
+
+        inputs:
+        -------
+            dot (RobotDerivativeState): derivative state to copy
+
+        return:
+        -------
+            derivative (RobotDerivativeState): this derivative state
+        """
+        self.vx = dot.vx
+        self.vy = dot.vy
+        self.w = dot.w
+
+        return self
+
+    def copy(self) -> "RobotDerivativeState":
+        """
+        returns an independent copy of the derivative state
+        """
+        return RobotDerivativeState(self.vx, self.vy, self.w)
+
     def __str__(self) -> str:
         """
         formats robot derivative state into string
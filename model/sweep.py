@@ -0,0 +1,146 @@
+"""
+Author: Miguel Tamayo
+
+sweep.py
+Runs independent headless simulations over a set of parameters on a process pool
+"""
+
+from .simulate import RobotSimulate
+from .scenario import loadScenario, compileScenario
+from .occupancy import CoverageMap
+from utilities.constants import *
+
+import itertools
+import math
+import numpy as np
+
+# parameters of a run; the scenario ones can only be set for the scenarios that declare them
+default_parameters = {"shape": "square",    # scenario name (see scenarios/) or path of a scenario file
+                      "n": None,            # sides of the n-gon, None uses the scenario's default
+                      "circumcircle": None, # drive around the n-gon once it is closed
+                      "edge_time": None,    # time spent on each edge [s], None uses the scenario's default
+                      "edge_speed": None,   # wheel velocity along an edge [m/s], None uses the scenario's default
+                      "turn_speed": None,   # right wheel velocity during a one-step turn [m/s], None turns by
+                                            # the shape's exterior angle
+                      "duration": None,     # simulated time [s], None runs until the scenario's last finite segment
+                                            # ends, or for the scenario's own "duration"
+                      "L": L,               # wheel base [m]
+                      "dt": dt,             # step time [s]
+                      "vmax": None,         # wheels' max linear velocity [m/s], None leaves them unbounded
+                      "integrator": "midpoint", # "midpoint", "exact", "rk4" or "rk45" (see RobotKinematics)
+                      "coverage_resolution": None} # cell side of the covered area metric [m], None skips it
+# parameters every run takes, whatever its scenario
+run_parameters = ("shape", "duration", "L", "dt", "vmax", "integrator", "coverage_resolution")
+
+def parameterGrid(**axes) -> list[dict]:
+    """
+    builds every combination of the given parameter values
+
+    inputs:
+    -------
+        axes: parameter name -> list of values, e.g. parameterGrid(L=[0.1, 0.2], dt=[0.01, 0.001])
+
+    return:
+    -------
+        parameter_sets (list[dict]): one dict per combination
+    """
+    names = list(axes)
+
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+def scenarioSegments(parameters: dict) -> tuple[np.ndarray, float]:
+    """
+    compiles the run's scenario into (duration, vl, vr) segments. The run parameters
+    that the scenario declares (e.g. n, edge_time) override its defaults; setting one
+    it does not declare raises ValueError
+
+    inputs:
+    -------
+        parameters (dict): run parameters (see default_parameters)
+
+    return:
+    -------
+        segments (np.ndarray): (k, 3) array of duration, vl and vr, see compileScenario
+        closed_time (float): time at which the scenario's last finite segment ends, or the
+            scenario's own "duration" when it declares one, e.g. an open-ended drive [s]
+    """
+    scenario = loadScenario(parameters["shape"])
+    declared = scenario.get("parameters", {})
+    undeclared = sorted(name for name, value in parameters.items()
+                        if value is not None and name not in run_parameters and name not in declared)
+    if undeclared:
+        raise ValueError(f"scenario {parameters['shape']!r} has no parameters {', '.join(undeclared)}")
+
+    overrides = {name: parameters[name] for name in declared if parameters.get(name) is not None}
+    segments = compileScenario(scenario, parameters["dt"], parameters["L"], **overrides)
+    closed_time = sum(duration for duration in segments[:, 0].tolist() if duration != math.inf)
+    closed_time = scenario.get("duration", closed_time)
+
+    return segments, closed_time
+
+def runScenario(parameters: dict) -> dict:
+    """
+    runs one headless simulation and summarizes it
+
+    inputs:
+    -------
+        parameters (dict): run parameters, missing ones take the value in default_parameters.
+            Parameters the scenario does not declare must be None
+
+    return:
+    -------
+        metrics (dict): final pose, closure error (distance between the final and the
+            starting position) [m], path length [m], number of steps and, when
+            coverage_resolution is set, the floor covered by the robot [m^2]
+    """
+    parameters = {**default_parameters, **parameters}
+    segments, closed_time = scenarioSegments(parameters)
+    duration = parameters["duration"] if parameters["duration"] is not None else closed_time
+    if not duration > 0.:
+        raise ValueError(f"run of {parameters['shape']!r} has no duration, pass one in the parameters")
+
+    sim = RobotSimulate(dt=parameters["dt"], wheel_base=parameters["L"],
+                        integrator=parameters["integrator"], vmax=parameters["vmax"])
+    trajectory = sim.simulate(duration, segments)
+
+    # distance driven by the robot's center, step by step
+    speed = np.abs(trajectory["vl"][1:] + trajectory["vr"][1:]) / 2.
+    path_length = float(np.sum(speed * np.diff(trajectory["time"])))
+
+    final = trajectory.getState(-1)
+
+    metrics = {"final_px": final.px,
+               "final_py": final.py,
+               "final_phi": final.phi,
+               "closure_error": math.hypot(final.px - trajectory["px"][0], final.py - trajectory["py"][0]),
+               "path_length": path_length,
+               "steps": len(trajectory) - 1}
+
+    if parameters["coverage_resolution"] is not None:
+        coverage = CoverageMap(parameters["coverage_resolution"])
+        coverage.addPoses(trajectory["px"], trajectory["py"], trajectory["phi"])
+        metrics["covered_area"] = coverage.area
+
+    return metrics
+
+def sweep(parameter_sets: list[dict], workers: int=None, chunksize: int=1) -> list[dict]:
+    """
+    runs every parameter set as an independent simulation on a pool of processes.
+    Runs are deterministic and results come back in the order of parameter_sets
+
+    inputs:
+    -------
+        parameter_sets (list[dict]): parameters of each run (see default_parameters)
+        workers (int): number of processes, None uses every core
+        chunksize (int): runs handed to a process at a time
+
+    return:
+    -------
+        results (list[dict]): parameters and metrics of each run, merged in one dict
+    """
+    from concurrent.futures import ProcessPoolExecutor # only needed to sweep, not to run one scenario
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        metrics = list(executor.map(runScenario, parameter_sets, chunksize=chunksize))
+
+    return [{**parameters, **result} for parameters, result in zip(parameter_sets, metrics)]
@@ -0,0 +1,296 @@
+"""
+Author: Miguel Tamayo
+
+trajectory.py
+Contains the record layout and buffer used to store a simulated run
+"""
+
+from .states import RobotState, RobotDerivativeState
+
+import numpy as np
+
+# one record per sample: time, state, derivative state and wheel velocities
+trajectory_dtype = np.dtype([("time", np.float64),
+                             ("px", np.float64),
+                             ("py", np.float64),
+                             ("phi", np.float64),
+                             ("vx", np.float64),
+                             ("vy", np.float64),
+                             ("w", np.float64),
+                             ("vl", np.float64),
+                             ("vr", np.float64)])
+
+class TrajectoryBuffer:
+    """
+    Growable record of a simulated run. Storage is a preallocated NumPy array
+    that doubles in size when full, so appending is amortized O(1). Each field
+    can be read as a zero-copy column view, e.g. buffer["px"]. Views are only
+    valid until the next append that grows the buffer
+
+    inputs:
+    -------
+        capacity (int): number of samples to preallocate
+
+    return:
+    -------
+        buffer (TrajectoryBuffer): trajectory buffer instance
+    """
+    def __init__(self,
+                 capacity: int=1024) -> None:
+
+        self._records = np.zeros(max(capacity, 1), dtype=trajectory_dtype)
+        self.size = 0 # number of samples stored
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """
+        gets a column of the trajectory
+
+        inputs:
+        -------
+            field (str): name of the column (see trajectory_dtype)
+
+        return:
+        -------
+            column (np.ndarray): view of the stored samples of the column
+        """
+        return self._records[field][:self.size]
+
+    @classmethod
+    def fromRecords(cls, records: np.ndarray) -> "TrajectoryBuffer":
+        """
+        wraps existing records (e.g. a memory-mapped log) without copying them.
+        The records are only copied if the buffer later has to grow
+
+        inputs:
+        -------
+            records (np.ndarray): samples with trajectory_dtype layout
+
+        return:
+        -------
+            buffer (TrajectoryBuffer): buffer holding the records
+        """
+        buffer = cls(capacity=1)
+        buffer._records = records
+        buffer.size = len(records)
+
+        return buffer
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        view of every stored sample as structured records
+        """
+        return self._records[:self.size]
+
+    @property
+    def capacity(self) -> int:
+        """
+        number of samples that fit before the buffer has to grow
+        """
+        return len(self._records)
+
+    def reserve(self, capacity: int) -> None:
+        """
+        grows the storage so it holds at least capacity samples
+
+        inputs:
+        -------
+            capacity (int): number of samples to hold
+        """
+        if capacity <= len(self._records):
+            return None
+
+        records = np.zeros(capacity, dtype=trajectory_dtype)
+        records[:self.size] = self._records[:self.size]
+        self._records = records
+
+        return None
+
+    def append(self,
+               time: float,
+               state: RobotState,
+               dot: RobotDerivativeState,
+               wheel_vel: RobotDerivativeState) -> None:
+        """
+        stores a sample of the run
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's state
+            dot (RobotDerivativeState): robot's derivative state
+            wheel_vel (RobotDerivativeState): robot's left (vx) and right (vy) wheel velocities
+        """
+        if self.size == len(self._records):
+            self.reserve(max(2 * len(self._records), 1))
+
+        self._records[self.size] = (time, state.px, state.py, state.phi,
+                                    dot.vx, dot.vy, dot.w,
+                                    wheel_vel.vx, wheel_vel.vy)
+        self.size += 1
+
+        return None
+
+    def extend(self, records: np.ndarray) -> None:
+        """
+        stores several samples at once
+
+        inputs:
+        -------
+            records (np.ndarray): samples with trajectory_dtype layout
+        """
+        end = self.size + len(records)
+        if end > len(self._records):
+            self.reserve(max(end, 2 * len(self._records)))
+
+        self._records[self.size:end] = records
+        self.size = end
+
+        return None
+
+    def clear(self) -> None:
+        """
+        drops every stored sample while keeping the allocated storage
+        """
+        self.size = 0
+
+        return None
+
+    def getState(self, idx: int) -> RobotState:
+        """
+        gets the robot's state at a sample
+
+        inputs:
+        -------
+            idx (int): sample index
+
+        return:
+        -------
+            state (RobotState): robot's state
+        """
+        record = self.records[idx]
+
+        return RobotState(px=float(record["px"]), py=float(record["py"]), phi=float(record["phi"]))
+
+class TrajectoryRingBuffer:
+    """
+    Fixed-capacity record of the most recent samples of a run. Once full, every
+    append overwrites the oldest sample, so memory never grows. Each sample is
+    written twice (at i and i + capacity) so the stored samples are always a
+    contiguous, time-ordered slice and columns stay zero-copy views
+
+    inputs:
+    -------
+        capacity (int): number of most recent samples to keep
+
+    return:
+    -------
+        buffer (TrajectoryRingBuffer): ring buffer instance
+    """
+    def __init__(self,
+                 capacity: int=4096) -> None:
+
+        self.capacity = max(capacity, 1)
+        self._records = np.zeros(2 * self.capacity, dtype=trajectory_dtype)
+        self.size = 0 # number of samples stored
+        self.head = 0 # position the next sample is written to
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        """
+        gets a column of the trajectory
+
+        inputs:
+        -------
+            field (str): name of the column (see trajectory_dtype)
+
+        return:
+        -------
+            column (np.ndarray): view of the stored samples of the column, oldest first
+        """
+        end = self.head + self.capacity
+
+        return self._records[field][end - self.size:end]
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        view of every stored sample as structured records, oldest first
+        """
+        end = self.head + self.capacity
+
+        return self._records[end - self.size:end]
+
+    def append(self,
+               time: float,
+               state: RobotState,
+               dot: RobotDerivativeState,
+               wheel_vel: RobotDerivativeState) -> None:
+        """
+        stores a sample of the run, dropping the oldest one when full
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's state
+            dot (RobotDerivativeState): robot's derivative state
+            wheel_vel (RobotDerivativeState): robot's left (vx) and right (vy) wheel velocities
+        """
+        record = (time, state.px, state.py, state.phi,
+                  dot.vx, dot.vy, dot.w,
+                  wheel_vel.vx, wheel_vel.vy)
+        self._records[self.head] = record
+        self._records[self.head + self.capacity] = record
+
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+        return None
+
+    def extend(self, records: np.ndarray) -> None:
+        """
+        stores several samples at once, dropping the oldest ones when full
+
+        inputs:
+        -------
+            records (np.ndarray): samples with trajectory_dtype layout
+        """
+        records = records[-self.capacity:] # older samples would be overwritten anyway
+        positions = (self.head + np.arange(len(records))) % self.capacity
+        self._records[positions] = records
+        self._records[positions + self.capacity] = records
+
+        self.head = (self.head + len(records)) % self.capacity
+        self.size = min(self.size + len(records), self.capacity)
+
+        return None
+
+    def clear(self) -> None:
+        """
+        drops every stored sample while keeping the allocated storage
+        """
+        self.size = 0
+        self.head = 0
+
+        return None
+
+    def getState(self, idx: int) -> RobotState:
+        """
+        gets the robot's state at a sample
+
+        inputs:
+        -------
+            idx (int): sample index, oldest stored sample first
+
+        return:
+        -------
+            state (RobotState): robot's state
+        """
+        record = self.records[idx]
+
+        return RobotState(px=float(record["px"]), py=float(record["py"]), phi=float(record["phi"]))
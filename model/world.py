@@ -0,0 +1,699 @@
+"""
+Author: Miguel Tamayo
+
+world.py
+Contains the world the robots move in: static obstacles and a spatial index over the
+robots' poses answering collision and proximity queries for a whole fleet at once
+"""
+
+from utilities.constants import *
+
+import json
+import math
+import os
+import numpy as np
+
+# folder holding the worlds that can be loaded by name
+world_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "worlds")
+
+# robot's outline in its own frame, facing +x [m] (same shape as RobotDisplay)
+robot_footprint = np.array(robot_vertices, dtype=np.float64) / m2x
+
+def ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    concatenates arange(start, start + count) for every (start, count) pair, without a Python loop
+
+    inputs:
+    -------
+        starts (np.ndarray): first value of each range
+        counts (np.ndarray): length of each range
+
+    return:
+    -------
+        values (np.ndarray): every range, one after the other
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    if len(ends) == 0 or ends[-1] == 0:
+        return np.empty(0, dtype=np.int64)
+
+    return np.arange(ends[-1]) + np.repeat(np.asarray(starts, dtype=np.int64) - (ends - counts), counts)
+
+def transformFootprint(footprint: np.ndarray, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    places a footprint at every pose
+
+    inputs:
+    -------
+        footprint (np.ndarray): (k, 2) outline in the robot's frame [m]
+        px (np.ndarray): x positions in global frame [m]
+        py (np.ndarray): y positions in global frame [m]
+        phi (np.ndarray): orientations [rad]
+
+    return:
+    -------
+        polygons (np.ndarray): (m, k, 2) outlines in global frame [m]
+    """
+    cos = np.cos(phi)[:, None]
+    sin = np.sin(phi)[:, None]
+    fx = footprint[:, 0]
+    fy = footprint[:, 1]
+
+    return np.stack((px[:, None] + fx * cos - fy * sin,
+                     py[:, None] + fx * sin + fy * cos), axis=-1)
+
+def convexOverlap(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    separating axis test between pairs of convex polygons. A polygon with two points is
+    a segment, so the same test checks segments against polygons. Touching counts as overlap
+
+    inputs:
+    -------
+        a (np.ndarray): (m, k, 2) first polygon of each pair
+        b (np.ndarray): (m, j, 2) second polygon of each pair
+
+    return:
+    -------
+        overlap (np.ndarray): (m,) True where the pair overlaps
+    """
+    # vertex-major copies: every operation below works on whole (m,) rows, as NumPy is
+    # slow at reducing the tiny vertex axis
+    ax, ay = np.ascontiguousarray(a[..., 0].T), np.ascontiguousarray(a[..., 1].T)
+    bx, by = np.ascontiguousarray(b[..., 0].T), np.ascontiguousarray(b[..., 1].T)
+
+    def project(xs, ys, normal_x, normal_y):
+        low = normal_x * xs[0] + normal_y * ys[0]
+        high = low.copy()
+        for x, y in zip(xs[1:], ys[1:]):
+            projected = normal_x * x + normal_y * y
+            np.minimum(low, projected, out=low)
+            np.maximum(high, projected, out=high)
+        return low, high
+
+    separated = np.zeros(len(a), dtype=bool)
+    for xs, ys in ((ax, ay), (bx, by)):
+        for idx in range(len(xs)):
+            # normal of the edge from vertex idx to the next one
+            following = (idx + 1) % len(xs)
+            normal_x = ys[idx] - ys[following]
+            normal_y = xs[following] - xs[idx]
+
+            a_low, a_high = project(ax, ay, normal_x, normal_y)
+            b_low, b_high = project(bx, by, normal_x, normal_y)
+            separated |= (a_high < b_low) | (b_high < a_low)
+
+    return ~separated
+
+def segmentsCross(p0x, p0y, p1x, p1y, q0x, q0y, q1x, q1y) -> np.ndarray:
+    """
+    checks which pairs of segments p0-p1 and q0-q1 properly cross each other
+
+    return:
+    -------
+        cross (np.ndarray): True where the segments cross
+    """
+    def side(ax, ay, bx, by, cx, cy):
+        return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+    return ((side(p0x, p0y, p1x, p1y, q0x, q0y) != side(p0x, p0y, p1x, p1y, q1x, q1y)) &
+            (side(q0x, q0y, q1x, q1y, p0x, p0y) != side(q0x, q0y, q1x, q1y, p1x, p1y)))
+
+class SpatialHash:
+    """
+    Uniform grid over a set of points. Points are kept sorted by cell, so each occupied
+    cell is a contiguous run of that order and a query only looks at the runs of the
+    cells around it. Queries for every point run as a handful of vectorized passes, in
+    time proportional to the number of candidates instead of n^2
+
+    Updates are incremental: when no point changed cell the index is kept as is, and
+    otherwise the previous order is re-sorted, which is close to linear as most points
+    stay in their cell from one step to the next
+
+    inputs:
+    -------
+        cell_size (float): side of the grid's cells [m]
+
+    return:
+    -------
+        spatial_hash (SpatialHash): spatial hash instance
+    """
+    def __init__(self,
+                 cell_size: float=1.) -> None:
+
+        self.cell_size = cell_size
+        self.n = 0
+        self.x = np.empty(0) # points' positions, copied on update [m]
+        self.y = np.empty(0)
+        self.keys = np.empty(0, dtype=np.int64) # cell of each point
+        self.order = np.empty(0, dtype=np.int64) # point indices sorted by cell
+        self.cells = np.empty(0, dtype=np.int64) # occupied cells, sorted
+        self.starts = np.empty(0, dtype=np.int64) # run of each occupied cell in order
+        self.counts = np.empty(0, dtype=np.int64)
+        self.cell = np.empty(0, dtype=np.int64) # occupied cell of each position in order
+        self.sorted_x = np.empty(0) # points' positions in order [m]
+        self.sorted_y = np.empty(0)
+        self.resorts = 0 # updates that changed the order
+
+    def cellKeys(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        gets the cell holding each point, as a single integer sorted by (column, row)
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            keys (np.ndarray): cell keys
+        """
+        column = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+        row = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+
+        return (column << 32) + row
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> int:
+        """
+        moves the points to new positions
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            moved (int): points that changed cell
+        """
+        keys = self.cellKeys(x, y)
+        if len(keys) != self.n:
+            self.n = len(keys)
+            self.x = np.empty(self.n)
+            self.y = np.empty(self.n)
+            self.order = np.argsort(keys, kind="stable")
+            moved = self.n
+        else:
+            moved = int(np.count_nonzero(keys != self.keys))
+            if moved:
+                self.order = self.order[np.argsort(keys[self.order], kind="stable")]
+
+        self.x[:] = x
+        self.y[:] = y
+        if moved:
+            self.keys = keys
+            self.resorts += 1
+
+            sorted_keys = keys[self.order]
+            self.starts = np.flatnonzero(np.diff(sorted_keys, prepend=sorted_keys[:1] - 1))
+            self.counts = np.diff(self.starts, append=self.n)
+            self.cells = sorted_keys[self.starts]
+            self.cell = np.repeat(np.arange(len(self.cells)), self.counts)
+
+        self.sorted_x = self.x[self.order]
+        self.sorted_y = self.y[self.order]
+
+        return moved
+
+    def neighborRuns(self, cells: np.ndarray, dx: int, dy: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        finds the run of points in the cell at an offset from each of the given cells
+
+        inputs:
+        -------
+            cells (np.ndarray): cell keys
+            dx (int): column offset
+            dy (int): row offset
+
+        return:
+        -------
+            starts (np.ndarray): first position of each run in order
+            counts (np.ndarray): points in each run, 0 for empty cells
+        """
+        if len(self.cells) == 0:
+            return np.zeros(len(cells), dtype=np.int64), np.zeros(len(cells), dtype=np.int64)
+
+        neighbors = cells + (dx << 32) + dy
+        idx = np.minimum(np.searchsorted(self.cells, neighbors), len(self.cells) - 1)
+        found = self.cells[idx] == neighbors
+
+        return self.starts[idx], np.where(found, self.counts[idx], 0)
+
+    def pairs(self, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        finds every pair of points closer than radius to each other
+
+        inputs:
+        -------
+            radius (float): largest distance between the points of a pair [m]
+
+        return:
+        -------
+            i (np.ndarray): first point of each pair
+            j (np.ndarray): second point of each pair, i < j
+            distance (np.ndarray): distance between the points [m]
+        """
+        reach = max(int(math.ceil(radius / self.cell_size)), 1) # rings of cells to look at
+        position = np.arange(self.n)
+        cell = self.cell
+
+        # same cell: every later point of the run
+        later = (self.starts + self.counts)[cell] - position - 1
+        first = [np.repeat(position, later)]
+        second = [ranges(position + 1, later)]
+
+        # other cells: half of the neighborhood, so each pair is found once
+        for dx in range(0, reach + 1):
+            for dy in range(-reach, reach + 1):
+                if dx == 0 and dy <= 0:
+                    continue
+                starts, counts = self.neighborRuns(self.cells, dx, dy)
+                first.append(np.repeat(position, counts[cell]))
+                second.append(ranges(starts[cell], counts[cell]))
+
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+        dx = self.sorted_x[first] - self.sorted_x[second]
+        dy = self.sorted_y[first] - self.sorted_y[second]
+        squared = dx * dx + dy * dy
+        close = np.flatnonzero(squared <= radius * radius)
+        a = self.order[first[close]]
+        b = self.order[second[close]]
+
+        return np.minimum(a, b), np.maximum(a, b), np.sqrt(squared[close])
+
+    def query(self, x: np.ndarray, y: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        finds the points closer than radius to each of a batch of query positions
+
+        inputs:
+        -------
+            x (np.ndarray): queries' x positions [m]
+            y (np.ndarray): queries' y positions [m]
+            radius (float): largest distance from the query [m]
+
+        return:
+        -------
+            queries (np.ndarray): query of each match
+            points (np.ndarray): point of each match
+            distance (np.ndarray): distance between the query and the point [m]
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        reach = max(int(math.ceil(radius / self.cell_size)), 1)
+        keys = self.cellKeys(x, y)
+        query = np.arange(len(keys))
+
+        queries = []
+        positions = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                starts, counts = self.neighborRuns(keys, dx, dy)
+                queries.append(np.repeat(query, counts))
+                positions.append(ranges(starts, counts))
+
+        queries = np.concatenate(queries)
+        positions = np.concatenate(positions)
+        distance = np.hypot(x[queries] - self.sorted_x[positions], y[queries] - self.sorted_y[positions])
+        close = distance <= radius
+
+        return queries[close], self.order[positions[close]], distance[close]
+
+class World:
+    """
+    Static polygonal obstacles and the robots moving among them. Obstacle edges are
+    bucketed once into a fixed grid over the world's bounds, each cell also knowing
+    whether its center lies inside an obstacle, so map queries only test the few edges
+    around each robot. Robots are indexed by a SpatialHash refreshed with updateRobots
+    on every step; collisions use the robot's footprint (see RobotDisplay.vertices)
+
+    inputs:
+    -------
+        obstacles (list): (k, 2) vertices of each obstacle polygon [m]
+        bounds (tuple): (xmin, ymin, xmax, ymax) area covered by the obstacle grid [m],
+            by default the obstacles' bounding box
+        cell_size (float): side of the grid cells [m]
+        footprint (np.ndarray): (k, 2) convex robot outline in its own frame [m]
+
+    return:
+    -------
+        world (World): world instance
+    """
+    def __init__(self,
+                 obstacles: list=(),
+                 bounds: tuple=None,
+                 cell_size: float=1.,
+                 footprint: np.ndarray=robot_footprint) -> None:
+
+        self.obstacles = [np.asarray(obstacle, dtype=np.float64).reshape(-1, 2) for obstacle in obstacles]
+        self.footprint = np.asarray(footprint, dtype=np.float64)
+        self.radius = float(np.hypot(self.footprint[:, 0], self.footprint[:, 1]).max()) # footprint's bounding circle [m]
+        self.inner_radius = self.innerRadius() # largest circle around the center inside the footprint [m]
+        self.cell_size = cell_size
+
+        # every obstacle edge as x0, y0, x1, y1
+        edges = [np.hstack((obstacle, np.roll(obstacle, -1, axis=0))) for obstacle in self.obstacles]
+        self.edges = np.vstack(edges) if edges else np.empty((0, 4))
+        self.edge_obstacle = np.repeat(np.arange(len(self.obstacles)), [len(obstacle) for obstacle in self.obstacles])
+
+        if bounds is None:
+            points = np.vstack(self.obstacles) if self.obstacles else np.zeros((1, 2))
+            bounds = (*points.min(axis=0), *points.max(axis=0))
+        self.bounds = tuple(float(value) for value in bounds)
+        self.buildGrid()
+
+        self.robots = SpatialHash(2 * self.radius) # footprints can only touch in neighboring cells
+        self.px = np.empty(0) # robots' poses, copied on update
+        self.py = np.empty(0)
+        self.phi = np.empty(0)
+
+    def innerRadius(self) -> float:
+        """
+        computes the distance from the footprint's center to its closest edge
+
+        return:
+        -------
+            radius (float): radius of the largest circle centered on the robot inside its footprint [m]
+        """
+        start = self.footprint
+        end = np.roll(self.footprint, -1, axis=0)
+        length = np.hypot(*(end - start).T)
+
+        return float(np.min(np.abs(start[:, 0] * end[:, 1] - start[:, 1] * end[:, 0]) / length))
+
+    def bucketEdges(self, reach: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        buckets every obstacle edge into the grid cells its bounding box, grown by reach, overlaps
+
+        inputs:
+        -------
+            reach (float): margin added around each edge [m]
+
+        return:
+        -------
+            starts (np.ndarray): first entry of each cell in edges
+            counts (np.ndarray): edges of each cell
+            edges (np.ndarray): edge indices sorted by cell
+        """
+        xmin, ymin, _, _ = self.bounds
+        x0, y0, x1, y1 = self.edges.T
+        first_column = np.clip(np.floor((np.minimum(x0, x1) - reach - xmin) / self.cell_size), 0, self.columns - 1).astype(np.int64)
+        last_column = np.clip(np.floor((np.maximum(x0, x1) + reach - xmin) / self.cell_size), 0, self.columns - 1).astype(np.int64)
+        first_row = np.clip(np.floor((np.minimum(y0, y1) - reach - ymin) / self.cell_size), 0, self.rows - 1).astype(np.int64)
+        last_row = np.clip(np.floor((np.maximum(y0, y1) + reach - ymin) / self.cell_size), 0, self.rows - 1).astype(np.int64)
+
+        height = last_row - first_row + 1
+        spans = (last_column - first_column + 1) * height
+        edge = np.repeat(np.arange(len(self.edges)), spans)
+        offset = ranges(np.zeros(len(spans)), spans)
+        cell = (first_column[edge] + offset // height[edge]) * self.rows + first_row[edge] + offset % height[edge]
+
+        counts = np.bincount(cell, minlength=self.columns * self.rows)
+
+        return np.cumsum(counts) - counts, counts, edge[np.argsort(cell, kind="stable")]
+
+    def buildGrid(self) -> None:
+        """
+        buckets the obstacle edges into the grid cells they come within a robot radius of,
+        and labels the cells whose center is inside an obstacle
+        """
+        xmin, ymin, xmax, ymax = self.bounds
+        self.columns = max(int(math.ceil((xmax - xmin) / self.cell_size)), 1)
+        self.rows = max(int(math.ceil((ymax - ymin) / self.cell_size)), 1)
+
+        self.cell_starts, self.cell_counts, self.cell_edges = self.bucketEdges(self.radius)
+
+        # cells' centers, ray cast against every edge once
+        center_x = xmin + (np.arange(self.columns) + 0.5) * self.cell_size
+        center_y = ymin + (np.arange(self.rows) + 0.5) * self.cell_size
+        self.center_x = np.repeat(center_x, self.rows)
+        self.center_y = np.tile(center_y, self.columns)
+        # parity is kept per obstacle, so the overlap of two obstacles is still inside
+        inside_cells = []
+        inside_obstacles = []
+        for obstacle in range(len(self.obstacles)):
+            inside = np.zeros(self.columns * self.rows, dtype=bool)
+            for ex0, ey0, ex1, ey1 in self.edges[self.edge_obstacle == obstacle]:
+                if ey0 == ey1:
+                    continue
+                straddles = (ey0 > self.center_y) != (ey1 > self.center_y)
+                crossing_x = ex0 + (self.center_y - ey0) * (ex1 - ex0) / (ey1 - ey0)
+                inside ^= straddles & (self.center_x < crossing_x)
+            inside_cells.append(np.flatnonzero(inside))
+            inside_obstacles.append(np.full(len(inside_cells[-1]), obstacle))
+
+        # obstacles holding each cell's center, as runs of inside_obstacles sorted by cell
+        cells = np.concatenate(inside_cells) if inside_cells else np.empty(0, dtype=np.int64)
+        obstacles = np.concatenate(inside_obstacles) if inside_obstacles else np.empty(0, dtype=np.int64)
+        order = np.argsort(cells, kind="stable")
+        self.inside_obstacles = obstacles[order].astype(np.int64)
+        self.inside_counts = np.bincount(cells, minlength=self.columns * self.rows)
+        self.inside_starts = np.cumsum(self.inside_counts) - self.inside_counts
+        self.inside = self.inside_counts > 0 # cells whose center is inside an obstacle
+
+        return None
+
+    def cellOf(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        gets the obstacle grid cell holding each point
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            cell (np.ndarray): cell index, -1 outside the grid
+            in_grid (np.ndarray): True for points inside the grid
+        """
+        xmin, ymin, _, _ = self.bounds
+        column = np.floor((x - xmin) / self.cell_size).astype(np.int64)
+        row = np.floor((y - ymin) / self.cell_size).astype(np.int64)
+        in_grid = (column >= 0) & (column < self.columns) & (row >= 0) & (row < self.rows)
+
+        return np.where(in_grid, column * self.rows + row, -1), in_grid
+
+    def nearbyEdges(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        gets the obstacle edges bucketed in each point's cell: every edge within a robot
+        radius of the point is among them
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            cell (np.ndarray): cell index of each point, -1 outside the grid
+            in_grid (np.ndarray): True for points inside the grid
+            points (np.ndarray): point of each candidate
+            edges (np.ndarray): edge of each candidate
+        """
+        cell, in_grid = self.cellOf(x, y)
+        counts = np.where(in_grid, self.cell_counts[cell], 0)
+        points = np.repeat(np.arange(len(cell)), counts)
+
+        return cell, in_grid, points, self.cell_edges[ranges(self.cell_starts[cell], counts)]
+
+    def insideObstacles(self, x: np.ndarray, y: np.ndarray, cell: np.ndarray, in_grid: np.ndarray,
+                        points: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """
+        checks which points lie inside an obstacle from their nearby edges (see nearbyEdges).
+        The segment from the cell's center to the point stays in the cell, so only the
+        cell's edges can flip it from the center's side of an obstacle's boundary to the
+        other. Sides are tracked per obstacle, so overlapping obstacles stay occupied
+
+        return:
+        -------
+            occupied (np.ndarray): True for points inside an obstacle
+        """
+        ex0, ey0, ex1, ey1 = self.edges[edges].T
+        crosses = segmentsCross(self.center_x[cell[points]], self.center_y[cell[points]], x[points], y[points],
+                                ex0, ey0, ex1, ey1)
+
+        # (point, obstacle) keys: obstacles holding the point's cell center, and obstacles
+        # whose boundary the point crossed. A key found once (center inside xor an odd
+        # number of crossings) is an obstacle holding the point
+        obstacles = max(len(self.obstacles), 1)
+        counts = np.where(in_grid, self.inside_counts[cell], 0)
+        center_keys = np.repeat(np.arange(len(x)), counts) * obstacles + \
+            self.inside_obstacles[ranges(self.inside_starts[cell], counts)]
+        crossed_keys = points[crosses] * obstacles + self.edge_obstacle[edges[crosses]]
+        crossed_keys, crossings = np.unique(crossed_keys, return_counts=True)
+        keys, found = np.unique(np.concatenate((center_keys, crossed_keys[crossings % 2 == 1])), return_counts=True)
+
+        occupied = np.zeros(len(x), dtype=bool)
+        occupied[keys[found == 1] // obstacles] = True
+
+        return in_grid & occupied
+
+    def occupied(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        checks which points lie inside an obstacle
+
+        inputs:
+        -------
+            x (np.ndarray): x positions [m]
+            y (np.ndarray): y positions [m]
+
+        return:
+        -------
+            occupied (np.ndarray): True for points inside an obstacle
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+
+        return self.insideObstacles(x, y, *self.nearbyEdges(x, y))
+
+    def updateRobots(self, px: np.ndarray, py: np.ndarray, phi: np.ndarray) -> int:
+        """
+        moves the robots to their poses of this step
+
+        inputs:
+        -------
+            px (np.ndarray): x positions in global frame [m]
+            py (np.ndarray): y positions in global frame [m]
+            phi (np.ndarray): orientations [rad]
+
+        return:
+        -------
+            moved (int): robots that changed cell in the robot index
+        """
+        moved = self.robots.update(px, py)
+        self.px = self.robots.x
+        self.py = self.robots.y
+        if len(self.phi) != self.robots.n:
+            self.phi = np.empty(self.robots.n)
+        self.phi[:] = phi
+
+        return moved
+
+    def proximity(self, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        finds every pair of robots whose centers are closer than radius
+
+        inputs:
+        -------
+            radius (float): largest distance between the robots of a pair [m]
+
+        return:
+        -------
+            i (np.ndarray): first robot of each pair
+            j (np.ndarray): second robot of each pair, i < j
+            distance (np.ndarray): distance between the robots' centers [m]
+        """
+        return self.robots.pairs(radius)
+
+    def nearbyRobots(self, x: np.ndarray, y: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        finds the robots whose centers are closer than radius to each query position
+
+        inputs:
+        -------
+            x (np.ndarray): queries' x positions [m]
+            y (np.ndarray): queries' y positions [m]
+            radius (float): largest distance from the query [m]
+
+        return:
+        -------
+            queries (np.ndarray): query of each match
+            robots (np.ndarray): robot of each match
+            distance (np.ndarray): distance between the query and the robot [m]
+        """
+        return self.robots.query(x, y, radius)
+
+    def robotCollisions(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        finds every pair of robots whose footprints overlap
+
+        return:
+        -------
+            i (np.ndarray): first robot of each pair
+            j (np.ndarray): second robot of each pair, i < j
+        """
+        i, j, distance = self.robots.pairs(2 * self.radius)
+
+        # robots closer than twice the inner radius overlap whatever their headings
+        overlap = distance <= 2 * self.inner_radius
+        unsure = np.flatnonzero(~overlap)
+        polygons_i = transformFootprint(self.footprint, self.px[i[unsure]], self.py[i[unsure]], self.phi[i[unsure]])
+        polygons_j = transformFootprint(self.footprint, self.px[j[unsure]], self.py[j[unsure]], self.phi[j[unsure]])
+        overlap[unsure] = convexOverlap(polygons_i, polygons_j)
+
+        return i[overlap], j[overlap]
+
+    def obstacleCollisions(self) -> np.ndarray:
+        """
+        finds the robots whose footprint touches an obstacle or whose center is inside one
+
+        return:
+        -------
+            robots (np.ndarray): colliding robots, sorted
+        """
+        cell, in_grid, robots, edges = self.nearbyEdges(self.px, self.py)
+        colliding = self.insideObstacles(self.px, self.py, cell, in_grid, robots, edges)
+
+        # bounding circle against the edges first, the exact footprint only for what is left
+        x0, y0, x1, y1 = self.edges[edges].T
+        dx = x1 - x0
+        dy = y1 - y0
+        length = np.maximum(dx * dx + dy * dy, 1e-12)
+        t = np.clip(((self.px[robots] - x0) * dx + (self.py[robots] - y0) * dy) / length, 0., 1.)
+        close = np.hypot(x0 + t * dx - self.px[robots], y0 + t * dy - self.py[robots]) <= self.radius
+        robots, edges = robots[close], edges[close]
+
+        polygons = transformFootprint(self.footprint, self.px[robots], self.py[robots], self.phi[robots])
+        segments = self.edges[edges].reshape(-1, 2, 2)
+        colliding[robots[convexOverlap(polygons, segments)]] = True
+
+        return np.flatnonzero(colliding)
+
+def loadWorld(name: str, cell_size: float=1., footprint: np.ndarray=robot_footprint) -> World:
+    """
+    reads a world from a JSON file, either a path or the name of a file in worlds/.
+    A world is a dict with:
+
+        "bounds": optional [xmin, ymin, xmax, ymax] area of the world [m]
+        "obstacles": list of items, each one either
+            {"polygon": [[x, y], ...]}, vertices of a simple polygon [m]
+            {"rectangle": [xmin, ymin, xmax, ymax]}, an axis-aligned box [m]
+
+    inputs:
+    -------
+        name (str): world path, or name such as "warehouse"
+        cell_size (float): side of the grid cells [m]
+        footprint (np.ndarray): (k, 2) convex robot outline in its own frame [m]
+
+    return:
+    -------
+        world (World): world instance
+    """
+    filename = name if os.path.isfile(name) else os.path.join(world_dir, f"{name}.json")
+    if not os.path.isfile(filename):
+        raise ValueError(f"unknown world: {name}")
+
+    with open(filename) as file:
+        description = json.load(file)
+
+    obstacles = []
+    for item in description.get("obstacles", []):
+        if "rectangle" in item:
+            xmin, ymin, xmax, ymax = item["rectangle"]
+            obstacles.append([[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax]])
+        elif "polygon" in item:
+            obstacles.append(item["polygon"])
+        else:
+            raise ValueError(f"unknown obstacle in world {name}: {item}")
+
+    return World(obstacles, description.get("bounds"), cell_size, footprint)
+
+def worldNames() -> list[str]:
+    """
+    lists the worlds that can be loaded by name
+
+    return:
+    -------
+        names (list[str]): names of the files in worlds/, sorted
+    """
+    return sorted(filename[:-len(".json")] for filename in os.listdir(world_dir) if filename.endswith(".json"))
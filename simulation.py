@@ -2,7 +2,6 @@ from display.main_window import MainWindow
 
 import sys
 from PyQt5.QtWidgets import QApplication
-import pyqtgraph.opengl as gl
 
 def main():
     app = QApplication(sys.argv)
@@ -2,11 +2,11 @@
 Author: Miguel Tamayo
 
 constants.py
-Holds all the constants used throughout the simulation
+Holds all the constants used throughout the simulation. Only plain Python values are
+created on import, so the model can be used without Qt; the QColor constants are built
+on first use and have to be imported by name
 """
 
-from PyQt5.QtGui import (QColor)
-
 ### ----- plot constants ----- ####
 plot_black = (0, 0, 0)
 plot_white = (255, 255, 255)
@@ -26,15 +26,55 @@ robot_size = 50. # size of robot sides [px]
 scaling_unit = 0.25 # determines the relative size of the front tip of the robot
 front_size = robot_size * scaling_unit # size of robot's front tip
 
+# robot's outline in its own frame, facing +x [px]
+#|---\
+#|---/
+robot_vertices = [[-robot_size/2, robot_size/2], # top left
+                  [robot_size/2, robot_size/2],  # top right
+                  [robot_size/2 + front_size, 0], # front
+                  [robot_size/2, -robot_size/2], # bottom right
+                  [-robot_size/2, -robot_size/2]] # bottom left
+
 vmax = 1 # wheels max linear velocity [m/s]
 vmin = -vmax 
 
 heading_max = 180
 heading_min = -heading_max
 
+### ----- Path Constants ----- ###
+path_chunk_size = 256 # points appended to a path before they are frozen
+path_min_distance = 0.5 # minimum distance between path points [px]
+path_collinear_tolerance = 0.1 # maximum deviation of a dropped collinear point [px]
+path_max_points = 200000 # approximate maximum number of points in a path
+
+### ----- Fleet Constants ----- ###
+fleet = False # drive a demo fleet along the scenario from start-up (F5 toggles it)
+fleet_size = 64 # robots in the demo fleet
+fleet_spacing = 1. # distance between neighboring demo robots at the start [m]
+fleet_trail_length = 50 # past positions drawn behind each fleet robot
+fleet_lod_size = 6. # on-screen robot size under which fleet robots are drawn as points [px]
+
+### ----- Coverage Constants ----- ###
+coverage = False # draw the floor covered by the robot from start-up (F4 toggles it)
+coverage_resolution = 0.02 # side of a coverage cell [m]
+coverage_tile_size = 64 # cells along each side of a cached coverage tile
+
 ### ----- Simulation Constants ----- ###
 dt = 0.01 # 10ms timer
-plotUpdateTicks = 10
+frame_rate = 60 # canvas redraws per second
+plot_rate = 10 # graph redraws per second
+max_catch_up_steps = 10 # most physics steps run at once to catch up with wall time
+plot_window = 60. # seconds of history drawn on the graphs
+plot_capacity = 2**16 # samples kept for the graphs
+
+### ----- Replay Constants ----- ###
+replay_speed_min = 0.1 # slowest playback speed
+replay_speed_max = 100. # fastest playback speed
+replay_path_points = 20000 # maximum points used to rebuild the path after a seek
+
+### ----- Profiling Constants ----- ###
+profiling = False # time the step and frame loops from start-up (F3 toggles it)
+profiler_overlay_rate = 2 # overlay refreshes per second
 
 ### ----- Application Constants ----- ###
 window_height = 1000
@@ -47,7 +87,32 @@ button_width = int(canvas_width / 3.2)
 slider_width = int(canvas_width / 2.5)
 
 ### ------ Colors ----- ###
-background_color = QColor(57, 57, 57)
-robot_color = QColor(161, 217, 139)
-line_color = QColor(203, 209, 203)
+# (r, g, b) of the QColor constants below
+color_values = {"background_color": (57, 57, 57),
+                "robot_color": (161, 217, 139),
+                "line_color": (203, 209, 203)}
+
+# everything but the colors, so "import *" never loads Qt
+__all__ = [name for name in globals() if not name.startswith("_")]
+
+def __getattr__(name: str):
+    """
+    builds the QColor constants the first time they are used
+
+    inputs:
+    -------
+        name (str): constant name, e.g. "robot_color"
+
+    return:
+    -------
+        color (QColor): color constant
+    """
+    if name not in color_values:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from PyQt5.QtGui import QColor
+
+    color = QColor(*color_values[name])
+    globals()[name] = color # later lookups skip __getattr__
 
+    return color
@@ -0,0 +1,43 @@
+"""
+Author: Miguel Tamayo
+
+decimation.py
+Holds functions that reduce the number of points of a series before it is drawn
+"""
+
+import numpy as np
+
+def decimateMinMax(x: np.ndarray, y: np.ndarray, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    reduces a series to about max_points points by splitting it into equal bins and
+    keeping only the minimum and maximum of each bin, in time order. Peaks are kept,
+    so the drawn line looks the same as the full series once bins are narrower than a pixel
+
+    inputs:
+    -------
+        x (np.ndarray): x-axis values
+        y (np.ndarray): y-axis values
+        max_points (int): maximum number of points to keep
+
+    return:
+    -------
+        x, y (tuple[np.ndarray, np.ndarray]): decimated series
+    """
+    n = len(y)
+    if n <= max_points or max_points < 2:
+        return x, y
+
+    per_bin = -(-n // (max_points // 2)) # samples per bin, rounded up
+    bins = n // per_bin
+    binned = y[:bins * per_bin].reshape(bins, per_bin)
+
+    idx_min = binned.argmin(axis=1)
+    idx_max = binned.argmax(axis=1)
+
+    start = np.arange(bins) * per_bin
+    idx = np.empty(2 * bins + n - bins * per_bin, dtype=np.intp)
+    idx[0:2 * bins:2] = start + np.minimum(idx_min, idx_max)
+    idx[1:2 * bins:2] = start + np.maximum(idx_min, idx_max)
+    idx[2 * bins:] = np.arange(bins * per_bin, n) # leftover samples of the last partial bin
+
+    return x[idx], y[idx]
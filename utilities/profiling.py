@@ -0,0 +1,297 @@
+"""
+Author: Miguel Tamayo
+
+profiling.py
+Holds the opt-in instrumentation that times the stages of the step and frame loops
+"""
+
+import math
+import time
+import numpy as np
+
+class LatencyHistogram:
+    """
+    Histogram of durations over logarithmic bins, from 1 us to 10 s. Recording is a
+    log10 and an increment, so it can run on every step; percentiles are read from
+    the bins and are accurate to the bin width (about 26% with 10 bins per decade)
+
+    inputs:
+    -------
+        bins_per_decade (int): resolution of the histogram
+
+    return:
+    -------
+        histogram (LatencyHistogram): latency histogram instance
+    """
+    min_seconds = 1e-6
+    decades = 7
+
+    def __init__(self,
+                 bins_per_decade: int=10) -> None:
+
+        self.bins_per_decade = bins_per_decade
+        self.counts = np.zeros(self.decades * bins_per_decade + 1, dtype=np.int64) # last bin holds the overflow
+        self.edges = self.min_seconds * 10 ** (np.arange(len(self.counts)) / bins_per_decade) # bins' lower edges [s]
+        self.count = 0
+        self.total = 0. # sum of every duration [s]
+        self.max = 0. # longest duration [s]
+
+    def record(self, seconds: float) -> None:
+        """
+        adds a duration to the histogram
+
+        inputs:
+        -------
+            seconds (float): duration [s]
+        """
+        if seconds > self.min_seconds:
+            idx = min(int(math.log10(seconds / self.min_seconds) * self.bins_per_decade), len(self.counts) - 1)
+        else:
+            idx = 0
+        self.counts[idx] += 1
+
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+        return None
+
+    def percentile(self, q: float) -> float:
+        """
+        estimates a percentile of the recorded durations
+
+        inputs:
+        -------
+            q (float): percentile, 0 to 100
+
+        return:
+        -------
+            seconds (float): upper edge of the bin holding the percentile [s], 0 if empty
+        """
+        if self.count == 0:
+            return 0.
+
+        idx = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        idx = min(idx, len(self.counts) - 1)
+        upper = self.edges[idx] * 10 ** (1 / self.bins_per_decade)
+
+        return float(min(upper, self.max))
+
+    def summary(self) -> dict:
+        """
+        summarizes the histogram
+
+        return:
+        -------
+            summary (dict): count, mean, p50, p90, p99 and max durations [s]
+        """
+        return {"count": self.count,
+                "mean": self.total / self.count if self.count else 0.,
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "p99": self.percentile(99),
+                "max": self.max}
+
+    def reset(self) -> None:
+        """
+        forgets every recorded duration
+        """
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+        return None
+
+class TickMonitor:
+    """
+    Watches a periodic timer: every tick is compared with the expected period to
+    measure jitter (how late or early it came) and to count the ticks that were
+    missed entirely
+
+    inputs:
+    -------
+        period (float): expected time between ticks [s]
+        bins_per_decade (int): resolution of the jitter histogram
+
+    return:
+    -------
+        monitor (TickMonitor): tick monitor instance
+    """
+    def __init__(self,
+                 period: float,
+                 bins_per_decade: int=10) -> None:
+
+        self.period = period
+        self.jitter = LatencyHistogram(bins_per_decade) # |interval - period| [s]
+        self.ticks = 0
+        self.missed = 0 # periods that went by without a tick
+        self.last = None # time of the last tick [s]
+
+    def tick(self, now: float) -> None:
+        """
+        records a tick
+
+        inputs:
+        -------
+            now (float): time of the tick, from time.perf_counter() [s]
+        """
+        self.ticks += 1
+        if self.last is not None:
+            interval = now - self.last
+            self.jitter.record(abs(interval - self.period))
+            self.missed += max(round(interval / self.period) - 1, 0)
+        self.last = now
+
+        return None
+
+    def summary(self) -> dict:
+        """
+        summarizes the timer
+
+        return:
+        -------
+            summary (dict): ticks, missed ticks and jitter summary (see LatencyHistogram.summary)
+        """
+        return {"period": self.period,
+                "ticks": self.ticks,
+                "missed": self.missed,
+                "jitter": self.jitter.summary()}
+
+    def reset(self) -> None:
+        """
+        forgets every recorded tick
+        """
+        self.jitter.reset()
+        self.ticks = 0
+        self.missed = 0
+        self.last = None
+
+        return None
+
+class StageProfiler:
+    """
+    Collects per-stage latency histograms and timer statistics from the step and
+    frame loops. Instrumented code keeps a profiler attribute that is None unless
+    profiling is on, so the only cost when it is off is that check:
+
+        profiler = self.profiler
+        if profiler is not None:
+            start = profiler.clock()
+        ... stage ...
+        if profiler is not None:
+            profiler.record("physics", start)
+
+    Stages and timers are created on first use. Each one should only be recorded
+    from a single thread; reading the summaries from another thread is safe
+
+    inputs:
+    -------
+        bins_per_decade (int): resolution of the histograms
+
+    return:
+    -------
+        profiler (StageProfiler): stage profiler instance
+    """
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self,
+                 bins_per_decade: int=10) -> None:
+
+        self.bins_per_decade = bins_per_decade
+        self.stages = {} # stage name -> LatencyHistogram
+        self.timers = {} # timer name -> TickMonitor
+
+    def record(self, stage: str, start: float) -> float:
+        """
+        records the time elapsed since start for a stage
+
+        inputs:
+        -------
+            stage (str): stage name
+            start (float): time the stage started, from clock() [s]
+
+        return:
+        -------
+            now (float): current time, so consecutive stages can chain [s]
+        """
+        now = self.clock()
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram(self.bins_per_decade)
+        histogram.record(now - start)
+
+        return now
+
+    def tick(self, timer: str, period: float) -> None:
+        """
+        records a tick of a periodic timer
+
+        inputs:
+        -------
+            timer (str): timer name
+            period (float): expected time between ticks [s]
+        """
+        monitor = self.timers.get(timer)
+        if monitor is None:
+            monitor = self.timers[timer] = TickMonitor(period, self.bins_per_decade)
+        monitor.tick(self.clock())
+
+        return None
+
+    def pauseTimer(self, timer: str) -> None:
+        """
+        marks a timer as stopped, so the time until its next tick is not counted as missed ticks
+
+        inputs:
+        -------
+            timer (str): timer name
+        """
+        monitor = self.timers.get(timer)
+        if monitor is not None:
+            monitor.last = None
+
+        return None
+
+    def report(self) -> dict:
+        """
+        summarizes every stage and timer
+
+        return:
+        -------
+            report (dict): {"stages": {name: summary}, "timers": {name: summary}}
+        """
+        return {"stages": {name: histogram.summary() for name, histogram in list(self.stages.items())},
+                "timers": {name: monitor.summary() for name, monitor in list(self.timers.items())}}
+
+    def format(self) -> str:
+        """
+        formats the report as a small text table, durations in ms
+
+        return:
+        -------
+            text (str): one line per stage and timer
+        """
+        report = self.report()
+        lines = [f"{'stage':12} {'n':>7} {'mean':>7} {'p50':>7} {'p99':>7} {'max':>7}"]
+        for name, summary in report["stages"].items():
+            lines.append(f"{name:12} {summary['count']:>7} {summary['mean'] * 1e3:>7.3f} {summary['p50'] * 1e3:>7.3f} "
+                         f"{summary['p99'] * 1e3:>7.3f} {summary['max'] * 1e3:>7.3f}")
+
+        lines.append(f"{'timer':12} {'ticks':>7} {'missed':>7} {'jit50':>7} {'jit99':>7} {'max':>7}")
+        for name, summary in report["timers"].items():
+            jitter = summary["jitter"]
+            lines.append(f"{name:12} {summary['ticks']:>7} {summary['missed']:>7} {jitter['p50'] * 1e3:>7.3f} "
+                         f"{jitter['p99'] * 1e3:>7.3f} {jitter['max'] * 1e3:>7.3f}")
+
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """
+        forgets every stage and timer
+        """
+        self.stages = {}
+        self.timers = {}
+
+        return None
@@ -0,0 +1,160 @@
+"""
+Author: Miguel Tamayo
+
+telemetry.py
+Contains the sink the simulation streams its samples to disk through
+"""
+
+from model.trajectory import trajectory_dtype
+from model.states import RobotState, RobotDerivativeState
+from utilities.trajectory_io import TrajectoryLogWriter
+
+import gzip
+import queue
+import threading
+import numpy as np
+
+class TelemetrySink:
+    """
+    Streams simulation samples to disk without blocking the simulation. Samples are
+    gathered into fixed-size chunks that a background thread writes as CSV or as a
+    binary trajectory log. Chunks are preallocated and recycled through a bounded
+    queue, so memory stays bounded; if the disk falls behind and every chunk is
+    waiting to be written, the newest samples are dropped and counted
+
+    inputs:
+    -------
+        filename (str): path of the output file
+        format (str): "binary" for a trajectory log or "csv"
+        chunk_size (int): samples written at a time
+        max_chunks (int): chunks that may wait to be written
+        compress (bool): gzip the output
+
+    return:
+    -------
+        sink (TelemetrySink): telemetry sink instance, usable as a context manager
+    """
+    def __init__(self,
+                 filename: str,
+                 format: str="binary",
+                 chunk_size: int=4096,
+                 max_chunks: int=8,
+                 compress: bool=False) -> None:
+
+        if format not in ("binary", "csv"):
+            raise ValueError(f"unknown telemetry format: {format}")
+
+        self.format = format
+        self.chunk_size = chunk_size
+        self.written = 0 # samples written to disk
+        self.dropped = 0 # samples lost because the writer fell behind
+
+        # one chunk being filled, max_chunks waiting, one being written
+        self.pending = queue.Queue(maxsize=max_chunks)
+        self.free = queue.Queue()
+        for _ in range(max_chunks + 1):
+            self.free.put(np.zeros(chunk_size, dtype=trajectory_dtype))
+        self.chunk = np.zeros(chunk_size, dtype=trajectory_dtype)
+        self.fill = 0 # samples in the current chunk
+
+        if format == "binary":
+            self.log = TrajectoryLogWriter(filename, compress=compress)
+            self.file = None
+        else:
+            self.log = None
+            self.file = gzip.open(filename, "wt") if compress else open(filename, "w")
+            self.file.write(",".join(trajectory_dtype.names) + "\n")
+
+        self.writer = threading.Thread(target=self.writeChunks, daemon=True)
+        self.writer.start()
+
+    def __enter__(self) -> "TelemetrySink":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def record(self,
+               time: float,
+               state: RobotState,
+               dot: RobotDerivativeState,
+               wheel_vel: RobotDerivativeState) -> None:
+        """
+        adds a sample to the current chunk, handing the chunk to the writer once full
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's state
+            dot (RobotDerivativeState): robot's derivative state
+            wheel_vel (RobotDerivativeState): robot's left (vx) and right (vy) wheel velocities
+        """
+        self.chunk[self.fill] = (time, state.px, state.py, state.phi,
+                                 dot.vx, dot.vy, dot.w,
+                                 wheel_vel.vx, wheel_vel.vy)
+        self.fill += 1
+
+        if self.fill == self.chunk_size:
+            self.submit()
+
+        return None
+
+    def submit(self) -> None:
+        """
+        hands the current chunk to the writer without waiting. When the writer is
+        behind, the chunk's samples are dropped and the chunk is reused
+        """
+        if self.fill == 0:
+            return None
+
+        try:
+            self.pending.put_nowait((self.chunk, self.fill))
+            self.chunk = self.free.get_nowait()
+        except queue.Full:
+            self.dropped += self.fill
+
+        self.fill = 0
+
+        return None
+
+    def writeChunks(self) -> None:
+        """
+        writes chunks until the sink is closed. Runs on the writer thread
+        """
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+
+            chunk, count = item
+            records = chunk[:count]
+            if self.log is not None:
+                self.log.write(records)
+            else:
+                np.savetxt(self.file, records.view(np.float64).reshape(count, -1), fmt="%.17g", delimiter=",")
+            self.written += count
+
+            self.free.put(chunk)
+
+        return None
+
+    def close(self) -> None:
+        """
+        writes the remaining samples, stops the writer thread and closes the file
+        """
+        if not self.writer.is_alive():
+            return None
+
+        # waits for the writer to have room, the last samples are never dropped
+        if self.fill > 0:
+            self.pending.put((self.chunk, self.fill))
+            self.fill = 0
+        self.pending.put(None)
+        self.writer.join()
+
+        if self.log is not None:
+            self.log.close()
+        else:
+            self.file.close()
+
+        return None
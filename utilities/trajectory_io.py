@@ -0,0 +1,294 @@
+"""
+Author: Miguel Tamayo
+
+trajectory_io.py
+Holds functions that export and import recorded trajectories
+"""
+
+from model.trajectory import TrajectoryBuffer, trajectory_dtype
+from model.states import RobotState, RobotDerivativeState
+from utilities.constants import *
+
+import os
+import gzip
+import numpy as np
+
+# column layouts of the whitespace-separated files read by Analysis/position.m
+text_layouts = {"data": ("px", "py", "vx", "vy"),
+                "position": ("px", "py")}
+
+### ----- binary trajectory log ----- ###
+# a 64 byte header followed by fixed-width little-endian trajectory_dtype records
+log_magic = b"ROBOTTRJ"
+log_version = 1
+log_header_dtype = np.dtype([("magic", "S8"),
+                             ("version", "<u4"),
+                             ("header_size", "<u4"),
+                             ("record_size", "<u4"),
+                             ("field_count", "<u4"),
+                             ("record_count", "<u8"),
+                             ("reserved", "V32")])
+log_record_dtype = trajectory_dtype.newbyteorder("<")
+
+def saveText(trajectory: TrajectoryBuffer, filename: str, fields: tuple=text_layouts["data"]) -> None:
+    """
+    writes trajectory columns to a whitespace-separated text file, one sample per line
+
+    inputs:
+    -------
+        trajectory (TrajectoryBuffer): recorded run
+        filename (str): path of the text file
+        fields (tuple): columns to write, in order (see trajectory_dtype)
+    """
+    columns = np.column_stack([trajectory[field] for field in fields])
+    np.savetxt(filename, columns, fmt="%.17g", delimiter=" ")
+
+    return None
+
+def textLayout(columns: int) -> tuple:
+    """
+    finds the layout of a text file from its number of columns
+
+    inputs:
+    -------
+        columns (int): number of columns in the file
+
+    return:
+    -------
+        fields (tuple): names of the file's columns, in order (see text_layouts)
+    """
+    for fields in text_layouts.values():
+        if len(fields) == columns:
+            return fields
+
+    raise ValueError(f"no text layout has {columns} columns, pass the file's fields")
+
+def loadText(filename: str, fields: tuple=None, dt: float=dt) -> TrajectoryBuffer:
+    """
+    reads a whitespace-separated text file into a trajectory. Columns that are not
+    in the file are left at zero, except time which is rebuilt from the step time
+    when the file has no time column
+
+    inputs:
+    -------
+        filename (str): path of the text file
+        fields (tuple): names of the file's columns, in order (see trajectory_dtype),
+            None picks the layout of text_layouts with as many columns as the file
+        dt (float): time between samples of a file without a time column [s]
+
+    return:
+    -------
+        trajectory (TrajectoryBuffer): loaded run
+    """
+    columns = np.loadtxt(filename, ndmin=2)
+    if fields is None:
+        fields = textLayout(columns.shape[1])
+    if len(fields) != columns.shape[1]:
+        raise ValueError(f"{filename} has {columns.shape[1]} columns, expected {len(fields)} for {fields}")
+
+    records = np.zeros(len(columns), dtype=trajectory_dtype)
+    for idx, field in enumerate(fields):
+        records[field] = columns[:, idx]
+    if "time" not in fields:
+        records["time"] = np.arange(len(records)) * dt
+
+    trajectory = TrajectoryBuffer(len(records))
+    trajectory.extend(records)
+
+    return trajectory
+
+class TrajectoryLogWriter:
+    """
+    Streams samples to a binary trajectory log. Records are appended as they come
+    and the record count in the header is updated when the writer is closed; a log
+    that was never closed can still be read, its length is taken from the file size
+
+    inputs:
+    -------
+        filename (str): path of the log file, overwritten if it exists
+        compress (bool): gzip the log. A compressed log keeps a zero record count
+            in its header and is decompressed into memory when read
+
+    return:
+    -------
+        writer (TrajectoryLogWriter): log writer instance, usable as a context manager
+    """
+    def __init__(self,
+                 filename: str,
+                 compress: bool=False) -> None:
+
+        self.compress = compress
+        self.file = gzip.open(filename, "wb") if compress else open(filename, "wb")
+        self.count = 0 # records written
+        self.writeHeader()
+
+    def __enter__(self) -> "TrajectoryLogWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def writeHeader(self) -> None:
+        """
+        writes the header at the start of the file
+        """
+        header = np.zeros(1, dtype=log_header_dtype)
+        header["magic"] = log_magic
+        header["version"] = log_version
+        header["header_size"] = log_header_dtype.itemsize
+        header["record_size"] = log_record_dtype.itemsize
+        header["field_count"] = len(log_record_dtype.names)
+        header["record_count"] = self.count
+
+        self.file.seek(0)
+        self.file.write(header.tobytes())
+
+        return None
+
+    def write(self, records: np.ndarray) -> None:
+        """
+        appends several samples to the log
+
+        inputs:
+        -------
+            records (np.ndarray): samples with trajectory_dtype layout
+        """
+        self.file.write(np.ascontiguousarray(records, dtype=log_record_dtype).tobytes())
+        self.count += len(records)
+
+        return None
+
+    def append(self,
+               time: float,
+               state: RobotState,
+               dot: RobotDerivativeState,
+               wheel_vel: RobotDerivativeState) -> None:
+        """
+        appends a sample to the log
+
+        inputs:
+        -------
+            time (float): simulation time [s]
+            state (RobotState): robot's state
+            dot (RobotDerivativeState): robot's derivative state
+            wheel_vel (RobotDerivativeState): robot's left (vx) and right (vy) wheel velocities
+        """
+        record = np.array([(time, state.px, state.py, state.phi,
+                            dot.vx, dot.vy, dot.w,
+                            wheel_vel.vx, wheel_vel.vy)], dtype=log_record_dtype)
+        self.write(record)
+
+        return None
+
+    def close(self) -> None:
+        """
+        records the final count in the header and closes the file
+        """
+        if self.file.closed:
+            return None
+
+        if not self.compress: # a gzip stream cannot be rewound
+            end = self.file.tell()
+            self.writeHeader()
+            self.file.seek(end)
+        self.file.close()
+
+        return None
+
+def saveLog(trajectory: TrajectoryBuffer, filename: str) -> None:
+    """
+    writes a whole trajectory to a binary trajectory log
+
+    inputs:
+    -------
+        trajectory (TrajectoryBuffer): recorded run
+        filename (str): path of the log file
+    """
+    with TrajectoryLogWriter(filename) as writer:
+        writer.write(trajectory.records)
+
+    return None
+
+def readLog(filename: str) -> np.ndarray:
+    """
+    memory-maps a binary trajectory log. Nothing is read or copied until the
+    records are accessed, so opening a log is instant whatever its size.
+    Compressed logs are decompressed into memory instead
+
+    inputs:
+    -------
+        filename (str): path of the log file
+
+    return:
+    -------
+        records (np.ndarray): read-only memory-mapped samples with trajectory_dtype layout
+    """
+    with open(filename, "rb") as file:
+        compressed = file.read(2) == b"\x1f\x8b" # gzip magic number
+
+    if compressed:
+        with gzip.open(filename, "rb") as file:
+            data = file.read()
+        header = np.frombuffer(data, dtype=log_header_dtype, count=1) if len(data) >= log_header_dtype.itemsize else []
+    else:
+        header = np.fromfile(filename, dtype=log_header_dtype, count=1)
+
+    if len(header) == 0 or header["magic"][0] != log_magic:
+        raise ValueError(f"{filename} is not a trajectory log")
+    if header["version"][0] != log_version or header["record_size"][0] != log_record_dtype.itemsize:
+        raise ValueError(f"{filename} has an unsupported trajectory log layout")
+
+    header_size = int(header["header_size"][0])
+    size = len(data) if compressed else os.path.getsize(filename)
+    count = (size - header_size) // log_record_dtype.itemsize # ignores a partial last record
+
+    if compressed:
+        return np.frombuffer(data, dtype=log_record_dtype, count=count, offset=header_size)
+    if count == 0:
+        return np.zeros(0, dtype=log_record_dtype)
+
+    return np.memmap(filename, dtype=log_record_dtype, mode="r", offset=header_size, shape=(count,))
+
+def loadLog(filename: str) -> TrajectoryBuffer:
+    """
+    opens a binary trajectory log as a trajectory, without copying the records
+
+    inputs:
+    -------
+        filename (str): path of the log file
+
+    return:
+    -------
+        trajectory (TrajectoryBuffer): recorded run backed by the memory-mapped file
+    """
+    return TrajectoryBuffer.fromRecords(readLog(filename))
+
+def textToLog(text_filename: str, log_filename: str, fields: tuple=None, dt: float=dt) -> None:
+    """
+    converts a whitespace-separated text file into a binary trajectory log
+
+    inputs:
+    -------
+        text_filename (str): path of the text file
+        log_filename (str): path of the log file
+        fields (tuple): names of the text file's columns, in order (see text_layouts),
+            None picks the layout from the number of columns
+        dt (float): time between samples of a file without a time column [s]
+    """
+    saveLog(loadText(text_filename, fields, dt), log_filename)
+
+    return None
+
+def logToText(log_filename: str, text_filename: str, fields: tuple=text_layouts["data"]) -> None:
+    """
+    converts a binary trajectory log into a whitespace-separated text file
+
+    inputs:
+    -------
+        log_filename (str): path of the log file
+        text_filename (str): path of the text file
+        fields (tuple): columns to write, in order (see text_layouts)
+    """
+    saveText(loadLog(log_filename), text_filename, fields)
+
+    return None